@@ -0,0 +1,155 @@
+"""Vectorized soil analytics across many farms.
+
+Soil readings for every requested farm are loaded with one query into NumPy
+arrays sorted by farm and date. Trends, deficiency scores and fertilizer
+recommendations are then computed with grouped array operations instead of a
+Python loop per farm.
+"""
+from datetime import date
+from sqlalchemy import func, select
+from models import db, Farm, Crop, SoilRecord
+import numpy as np
+
+MEASUREMENTS = ['ph', 'nitrogen', 'phosphorus', 'potassium', 'organic_matter']
+
+# Sufficiency levels below which a nutrient counts as deficient
+NUTRIENT_TARGETS = np.array([40.0, 25.0, 150.0])    # nitrogen, phosphorus, potassium
+ORGANIC_MATTER_TARGET = 3.0
+PH_RANGE = (6.0, 7.0)
+PH_TOLERANCE = 1.5
+
+# Application rate (kg/ha) recommended for a fully deficient nutrient
+MAX_APPLICATION = np.array([120.0, 60.0, 90.0])     # N, P, K
+
+# A pH trend faster than this (units per year) is flagged as drift
+PH_DRIFT_PER_YEAR = 0.2
+
+DEFAULT_WINDOW = 5
+
+def load_soil_arrays(owner_id=None):
+    """Load soil readings for all farms (or one owner's farms) into arrays."""
+    query = select(
+        SoilRecord.farm_id, SoilRecord.record_date,
+        *[getattr(SoilRecord, field) for field in MEASUREMENTS]
+    ).order_by(SoilRecord.farm_id, SoilRecord.record_date, SoilRecord.created_at)
+
+    if owner_id:
+        query = query.where(SoilRecord.farm_id.in_(select(Farm.id).where(Farm.owner_id == owner_id)))
+
+    rows = db.session.execute(query).all()
+    if not rows:
+        return [], np.empty(0, dtype=np.int64), np.empty(0), np.empty((0, len(MEASUREMENTS)))
+
+    farm_ids, dates, *columns = zip(*rows)
+    farm_ids = np.array(farm_ids, dtype=object)
+
+    # Rows are sorted by farm, so each farm is one contiguous run
+    starts = np.flatnonzero(np.r_[True, farm_ids[1:] != farm_ids[:-1]])
+    days = np.fromiter((day.toordinal() for day in dates), dtype=np.float64, count=len(dates))
+    values = np.column_stack([np.asarray(column, dtype=np.float64) for column in columns])
+
+    return list(farm_ids[starts]), starts, days, values
+
+def load_fertilized_area(farm_ids, owner_id=None):
+    """Hectares to fertilize per farm: planted crop area, or the farm size if nothing is planted."""
+    crop_area = (
+        select(Crop.farm_id, func.sum(Crop.area).label('area'))
+        .where(Crop.status != 'Harvested')
+        .group_by(Crop.farm_id)
+        .subquery()
+    )
+    query = select(Farm.id, Farm.size, crop_area.c.area).outerjoin(crop_area, crop_area.c.farm_id == Farm.id)
+    if owner_id:
+        query = query.where(Farm.owner_id == owner_id)
+
+    areas = {farm_id: (area or size) for farm_id, size, area in db.session.execute(query)}
+    return np.array([areas.get(farm_id, 0.0) for farm_id in farm_ids], dtype=np.float64)
+
+def compute(starts, days, values, area, window=DEFAULT_WINDOW):
+    """Compute trends, scores and recommendations for grouped soil readings.
+
+    starts holds the index of each farm's first reading; days and values are
+    the reading dates (as day ordinals) and measurements, sorted by farm and date.
+    """
+    count = len(values)
+    ends = np.r_[starts[1:], count]
+    sizes = ends - starts
+    group = np.repeat(np.arange(len(starts)), sizes)
+
+    latest = values[ends - 1]
+
+    # Rolling mean over each farm's last `window` readings, from a cumulative sum
+    cumulative = np.vstack([np.zeros(values.shape[1]), np.cumsum(values, axis=0)])
+    window_starts = np.maximum(starts, ends - window)
+    rolling = (cumulative[ends] - cumulative[window_starts]) / (ends - window_starts)[:, None]
+
+    # Least-squares slope per farm and measurement, in units per year
+    centered = days - (np.add.reduceat(days, starts) / sizes)[group]
+    centered_values = values - (np.add.reduceat(values, starts) / sizes[:, None])[group]
+    spread = np.add.reduceat(centered * centered, starts)
+    covariance = np.add.reduceat(centered[:, None] * centered_values, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(spread[:, None] > 0, covariance / spread[:, None], 0.0) * 365.25
+
+    # Deficiency scores in [0, 1]: 0 is sufficient, 1 is fully depleted
+    nutrients = rolling[:, 1:4]
+    nutrient_scores = np.clip((NUTRIENT_TARGETS - nutrients) / NUTRIENT_TARGETS, 0.0, 1.0)
+    organic_score = np.clip((ORGANIC_MATTER_TARGET - rolling[:, 4]) / ORGANIC_MATTER_TARGET, 0.0, 1.0)
+    ph = rolling[:, 0]
+    ph_distance = np.maximum(PH_RANGE[0] - ph, 0.0) + np.maximum(ph - PH_RANGE[1], 0.0)
+    ph_score = np.clip(ph_distance / PH_TOLERANCE, 0.0, 1.0)
+
+    per_hectare = nutrient_scores * MAX_APPLICATION
+
+    return {
+        'latest': latest,
+        'rolling': rolling,
+        'slopes': slopes,
+        'nutrient_scores': nutrient_scores,
+        'organic_matter_score': organic_score,
+        'ph_score': ph_score,
+        'ph_drift': (np.abs(slopes[:, 0]) > PH_DRIFT_PER_YEAR) | (ph_distance > 0),
+        'deficiency_score': np.max(np.column_stack([nutrient_scores, organic_score, ph_score]), axis=1),
+        'per_hectare': per_hectare,
+        'total': per_hectare * area[:, None],
+        'samples': sizes,
+        'last_record': days[ends - 1]
+    }
+
+def analyze_farms(owner_id=None, window=DEFAULT_WINDOW):
+    farm_ids, starts, days, values = load_soil_arrays(owner_id)
+    if not farm_ids:
+        return []
+
+    area = load_fertilized_area(farm_ids, owner_id)
+    result = compute(starts, days, values, area, window)
+
+    # Convert to plain lists once so the per-farm dicts are cheap to build
+    columns = {name: array.tolist() for name, array in result.items()}
+
+    report = []
+    for i, farm_id in enumerate(farm_ids):
+        report.append({
+            'farm_id': farm_id,
+            'samples': columns['samples'][i],
+            'last_record_date': date.fromordinal(int(columns['last_record'][i])).isoformat(),
+            'latest': dict(zip(MEASUREMENTS, columns['latest'][i])),
+            'rolling_mean': dict(zip(MEASUREMENTS, columns['rolling'][i])),
+            'trend_per_year': dict(zip(MEASUREMENTS, columns['slopes'][i])),
+            'deficiency': {
+                'nitrogen': columns['nutrient_scores'][i][0],
+                'phosphorus': columns['nutrient_scores'][i][1],
+                'potassium': columns['nutrient_scores'][i][2],
+                'organic_matter': columns['organic_matter_score'][i],
+                'ph': columns['ph_score'][i],
+                'overall': columns['deficiency_score'][i]
+            },
+            'ph_drift': columns['ph_drift'][i],
+            'recommendation': {
+                'area_ha': area[i].item(),
+                'per_hectare_kg': dict(zip(['N', 'P', 'K'], columns['per_hectare'][i])),
+                'total_kg': dict(zip(['N', 'P', 'K'], columns['total'][i]))
+            }
+        })
+
+    return report
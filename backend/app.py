@@ -1,70 +1,171 @@
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory
+from importlib import import_module
 import os
 from dotenv import load_dotenv
-from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from extensions import db
+from db_pool import engine_options, pool_metrics
+from instrumentation import request_metrics
+from auth import init_auth, public
+from json_provider import JSONProvider
+from summaries import track_summaries
+from assets import assets
+from geo import track_grid_cells
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__, 
-            static_folder='../frontend/static',
-            template_folder='../frontend/templates')
+# Blueprints are imported only when an app registers them:
+# name -> (module, blueprint attribute, url prefix)
+BLUEPRINTS = {
+    'products': ('routes.products', 'products_bp', '/api/products'),
+    'farm': ('routes.farm', 'farm_bp', '/api/farm'),
+    'users': ('routes.users', 'users_bp', '/api/users'),
+    'orders': ('routes.orders', 'orders_bp', '/api/orders'),
+    'async': ('routes.async_api', 'async_bp', '/api/async'),
+    'batch': ('routes.batch', 'batch_bp', '/api/batch'),
+    'sync': ('routes.sync', 'sync_bp', '/api/sync'),
+}
 
-# Enable CORS
-CORS(app)
+def register_blueprints(app, names):
+    for name in names:
+        module, attribute, url_prefix = BLUEPRINTS[name]
+        blueprint = getattr(import_module(module), attribute)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
 
-# Configure database
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+def register_pages(app):
+    # Serve frontend static files
+    @app.route('/<path:path>')
+    @public
+    def serve_static(path):
+        return send_from_directory('../frontend', path)
 
-# Import routes after db is initialized to avoid circular imports
-from routes.products import products_bp
-from routes.farm import farm_bp
-from routes.users import users_bp
+    # Serve frontend HTML pages; templates link fingerprinted assets through asset_url
+    @app.route('/')
+    @public
+    def index():
+        response = app.make_response(render_template('index.html'))
+        # Pages are revalidated so they pick up new asset fingerprints after a deploy
+        response.cache_control.no_cache = True
+        return response
 
-# Register blueprints
-app.register_blueprint(products_bp, url_prefix='/api/products')
-app.register_blueprint(farm_bp, url_prefix='/api/farm')
-app.register_blueprint(users_bp, url_prefix='/api/users')
+    @app.route('/products')
+    @public
+    def products():
+        return send_from_directory('../frontend', 'products.html')
 
-# Serve frontend static files
-@app.route('/<path:path>')
-def serve_static(path):
-    return send_from_directory('../frontend', path)
+    @app.route('/farm-management')
+    @public
+    def farm_management():
+        return send_from_directory('../frontend', 'farm-management.html')
 
-# Serve frontend HTML pages
-@app.route('/')
-def index():
-    return send_from_directory('../frontend', 'index.html')
+    @app.route('/cart')
+    @public
+    def cart():
+        return send_from_directory('../frontend', 'cart.html')
 
-@app.route('/products')
-def products():
-    return send_from_directory('../frontend', 'products.html')
+def create_app(config=None):
+    """Build the Flask app.
 
-@app.route('/farm-management')
-def farm_management():
-    return send_from_directory('../frontend', 'farm-management.html')
+    config overrides settings read from the environment. BLUEPRINTS may list a
+    subset of blueprint names so a worker only imports the APIs it serves.
+    """
+    # Initialize Flask app
+    app = Flask(__name__,
+                static_folder='../frontend/static',
+                template_folder='../frontend/templates')
+    app.json = JSONProvider(app)
 
-@app.route('/cart')
-def cart():
-    return send_from_directory('../frontend', 'cart.html')
+    # Configure database and authentication
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['AUTH_REQUIRED'] = os.getenv('AUTH_REQUIRED', 'true') == 'true'
+    app.config['BLUEPRINTS'] = list(BLUEPRINTS)
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
 
-# Error handlers
-@app.errorhandler(404)
-def not_found(e):
-    return jsonify({"error": "Resource not found"}), 404
+    # Enable CORS
+    CORS(app)
 
-@app.errorhandler(500)
-def server_error(e):
-    return jsonify({"error": "Internal server error"}), 500
+    db.init_app(app)
 
-if __name__ == '__main__':
-    # Create tables if they don't exist
+    # Recompute farm and owner summaries for the farms each commit touches
+    track_summaries(db.session)
+
+    # Bucket farm coordinates into the spatial grid on ORM writes
+    track_grid_cells()
+
+    # Track connection pool checkouts and per-endpoint query metrics
     with app.app_context():
-        db.create_all()
+        pool_metrics.attach(db.engine)
+        request_metrics.init_app(app, db.engine)
+
+    # Verify access tokens on every request
+    init_auth(app)
+
+    # Register blueprints
+    register_blueprints(app, app.config['BLUEPRINTS'])
+
+    @app.route('/api/pool/stats')
+    def pool_stats():
+        return jsonify(pool_metrics.snapshot())
+
+    @app.route('/api/metrics/endpoints')
+    def endpoint_metrics():
+        return jsonify(request_metrics.snapshot())
+
+    # Prometheus scrape target; exposes endpoint names and timings, no statements
+    @app.route('/metrics')
+    @public
+    def metrics():
+        return Response(request_metrics.prometheus(pool_metrics.snapshot()),
+                        mimetype='text/plain; version=0.0.4')
+
+    # Fingerprinted, precompressed frontend assets under /assets
+    assets.init_app(app)
+
+    register_pages(app)
+
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(e):
+        return jsonify({"error": "Resource not found"}), 404
+
+    @app.errorhandler(500)
+    def server_error(e):
+        return jsonify({"error": "Internal server error"}), 500
+
+    return app
+
+def upgrade_database(app):
+    """Apply pending Alembic migrations to the app's database."""
+    from alembic import command
+    from alembic.config import Config
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(backend_dir, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(backend_dir, 'migrations'))
+    # Escape % so ConfigParser does not treat it as interpolation
+    config.set_main_option('sqlalchemy.url', app.config['SQLALCHEMY_DATABASE_URI'].replace('%', '%%'))
+    command.upgrade(config, 'head')
+
+if __name__ == '__main__':
+    from maintenance import scheduler
+    from forecast_worker import refresher
+
+    app = create_app()
+
+    # Create or upgrade the schema
+    upgrade_database(app)
+    
+    # Start the equipment maintenance worker
+    if os.getenv('MAINTENANCE_WORKER', 'true') == 'true':
+        scheduler.start(app)
+    
+    # Keep harvest forecasts current in the background
+    if os.getenv('FORECAST_WORKER', 'true') == 'true':
+        refresher.start(app)
     
     # Run the app
     app.run(debug=os.getenv('FLASK_ENV') == 'development', host='0.0.0.0')
@@ -0,0 +1,107 @@
+"""ASGI entry point, for serving the async API without a thread per request.
+
+    pip install uvicorn
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+
+GET requests to the async API (/api/async, see routes/async_api.py) are served
+straight from the server's event loop: the async engine lives on that loop, so
+a request waiting on its queries holds no thread and one process can have as
+many in flight as the connection pool allows. Every other request goes to the
+Flask app through asgiref's WSGI adapter, which runs it on a thread pool like a
+threaded WSGI server would.
+
+Async API responses are the same as Flask's (JSON encoding, auth and CORS
+headers), but they skip Flask's request hooks, so they are not counted in the
+endpoint metrics.
+"""
+from asgiref.wsgi import WsgiToAsgi
+from urllib.parse import parse_qsl
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+from app import BLUEPRINTS, create_app
+from async_db import async_db
+from auth import AuthError, check_token
+from forecast_worker import refresher
+from maintenance import scheduler
+from routes.async_api import ROUTES, call_view
+import asyncio
+import os
+
+class AsyncApiApp:
+    """Serves the async API routes on the event loop and everything else through Flask."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+        rules = []
+        if 'async' in flask_app.config['BLUEPRINTS']:
+            prefix = BLUEPRINTS['async'][2]
+            rules = [
+                Rule(prefix + rule, endpoint=(view, is_public), methods=['GET'])
+                for rule, view, is_public in ROUTES
+            ]
+        self.urls = Map(rules)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            try:
+                (view, is_public), params = self.urls.bind('').match(scope['path'], method=scope['method'])
+            except HTTPException:
+                # Not an async API route: Flask answers
+                pass
+            else:
+                return await self.serve(scope, send, view, is_public, params)
+
+        return await self.wsgi(scope, receive, send)
+
+    async def serve(self, scope, send, view, is_public, params):
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+
+        try:
+            check_token(headers.get('authorization', ''), self.flask_app.config.get('AUTH_REQUIRED', True), is_public)
+        except AuthError as e:
+            body, status = {"error": str(e)}, 401
+        else:
+            # Started by the lifespan startup, unless the server skipped it
+            async_db.ensure_started(asyncio.get_running_loop())
+            args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+            body, status = await call_view(view, args, params)
+
+        response = self.flask_app.json.response(body)
+        data = response.get_data()
+        response_headers = [
+            (b'content-type', response.content_type.encode('latin-1')),
+            (b'content-length', str(len(data)).encode('latin-1')),
+        ]
+        # What flask_cors adds with its default settings
+        if 'origin' in headers:
+            response_headers.append((b'access-control-allow-origin', headers['origin'].encode('latin-1')))
+            response_headers.append((b'vary', b'Origin'))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': data})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # The engine must live on the server's loop for views to await it directly
+                async_db.ensure_started(asyncio.get_running_loop())
+                if os.getenv('MAINTENANCE_WORKER', 'true') == 'true':
+                    scheduler.start(self.flask_app)
+                if os.getenv('FORECAST_WORKER', 'true') == 'true':
+                    refresher.start(self.flask_app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                scheduler.stop()
+                refresher.stop()
+                await async_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+app = application = AsyncApiApp(create_app())
@@ -0,0 +1,213 @@
+"""Fingerprinted, precompressed static assets.
+
+The build step copies every file under frontend/static to frontend/dist with a
+content hash in its name (css/styles.css becomes css/styles.3f2a9c1e7b04.css),
+writes .gz and, when the brotli package is installed, .br variants of text
+files next to it, and records the mapping in dist/manifest.json. CSS url()
+references to other assets are rewritten to their fingerprinted names.
+
+    python assets.py
+
+At runtime templates call asset_url('css/styles.css'). With a manifest it
+points at /assets/<fingerprinted name>, which is served with a one-year
+immutable Cache-Control header and the best precompressed variant the client
+accepts; nothing is compressed per request. Without a manifest (a checkout
+that has not been built) asset_url falls back to the plain /static URL.
+
+Settings (environment or app config):
+
+    ASSET_DIR   where the build writes and the app reads assets (default frontend/dist)
+"""
+from flask import Response, abort, request, url_for
+from auth import public
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
+SOURCE_DIR = os.path.join(FRONTEND_DIR, 'static')
+DEFAULT_ASSET_DIR = os.path.join(FRONTEND_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+URL_PREFIX = '/assets'
+CACHE_CONTROL = f'public, max-age={365 * 24 * 3600}, immutable'
+HASH_LENGTH = 12
+
+# Only text formats shrink; images and fonts are already compressed
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.json', '.svg', '.html', '.txt', '.xml', '.map'}
+
+# Variants in order of preference: (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+def fingerprint(path, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{digest}{extension}'
+
+def rewrite_css_urls(path, content, manifest):
+    """Point url() references in a stylesheet at the fingerprinted files."""
+    directory = os.path.dirname(path)
+
+    def replace(match):
+        quote, target = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', target):
+            return match.group(0)
+        clean = target.split('?', 1)[0].split('#', 1)[0]
+        logical = os.path.normpath(os.path.join(directory, clean)).replace(os.sep, '/')
+        if logical not in manifest:
+            return match.group(0)
+        relative = os.path.relpath(manifest[logical]['path'], directory or '.').replace(os.sep, '/')
+        return f'url({quote}{relative}{quote})'
+
+    return CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+def write_variants(target, content):
+    """Write the file and its precompressed variants, returning the encodings written."""
+    with open(target, 'wb') as handle:
+        handle.write(content)
+
+    if os.path.splitext(target)[1] not in COMPRESSIBLE:
+        return []
+
+    encodings = []
+    variants = {'gzip': lambda: gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = lambda: brotli.compress(content, quality=11)
+
+    for encoding, suffix in ENCODINGS:
+        if encoding not in variants:
+            continue
+        compressed = variants[encoding]()
+        # Keep a variant only if it actually saves bytes
+        if len(compressed) < len(content):
+            with open(target + suffix, 'wb') as handle:
+                handle.write(compressed)
+            encodings.append(encoding)
+    return encodings
+
+def build(source_dir=SOURCE_DIR, asset_dir=DEFAULT_ASSET_DIR):
+    """Fingerprint and precompress every asset, returning the manifest."""
+    paths = []
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            paths.append(os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, '/'))
+
+    # Stylesheets go last so they can refer to the other files' new names
+    paths.sort(key=lambda path: (path.endswith('.css'), path))
+
+    if os.path.isdir(asset_dir):
+        shutil.rmtree(asset_dir)
+
+    manifest = {}
+    for path in paths:
+        with open(os.path.join(source_dir, path), 'rb') as handle:
+            content = handle.read()
+        if path.endswith('.css'):
+            content = rewrite_css_urls(path, content, manifest)
+
+        hashed = fingerprint(path, content)
+        target = os.path.join(asset_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        manifest[path] = {'path': hashed, 'encodings': write_variants(target, content)}
+
+    with open(os.path.join(asset_dir, MANIFEST_NAME), 'w') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    return manifest
+
+class Assets:
+    """Loads the manifest and serves the built files for one app.
+
+    Built files are small and never change while the app runs, so every
+    variant is read into memory once with its headers; serving one is a dict
+    lookup with no disk access.
+    """
+
+    def __init__(self):
+        self.asset_dir = DEFAULT_ASSET_DIR
+        self.manifest = {}
+        # Fingerprinted path -> {encoding or None: (body, headers)}
+        self.files = {}
+
+    def init_app(self, app):
+        self.asset_dir = app.config.get('ASSET_DIR') or os.getenv('ASSET_DIR') or DEFAULT_ASSET_DIR
+        self.load()
+
+        @public
+        def serve_asset(filename):
+            return self.serve(filename)
+
+        app.add_url_rule(f'{URL_PREFIX}/<path:filename>', 'assets', serve_asset)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def load(self):
+        try:
+            with open(os.path.join(self.asset_dir, MANIFEST_NAME)) as handle:
+                self.manifest = json.load(handle)
+        except FileNotFoundError:
+            self.manifest = {}
+
+        suffixes = dict(ENCODINGS)
+        self.files = {}
+        for path, entry in self.manifest.items():
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            variants = {}
+            for encoding in (None, *entry['encodings']):
+                with open(os.path.join(self.asset_dir, entry['path'] + suffixes.get(encoding, '')), 'rb') as handle:
+                    body = handle.read()
+                headers = {
+                    'Content-Type': mimetype,
+                    'Cache-Control': CACHE_CONTROL,
+                    # The fingerprint already names the content
+                    'ETag': f'"{entry["path"]}{suffixes.get(encoding, "")}"',
+                }
+                if entry['encodings']:
+                    headers['Vary'] = 'Accept-Encoding'
+                if encoding:
+                    headers['Content-Encoding'] = encoding
+                variants[encoding] = (body, headers)
+            self.files[entry['path']] = variants
+
+    def url(self, path):
+        entry = self.manifest.get(path)
+        if entry is None:
+            return url_for('static', filename=path)
+        return f"{URL_PREFIX}/{entry['path']}"
+
+    def serve(self, filename):
+        variants = self.files.get(filename)
+        if variants is None:
+            abort(404)
+
+        body, headers = variants[None]
+        for encoding, _ in ENCODINGS:
+            if encoding in variants and request.accept_encodings[encoding]:
+                body, headers = variants[encoding]
+                break
+
+        if headers['ETag'] in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers=headers)
+        return Response(body, headers=headers)
+
+assets = Assets()
+
+def main():
+    asset_dir = os.getenv('ASSET_DIR') or DEFAULT_ASSET_DIR
+    manifest = build(asset_dir=asset_dir)
+    compressed = sum(1 for entry in manifest.values() if entry['encodings'])
+    print(f"Built {len(manifest)} assets ({compressed} precompressed) into {asset_dir}")
+    if brotli is None:
+        print("brotli is not installed; only gzip variants were written (pip install brotli)")
+
+if __name__ == '__main__':
+    main()
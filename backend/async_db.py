@@ -0,0 +1,101 @@
+"""Async SQLAlchemy engine for the async API.
+
+Pooled async connections belong to the event loop that opened them, so the
+engine lives on one long-running loop per process. Served over ASGI (see
+asgi.py) that is the server's own loop, and views await their queries
+directly. Under a WSGI server Flask runs each async view in a short-lived loop
+on the request's thread, so the engine gets a loop of its own in a background
+thread and views hand their queries over to it; the request's thread still
+waits for them. Either way connections stay pooled and a view can run
+independent queries concurrently.
+
+Requires an async driver: asyncpg for Postgres, aiosqlite for SQLite.
+"""
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import asyncio
+import os
+import threading
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+def async_database_url(url):
+    scheme, separator, rest = url.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+class AsyncDatabase:
+    def __init__(self):
+        self.url = None
+        self.options = {}
+        self.loop = None
+        self.engine = None
+        self.sessionmaker = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.url = async_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        self.options = {
+            key: value for key, value in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items()
+            if key in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+        }
+        # Views fan out over several connections at once, so overflow ones would
+        # be closed on return and reopened by nearly every request: keep them all
+        if 'pool_size' in self.options:
+            self.options['pool_size'] += self.options.pop('max_overflow', 0)
+            self.options['max_overflow'] = 0
+
+    def ensure_started(self, loop=None):
+        """Start the engine on loop, or on a new loop in a background thread."""
+        # Neither survives a fork, so each worker starts its own
+        if self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            if loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-db', daemon=True)
+                thread.start()
+            self.loop = loop
+
+            self.engine = create_async_engine(self.url, **self.options)
+            # The async API only reads, so its queries skip the round trips to
+            # begin and roll back a transaction
+            self.sessionmaker = async_sessionmaker(
+                self.engine.execution_options(isolation_level='AUTOCOMMIT'), expire_on_commit=False
+            )
+            self.pid = os.getpid()
+
+    def session(self):
+        return self.sessionmaker()
+
+    async def run(self, coroutine):
+        """Await a coroutine on the engine's event loop, from it or from any other loop."""
+        self.ensure_started()
+        if asyncio.get_running_loop() is self.loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    async def dispose(self):
+        """Close the pooled connections; call from the engine's loop."""
+        if self.pid == os.getpid():
+            await self.engine.dispose()
+
+    async def scalars(self, statement):
+        """Run one query in its own session, so several can run at once."""
+        async with self.session() as session:
+            return (await session.execute(statement)).scalars().all()
+
+    async def rows(self, statement):
+        """Like scalars, for selects of plain columns."""
+        async with self.session() as session:
+            return (await session.execute(statement)).all()
+
+async_db = AsyncDatabase()
@@ -0,0 +1,185 @@
+"""Stateless token authentication and password hashing.
+
+Access and refresh tokens are JWTs signed with HS256 using SECRET_KEY, so
+verifying a request is one HMAC over the token and never touches the database.
+Password hashing runs on a small bounded thread pool so a burst of logins
+cannot tie up every request thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g, jsonify, request
+from werkzeug.security import generate_password_hash, check_password_hash
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_TTL = int(os.getenv('ACCESS_TOKEN_TTL', '900'))
+REFRESH_TOKEN_TTL = int(os.getenv('REFRESH_TOKEN_TTL', str(14 * 24 * 3600)))
+
+# Hashes created with any other method are upgraded on the next successful login
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', '64'))
+HASH_QUEUE_TIMEOUT = float(os.getenv('HASH_QUEUE_TIMEOUT', '5'))
+
+# Users with this role may read and change every user's data
+ADMIN_ROLE = os.getenv('ADMIN_ROLE', 'Admin')
+
+HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+
+class AuthError(Exception):
+    pass
+
+class HashingBusy(Exception):
+    pass
+
+def get_secret():
+    secret = os.getenv('SECRET_KEY')
+    if not secret:
+        logger.warning("SECRET_KEY is not set; tokens will not survive a restart or work across workers")
+        secret = secrets.token_hex(32)
+    return secret.encode('utf-8')
+
+SECRET = get_secret()
+
+def b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def b64decode(data):
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+def sign(signing_input):
+    return b64encode(hmac.new(SECRET, signing_input, hashlib.sha256).digest())
+
+def encode_token(claims):
+    payload = b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    signing_input = HEADER + b'.' + payload
+    return (signing_input + b'.' + sign(signing_input)).decode('ascii')
+
+def decode_token(token, token_type='access'):
+    try:
+        header, payload, signature = token.encode('ascii').split(b'.')
+    except (ValueError, UnicodeEncodeError):
+        raise AuthError("Malformed token")
+
+    if header != HEADER or not hmac.compare_digest(sign(header + b'.' + payload), signature):
+        raise AuthError("Invalid token")
+
+    try:
+        claims = json.loads(b64decode(payload))
+    except ValueError:
+        raise AuthError("Malformed token")
+
+    if claims.get('type') != token_type:
+        raise AuthError("Wrong token type")
+    if claims.get('exp', 0) < time.time():
+        raise AuthError("Token expired")
+
+    return claims
+
+def create_tokens(user_id, role):
+    now = int(time.time())
+    access_token = encode_token({
+        'sub': user_id, 'role': role, 'type': 'access',
+        'iat': now, 'exp': now + ACCESS_TOKEN_TTL
+    })
+    refresh_token = encode_token({
+        'sub': user_id, 'role': role, 'type': 'refresh',
+        'iat': now, 'exp': now + REFRESH_TOKEN_TTL, 'jti': secrets.token_hex(8)
+    })
+    return {
+        'access_token': access_token,
+        'refresh_token': refresh_token,
+        'token_type': 'Bearer',
+        'expires_in': ACCESS_TOKEN_TTL
+    }
+
+# Password hashing on a bounded pool
+hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+hash_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+
+def run_hashing(function, *args):
+    if not hash_slots.acquire(timeout=HASH_QUEUE_TIMEOUT):
+        raise HashingBusy("Too many concurrent logins, try again shortly")
+    try:
+        return hash_pool.submit(function, *args).result()
+    finally:
+        hash_slots.release()
+
+def hash_password(password):
+    return run_hashing(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return run_hashing(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != PASSWORD_HASH_METHOD
+
+# Request authentication
+def public(view):
+    """Mark a view as reachable without an access token."""
+    view.public = True
+    return view
+
+def current_user_id():
+    """The id of the user the access token was issued to, or None without a token."""
+    return g.user['sub'] if g.get('user') else None
+
+def unauthenticated_allowed():
+    # Only with AUTH_REQUIRED off can a protected view run without a token
+    return g.get('user') is None and not current_app.config.get('AUTH_REQUIRED', True)
+
+def is_admin():
+    if g.get('user') is None:
+        return unauthenticated_allowed()
+    return g.user.get('role') == ADMIN_ROLE
+
+def can_access_user(user_id):
+    """Whether the request may read or change the given user's data."""
+    return is_admin() or (g.get('user') is not None and g.user['sub'] == user_id)
+
+def forbidden():
+    return jsonify({"error": "Not allowed"}), 403
+
+def check_token(header, required, public=False):
+    """The verified claims of an Authorization header, or None without a token.
+
+    The claims are sub (user id), role, type, iat and exp. Raises AuthError if
+    the token is invalid, or missing when required and the view is not public.
+    """
+    claims = None
+    if header.startswith('Bearer '):
+        claims = decode_token(header[len('Bearer '):])
+
+    if claims is None and required and not public:
+        raise AuthError("Authentication required")
+
+    return claims
+
+def init_auth(app):
+    required = app.config.get('AUTH_REQUIRED', True)
+
+    @app.before_request
+    def authenticate():
+        g.user = None
+        view = app.view_functions.get(request.endpoint)
+
+        # Unknown routes fall through to the 404 handler; CORS preflights carry no token
+        if view is None or request.method == 'OPTIONS':
+            return None
+
+        try:
+            g.user = check_token(request.headers.get('Authorization', ''), required,
+                                 getattr(view, 'public', False) or request.endpoint == 'static')
+        except AuthError as e:
+            return jsonify({"error": str(e)}), 401
+
+        return None
@@ -0,0 +1,284 @@
+"""Mixed create/update/delete operations on farms, crops and equipment.
+
+Operations are validated up front, then applied chunk by chunk. Each chunk is
+one transaction that issues a bulk INSERT, a bulk UPDATE by primary key and a
+DELETE ... WHERE id IN (...) per resource, in dependency order, instead of one
+statement and commit per object. Within a chunk, creates run before updates,
+and deletes run last.
+"""
+from datetime import datetime
+from sqlalchemy import delete, insert, select, update
+from models import db, generate_uuid, Farm, Crop, Equipment
+from summaries import mark_farms, mark_rows
+from forecasting import discard_forecasts
+from sync import record_tombstones
+from geo import grid_values
+from ids import check_id
+import os
+
+DEFAULT_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '1000'))
+MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '100000'))
+
+RESOURCES = {
+    'farm': {
+        'model': Farm,
+        'fields': ['name', 'location', 'size', 'owner_id', 'latitude', 'longitude'],
+        'required': ['name', 'location', 'size', 'owner_id'],
+        'dates': [],
+        'defaults': {},
+    },
+    'crop': {
+        'model': Crop,
+        'fields': ['farm_id', 'name', 'area', 'status', 'planted_date', 'harvest_date'],
+        'required': ['farm_id', 'name', 'area'],
+        'dates': ['planted_date', 'harvest_date'],
+        'defaults': {'status': 'Planning'},
+    },
+    'equipment': {
+        'model': Equipment,
+        'fields': ['farm_id', 'name', 'status', 'last_maintenance', 'next_maintenance'],
+        'required': ['farm_id', 'name'],
+        'dates': ['last_maintenance', 'next_maintenance'],
+        'defaults': {'status': 'Operational'},
+    },
+}
+
+# Parents are written before children; deletes run in the reverse order
+WRITE_ORDER = ['farm', 'crop', 'equipment']
+
+class OperationError(Exception):
+    pass
+
+def parse_operation(operation):
+    """Validate one operation and return (op, resource, id, values)."""
+    if not isinstance(operation, dict):
+        raise OperationError("Operation must be an object")
+
+    op = operation.get('op')
+    resource = operation.get('resource')
+    if op not in ('create', 'update', 'delete'):
+        raise OperationError("op must be create, update or delete")
+    if resource not in RESOURCES:
+        raise OperationError("resource must be farm, crop or equipment")
+
+    spec = RESOURCES[resource]
+    row_id = operation.get('id')
+    data = operation.get('data') or {}
+
+    if op != 'create' and not row_id:
+        raise OperationError("Missing required field: id")
+    if not isinstance(data, dict):
+        raise OperationError("data must be an object")
+
+    if op == 'delete':
+        return op, resource, row_id, {}
+
+    values = {field: data[field] for field in spec['fields'] if field in data}
+
+    if op == 'create':
+        for field in spec['required']:
+            if field not in values:
+                raise OperationError(f"Missing required field: {field}")
+        for field, default in spec['defaults'].items():
+            values.setdefault(field, default)
+    elif not values:
+        raise OperationError("Nothing to update")
+
+    # Parse dates if provided
+    for field in spec['dates']:
+        if values.get(field):
+            try:
+                values[field] = datetime.strptime(values[field], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise OperationError(f"Invalid {field} format. Use YYYY-MM-DD")
+
+    # Farms moved on the map also move to another grid cell
+    if resource == 'farm':
+        try:
+            grid_values(values)
+        except ValueError as e:
+            raise OperationError(str(e))
+
+    if row_id:
+        try:
+            check_id(row_id)
+        except ValueError as e:
+            raise OperationError(str(e))
+        values['id'] = row_id
+
+    return op, resource, row_id, values
+
+def existing_ids(model, ids):
+    if not ids:
+        return set()
+    return set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+def mark_summaries(model, rows):
+    """Queue the farms that bulk updates or deletes of rows will change."""
+    if model is Farm:
+        mark_farms(row['id'] for row in rows)
+    else:
+        # The farms the rows belong to now, and any they are moved to
+        mark_rows(model, [row['id'] for row in rows])
+        mark_farms(row.get('farm_id') for row in rows)
+
+def write_groups(groups, now):
+    """Issue the writes for operations grouped by (op, resource), returning what was written."""
+    written = []
+    for resource in WRITE_ORDER:
+        model = RESOURCES[resource]['model']
+
+        creates = groups.get(('create', resource), [])
+        if creates:
+            rows = [values for _, _, values in creates]
+            # Generate ids here so they can be reported back per item
+            for row in rows:
+                row.setdefault('id', generate_uuid())
+            db.session.execute(insert(model), rows)
+            mark_farms(row['id'] if model is Farm else row['farm_id'] for row in rows)
+            written.extend((index, row['id'], resource, 'create', row) for (index, _, _), row in zip(creates, rows))
+
+        updates = groups.get(('update', resource), [])
+        if updates:
+            rows = [{**values, 'updated_at': now} for _, _, values in updates]
+            mark_summaries(model, rows)
+            db.session.execute(update(model), rows)
+            written.extend((index, row_id, resource, 'update', values) for index, row_id, values in updates)
+
+    for resource in reversed(WRITE_ORDER):
+        model = RESOURCES[resource]['model']
+        deletes = groups.get(('delete', resource), [])
+        if deletes:
+            mark_summaries(model, [{'id': row_id} for _, row_id, _ in deletes])
+            record_tombstones(resource, [row_id for _, row_id, _ in deletes])
+            if model is not Equipment:
+                discard_forecasts(model, [row_id for _, row_id, _ in deletes])
+            db.session.execute(
+                delete(model)
+                .where(model.id.in_([row_id for _, row_id, _ in deletes]))
+                .execution_options(synchronize_session=False)
+            )
+            written.extend((index, row_id, resource, 'delete', {}) for index, row_id, _ in deletes)
+
+    return written
+
+def write_one_by_one(groups, now, results):
+    """Write each operation in its own savepoint, reporting the ones that fail."""
+    ordered = [
+        (op, resource, item)
+        for resource in WRITE_ORDER for op in ('create', 'update')
+        for item in groups.get((op, resource), [])
+    ] + [
+        ('delete', resource, item)
+        for resource in reversed(WRITE_ORDER)
+        for item in groups.get(('delete', resource), [])
+    ]
+
+    written = []
+    # (resource, id) of rows whose create failed and that do not exist
+    failed = set()
+    for op, resource, (index, row_id, values) in ordered:
+        # Not every database checks foreign keys, so skip children of farms that failed
+        if ('farm', values.get('farm_id')) in failed:
+            results[index] = {"index": index, "status": "error", "error": "Farm not found"}
+            continue
+        if (resource, row_id) in failed:
+            results[index] = {"index": index, "status": "error", "error": f"{resource.capitalize()} not found"}
+            continue
+        try:
+            with db.session.begin_nested():
+                written.extend(write_groups({(op, resource): [(index, row_id, values)]}, now))
+        except Exception as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            if op == 'create' and not existing_ids(RESOURCES[resource]['model'], [values.get('id')]):
+                failed.add((resource, values.get('id')))
+    return written
+
+def apply_chunk(chunk, results):
+    """Apply one chunk of parsed operations in a single transaction.
+
+    chunk holds (index, op, resource, id, values) tuples. Operations that can
+    not be applied get an error result; the rest are written together. If a
+    write fails, the chunk is retried one operation at a time in savepoints.
+    """
+    now = datetime.utcnow()
+    groups = {}
+    for index, op, resource, row_id, values in chunk:
+        groups.setdefault((op, resource), []).append((index, row_id, values))
+
+    # Check the ids that updates and deletes refer to, one query per resource.
+    # Rows created earlier in the chunk are written before them.
+    for resource, spec in RESOURCES.items():
+        targets = groups.get(('update', resource), []) + groups.get(('delete', resource), [])
+        created = {values['id'] for _, _, values in groups.get(('create', resource), []) if values.get('id')}
+        found = existing_ids(spec['model'], {row_id for _, row_id, _ in targets} - created) | created
+        for op in ('update', 'delete'):
+            if (op, resource) in groups:
+                keep = []
+                for index, row_id, values in groups[(op, resource)]:
+                    if row_id in found:
+                        keep.append((index, row_id, values))
+                    else:
+                        results[index] = {"index": index, "status": "error", "error": f"{resource.capitalize()} not found"}
+                groups[(op, resource)] = keep
+
+    # Crops and equipment must belong to a farm that exists or is created in this chunk
+    created_farms = {values.get('id') for _, _, values in groups.get(('create', 'farm'), [])}
+    referenced = {
+        values['farm_id']
+        for resource in ('crop', 'equipment')
+        for op in ('create', 'update')
+        for _, _, values in groups.get((op, resource), [])
+        if 'farm_id' in values
+    }
+    known_farms = existing_ids(Farm, referenced - created_farms) | created_farms
+    for resource in ('crop', 'equipment'):
+        for op in ('create', 'update'):
+            if (op, resource) in groups:
+                keep = []
+                for index, row_id, values in groups[(op, resource)]:
+                    if 'farm_id' in values and values['farm_id'] not in known_farms:
+                        results[index] = {"index": index, "status": "error", "error": "Farm not found"}
+                    else:
+                        keep.append((index, row_id, values))
+                groups[(op, resource)] = keep
+
+    try:
+        with db.session.begin_nested():
+            written = write_groups(groups, now)
+    except Exception:
+        # Something in the chunk failed: write it again one operation at a time
+        # so only the failing operations are reported as errors
+        written = write_one_by_one(groups, now, results)
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        # The whole chunk is rolled back, so every operation in it failed
+        for (op, resource), items in groups.items():
+            for index, _, _ in items:
+                results[index] = {"index": index, "status": "error", "error": str(e)}
+        return []
+
+    for index, row_id, resource, op, _ in written:
+        results[index] = {"index": index, "status": "ok", "op": op, "resource": resource, "id": row_id}
+
+    return written
+
+def run_batch(operations, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate and apply operations, returning one result per operation in order."""
+    results = [None] * len(operations)
+    parsed = []
+
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append((index, *parse_operation(operation)))
+        except OperationError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+
+    written = []
+    for start in range(0, len(parsed), chunk_size):
+        written.extend(apply_chunk(parsed[start:start + chunk_size], results))
+
+    return results, written
@@ -0,0 +1,60 @@
+"""Compare the sync and async farm dashboard endpoints under load.
+
+Runs the same load against /api/farm/<id>/dashboard and
+/api/async/farm/<id>/dashboard at several concurrency levels and prints
+throughput and latency side by side. Compare one server process of each: the
+sync endpoint under gunicorn (which holds a thread per request) and the async
+one under uvicorn (asgi.py, which does not), both against Postgres.
+
+    WEB_CONCURRENCY=1 gunicorn -c gunicorn.conf.py wsgi:app
+    uvicorn asgi:app --port 8001
+    python benchmarks/async_dashboard.py --url http://localhost:8000 \
+        --async-url http://localhost:8001 --farm-id <id> --token <access token>
+
+Without --async-url both endpoints are loaded through the --url server.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from serve_load import percentile, worker
+
+def run(url, concurrency, duration, headers):
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: worker(url, deadline, headers), range(concurrency)))
+
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    errors = sum(worker_errors for _, worker_errors in results)
+    return len(latencies) / duration, percentile(latencies, 0.5), percentile(latencies, 0.99), errors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--async-url', help='server for the async endpoint (default: --url)')
+    parser.add_argument('--farm-id', required=True)
+    parser.add_argument('--token')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    base = args.url.rstrip('/')
+    async_base = (args.async_url or args.url).rstrip('/')
+    endpoints = {
+        'sync': f'{base}/api/farm/{args.farm_id}/dashboard',
+        'async': f'{async_base}/api/async/farm/{args.farm_id}/dashboard',
+    }
+
+    print(f"{'mode':6} {'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for mode, url in endpoints.items():
+            throughput, p50, p99, errors = run(url, concurrency, args.duration, headers)
+            print(f"{mode:6} {concurrency:7} {throughput:9.1f} {p50 * 1000:8.1f} {p99 * 1000:8.1f} {errors:7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Measure the per-request cost of token authentication.
+
+Compares verifying a signed access token with a full password hash check, and
+times authenticated round trips through the app with the test client.
+
+    python benchmarks/auth_overhead.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from auth import PASSWORD_HASH_METHOD, create_tokens, decode_token
+from werkzeug.security import check_password_hash, generate_password_hash
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    tokens = create_tokens('benchmark-user', 'Farmer')
+    access_token = tokens['access_token']
+
+    verify = timed(lambda: decode_token(access_token), 100000)
+    print(f"token verification:   {verify * 1e6:10.1f} us")
+
+    password_hash = generate_password_hash('benchmark-password', PASSWORD_HASH_METHOD)
+    password = timed(lambda: check_password_hash(password_hash, 'benchmark-password'), 20)
+    print(f"password check ({PASSWORD_HASH_METHOD}): {password * 1e6:10.1f} us")
+
+    client = create_app().test_client()
+    headers = {'Authorization': f'Bearer {access_token}'}
+    url = '/api/farm/equipment/alerts'
+
+    assert client.get(url, headers=headers).status_code == 200
+    with_token = timed(lambda: client.get(url, headers=headers), 5000)
+    print(f"request with token:   {with_token * 1e6:10.1f} us")
+    print(f"auth share of request: {verify / with_token:9.1%}")
+
+if __name__ == '__main__':
+    main()
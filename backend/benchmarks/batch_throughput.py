@@ -0,0 +1,115 @@
+"""Measure /api/batch throughput against one request per object.
+
+Seeds a throwaway SQLite database with one owner, then runs 100k mixed
+operations through the batch endpoint: 2,000 farm creates, 30,000 crop and
+8,000 equipment creates, one update per row (40,000) and 20,000 deletes, sent as requests of
+REQUEST_SIZE operations. For comparison it times SAMPLE crop creates through
+POST /api/farm/<id>/crops and extrapolates.
+
+    python benchmarks/batch_throughput.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'batch_throughput.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, User, Farm, Crop, Equipment
+
+app = create_app({'AUTH_REQUIRED': False})
+
+FARMS = 2000
+CROPS = 30000
+EQUIPMENT = 8000
+DELETES = 20000
+REQUEST_SIZE = 10000
+SAMPLE = 500
+
+def build_operations(owner_id):
+    random.seed(7)
+    farm_ids = [str(uuid.uuid4()) for _ in range(FARMS)]
+    crop_ids = [str(uuid.uuid4()) for _ in range(CROPS)]
+    equipment_ids = [str(uuid.uuid4()) for _ in range(EQUIPMENT)]
+
+    operations = [
+        {'op': 'create', 'resource': 'farm', 'id': farm_id,
+         'data': {'name': f'Farm {i}', 'location': 'Valley', 'size': 40.0, 'owner_id': owner_id}}
+        for i, farm_id in enumerate(farm_ids)
+    ]
+    operations += [
+        {'op': 'create', 'resource': 'crop', 'id': crop_id,
+         'data': {'farm_id': random.choice(farm_ids), 'name': 'Wheat', 'area': 2.5, 'planted_date': '2026-03-01'}}
+        for crop_id in crop_ids
+    ]
+    operations += [
+        {'op': 'create', 'resource': 'equipment', 'id': equipment_id,
+         'data': {'farm_id': random.choice(farm_ids), 'name': 'Tractor', 'next_maintenance': '2026-12-01'}}
+        for equipment_id in equipment_ids
+    ]
+    # Every farm, crop and equipment row is updated once
+    operations += [
+        {'op': 'update', 'resource': 'farm', 'id': farm_id, 'data': {'size': 42.0}}
+        for farm_id in farm_ids
+    ]
+    operations += [
+        {'op': 'update', 'resource': 'crop', 'id': crop_id, 'data': {'status': 'Growing'}}
+        for crop_id in crop_ids
+    ]
+    operations += [
+        {'op': 'update', 'resource': 'equipment', 'id': equipment_id, 'data': {'status': 'Maintenance'}}
+        for equipment_id in equipment_ids
+    ]
+    operations += [
+        {'op': 'delete', 'resource': 'crop', 'id': crop_id}
+        for crop_id in random.sample(crop_ids, DELETES)
+    ]
+    return operations
+
+def main():
+    client = app.test_client()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        owner = User(name='Cooperative', email='coop@example.com', password_hash='x')
+        db.session.add(owner)
+        db.session.commit()
+        owner_id = owner.id
+
+    operations = build_operations(owner_id)
+
+    start = time.perf_counter()
+    failed = 0
+    for offset in range(0, len(operations), REQUEST_SIZE):
+        response = client.post('/api/batch/', json={'operations': operations[offset:offset + REQUEST_SIZE]})
+        assert response.status_code == 200, response.get_json()
+        failed += response.get_json()['failed']
+    batch_seconds = time.perf_counter() - start
+
+    with app.app_context():
+        counts = (Farm.query.count(), Crop.query.count(), Equipment.query.count())
+        farm_id = db.session.execute(db.select(Farm.id)).scalars().first()
+
+    assert failed == 0, f"{failed} operations failed"
+    assert counts == (FARMS, CROPS - DELETES, EQUIPMENT), counts
+
+    start = time.perf_counter()
+    for i in range(SAMPLE):
+        response = client.post(f'/api/farm/{farm_id}/crops', json={'name': f'Crop {i}', 'area': 1.0})
+        assert response.status_code == 201, response.get_json()
+    single_seconds = time.perf_counter() - start
+
+    total = len(operations)
+    single_rate = SAMPLE / single_seconds
+    print(f"batch:  {total} operations in {batch_seconds:.1f}s ({total / batch_seconds:,.0f} ops/s)")
+    print(f"single: {SAMPLE} creates in {single_seconds:.1f}s ({single_rate:,.0f} ops/s, "
+          f"~{total / single_rate:.0f}s for {total})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Spatial farm queries on the grid index against a naive scan.
+
+Seeds a throwaway SQLite database with 1,000,000 farms scattered over a
+1,000 by 2,000 km region (a few farms per grid cell), then times through the
+test client, each as the median over QUERIES random points:
+
+  bbox      GET /api/farm/bbox for a 20 km box
+  within    GET /api/farm/within for farms within 50 km, nearest 100
+  nearest   GET /api/farm/nearest for the 10 closest farms
+  sparse    the same from points 1,800 to 4,600 km away from every farm, where
+            the search widens until it reaches the region
+
+and compares them with a naive scan that reads every farm's coordinates and
+computes each distance, as the app had to do before farms had an index.
+
+    python benchmarks/farm_geo.py
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'farm_geo.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+# Seeding a million rows is meant to be slow; keep it out of the slow-query log
+os.environ['SLOW_QUERY_MS'] = '60000'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+from app import create_app
+from models import db, generate_uuid, User, Farm
+from geo import distance_km, grid_values
+
+app = create_app({'AUTH_REQUIRED': False})
+
+FARMS = 1_000_000
+INSERT_CHUNK = 50_000
+REGION = (36.0, 45.0, -5.0, 20.0)
+# In the Atlantic and the Sahara, south-west of REGION
+SPARSE_REGION = (10.0, 20.0, -40.0, 10.0)
+QUERIES = 51
+NAIVE_QUERIES = 3
+
+def seed():
+    db.drop_all()
+    db.create_all()
+
+    owner = User(name='Registry', email='registry@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+
+    rng = random.Random(24)
+    south, north, west, east = REGION
+    for start in range(0, FARMS, INSERT_CHUNK):
+        rows = []
+        for i in range(start, min(start + INSERT_CHUNK, FARMS)):
+            latitude, longitude = rng.uniform(south, north), rng.uniform(west, east)
+            rows.append(grid_values({
+                'id': generate_uuid(), 'name': f'Farm {i}', 'location': 'Region', 'size': 20.0,
+                'owner_id': owner.id, 'latitude': latitude, 'longitude': longitude,
+            }))
+        db.session.execute(Farm.__table__.insert(), rows)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+def points(count, seed, region=REGION):
+    rng = random.Random(seed)
+    south, north, west, east = region
+    return [(rng.uniform(south, north), rng.uniform(west, east)) for _ in range(count)]
+
+def median_ms(send, count, seed, region=REGION):
+    timings = []
+    for latitude, longitude in points(count, seed, region):
+        started = time.perf_counter()
+        response = send(latitude, longitude)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_json()
+    return statistics.median(timings)
+
+def naive_nearest(latitude, longitude, k=10):
+    rows = db.session.execute(select(Farm.id, Farm.latitude, Farm.longitude)).all()
+    return sorted((distance_km(latitude, longitude, lat, lon), farm_id) for farm_id, lat, lon in rows)[:k]
+
+def main():
+    with app.app_context():
+        started = time.perf_counter()
+        seed()
+        print(f"seeded {FARMS} farms in {time.perf_counter() - started:.1f} s")
+
+    client = app.test_client()
+    box = 0.09  # about 10 km either side
+    print(f"bbox     {median_ms(lambda lat, lon: client.get(f'/api/farm/bbox?min_lat={lat - box}&min_lon={lon - box}&max_lat={lat + box}&max_lon={lon + box}'), QUERIES, 1):8.2f} ms")
+    print(f"within   {median_ms(lambda lat, lon: client.get(f'/api/farm/within?lat={lat}&lon={lon}&radius_km=50'), QUERIES, 2):8.2f} ms")
+    print(f"nearest  {median_ms(lambda lat, lon: client.get(f'/api/farm/nearest?lat={lat}&lon={lon}&k=10'), QUERIES, 3):8.2f} ms")
+    print(f"sparse   {median_ms(lambda lat, lon: client.get(f'/api/farm/nearest?lat={lat}&lon={lon}&k=10'), QUERIES, 4, SPARSE_REGION):8.2f} ms")
+
+    with app.app_context():
+        timings = []
+        for latitude, longitude in points(NAIVE_QUERIES, 3):
+            started = time.perf_counter()
+            naive_nearest(latitude, longitude)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"naive    {statistics.median(timings):8.2f} ms  (nearest 10 by scanning every farm)")
+
+if __name__ == '__main__':
+    main()
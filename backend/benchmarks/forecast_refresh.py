@@ -0,0 +1,98 @@
+"""Full and incremental harvest forecast refreshes over many crops.
+
+Seeds a throwaway SQLite database with 1,000 farms and 100k crops, then times:
+
+  full         refresh_forecasts(full=True) over every crop
+  incremental  refresh_forecasts() after updating 1% of the crops
+  noop         refresh_forecasts() with nothing changed
+  aggregate    weekly_forecast() per farm, region and crop name
+
+The incremental runs are timed with the watermark lookback set to zero, so
+only the crops touched since the previous run are recomputed.
+
+    python benchmarks/forecast_refresh.py
+"""
+from datetime import date, datetime, timedelta
+import os
+import random
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'forecast_refresh.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, update
+from app import create_app
+from models import db, generate_uuid, User, Farm, Crop
+import forecasting
+
+app = create_app({'AUTH_REQUIRED': False})
+
+FARMS = 1000
+CROPS = 100000
+CHANGED = CROPS // 100
+NAMES = ['Wheat', 'Maize', 'Rice', 'Soybean', 'Potato', 'Tomato', 'Lettuce', 'Sunflower']
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+
+def seed():
+    db.drop_all()
+    db.create_all()
+
+    owner = User(name='Owner', email='owner@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+
+    farm_ids = [generate_uuid() for _ in range(FARMS)]
+    db.session.execute(insert(Farm), [
+        {'id': farm_id, 'name': f'Farm {i}', 'location': REGIONS[i % len(REGIONS)], 'size': 100.0,
+         'owner_id': owner.id}
+        for i, farm_id in enumerate(farm_ids)
+    ])
+
+    today = date.today()
+    rng = random.Random(20)
+    crop_ids = [generate_uuid() for _ in range(CROPS)]
+    db.session.execute(insert(Crop), [
+        {'id': crop_id, 'farm_id': farm_ids[i % FARMS], 'name': NAMES[i % len(NAMES)],
+         'area': rng.uniform(0.5, 20.0), 'status': 'Harvested' if i % 10 == 0 else 'Growing',
+         'planted_date': today - timedelta(days=rng.randint(-30, 150))}
+        for i, crop_id in enumerate(crop_ids)
+    ])
+    db.session.commit()
+    return crop_ids
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    with app.app_context():
+        crop_ids = seed()
+        forecasting.WATERMARK_LOOKBACK = timedelta(0)
+
+        count, elapsed = timed(lambda: forecasting.refresh_forecasts(full=True))
+        print(f"full         {count:>7} crops  {elapsed:8.1f} ms")
+
+        # Let the clock move past the watermark before touching crops
+        time.sleep(0.01)
+        changed = random.Random(21).sample(crop_ids, CHANGED)
+        db.session.execute(update(Crop), [
+            {'id': crop_id, 'area': 5.0, 'updated_at': datetime.utcnow()} for crop_id in changed
+        ])
+        db.session.commit()
+
+        count, elapsed = timed(forecasting.refresh_forecasts)
+        print(f"incremental  {count:>7} crops  {elapsed:8.1f} ms")
+
+        count, elapsed = timed(forecasting.refresh_forecasts)
+        print(f"noop         {count:>7} crops  {elapsed:8.1f} ms")
+
+        for group in forecasting.GROUPS:
+            result, elapsed = timed(lambda: forecasting.weekly_forecast(group))
+            print(f"aggregate    {group:<7} {len(result['series']):>5} series  {elapsed:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Insert throughput with random and time-ordered ids, stored as strings or bytes.
+
+For each combination of ID_FORMAT (uuid4, uuid7) and ID_STORAGE (string,
+binary), a fresh interpreter seeds a throwaway SQLite database with 200 farms
+and inserts ROWS soil readings in chunks of CHUNK, one executemany INSERT and
+commit per chunk as soil_ingest does. It prints the rows per second over the
+first and the last tenth of the inserts, overall, and the database size.
+Each run then places an order through the API, so queries that compare ids
+from a request with the stored ones are checked under every storage.
+
+Random ids scatter each insert across the primary key index, so once the index
+outgrows the page cache most inserts read a page from disk; time-ordered ids
+always append to its right edge.
+
+    python benchmarks/id_inserts.py [--rows 2000000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = [('uuid4', 'string'), ('uuid7', 'string'), ('uuid4', 'binary'), ('uuid7', 'binary')]
+
+INSERTS = """
+import os, random, sys, tempfile, time
+from datetime import date
+
+db_path = os.path.join(tempfile.mkdtemp(), 'id_inserts.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+# Inserting millions of rows is meant to be slow; keep it out of the slow-query log
+os.environ['SLOW_QUERY_MS'] = '60000'
+
+from sqlalchemy import insert
+from app import create_app
+from models import db, generate_uuid, User, Farm, Product, SoilRecord
+
+rows, chunk = int(sys.argv[1]), int(sys.argv[2])
+app = create_app({'AUTH_REQUIRED': False})
+with app.app_context():
+    db.create_all()
+    owner = User(name='Sensors', email='sensors@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+    farm_ids = [generate_uuid() for _ in range(200)]
+    db.session.execute(insert(Farm), [
+        {'id': farm_id, 'name': 'Farm', 'location': 'Region', 'size': 20.0, 'owner_id': owner.id}
+        for farm_id in farm_ids
+    ])
+    db.session.commit()
+
+    rng = random.Random(25)
+    timings = []
+    for _ in range(0, rows, chunk):
+        values = [{
+            'id': generate_uuid(), 'farm_id': rng.choice(farm_ids), 'ph': 6.5, 'nitrogen': 20.0,
+            'phosphorus': 15.0, 'potassium': 30.0, 'organic_matter': 3.0, 'record_date': date(2026, 10, 1),
+        } for _ in range(chunk)]
+        started = time.perf_counter()
+        db.session.execute(insert(SoilRecord), values)
+        db.session.commit()
+        timings.append(time.perf_counter() - started)
+
+    products = [Product(name='Seed', price=2.5, category='Seeds', stock_quantity=10) for _ in range(3)]
+    db.session.add_all(products)
+    db.session.commit()
+    items = [{'product_id': product.id, 'quantity': 2} for product in products]
+    owner_id = owner.id
+
+response = app.test_client().post('/api/orders/', json={'user_id': owner_id, 'items': items})
+if response.status_code != 201:
+    sys.exit(f'Placing an order failed: {response.status_code} {response.get_data(as_text=True)}')
+
+tenth = max(1, len(timings) // 10)
+print(chunk * tenth / sum(timings[:tenth]), chunk * tenth / sum(timings[-tenth:]),
+      chunk * len(timings) / sum(timings), os.path.getsize(db_path))
+"""
+
+def run(id_format, storage, rows, chunk):
+    env = dict(os.environ, ID_FORMAT=id_format, ID_STORAGE=storage)
+    result = subprocess.run([sys.executable, '-c', INSERTS, str(rows), str(chunk)], cwd=BACKEND, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f"{id_format} {storage}: {result.stderr.strip().splitlines()[-1]}")
+    first, last, overall, size = result.stdout.split()[-4:]
+    return float(first), float(last), float(overall), int(size)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunk', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{args.rows} soil readings, {args.chunk} per INSERT, rows/s")
+    print(f"{'ids':<16} {'first 10%':>10} {'last 10%':>10} {'overall':>10} {'db size':>10}")
+    for id_format, storage in CONFIGURATIONS:
+        first, last, overall, size = run(id_format, storage, args.rows, args.chunk)
+        print(f"{id_format + ' ' + storage:<16} {first:>10,.0f} {last:>10,.0f} {overall:>10,.0f} {size / 2**20:>7.0f} MiB")
+
+if __name__ == '__main__':
+    main()
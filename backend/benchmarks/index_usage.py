@@ -0,0 +1,119 @@
+"""Check that the main queries are planned on the intended indexes.
+
+Migrates a throwaway SQLite database to head (or uses INDEX_CHECK_URL, which
+must point at a database already migrated to head), runs EXPLAIN for each
+query below and exits non-zero if a plan does not mention its index. On
+Postgres sequential scans are disabled for the check, so the result does not
+depend on table sizes.
+
+    python benchmarks/index_usage.py
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+CHECK_URL = os.getenv('INDEX_CHECK_URL')
+if not CHECK_URL:
+    CHECK_URL = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'index_usage.db')
+os.environ['DATABASE_URL'] = CHECK_URL
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from app import create_app, upgrade_database
+from models import db, Product, SoilRecord, Crop, Equipment, Order, User
+from maintenance import get_due_equipment
+from routes.farm import latest_soil_query
+from serializers import product_serializer
+
+app = create_app({'AUTH_REQUIRED': False})
+
+def checks():
+    """(description, query or select, index the plan must use)"""
+    products = product_serializer.select()
+    return [
+        ('products by category, price sort',
+         products.where(Product.category == 'Seeds').order_by(Product.price.asc(), Product.id.asc()),
+         'idx_products_category_price'),
+        ('products by category, name sort',
+         products.where(Product.category == 'Seeds').order_by(Product.name.asc(), Product.id.asc()),
+         'idx_products_category_name'),
+        ('products by price, descending',
+         products.order_by(Product.price.desc(), Product.id.desc()).limit(20),
+         'idx_products_price'),
+        ('products by name',
+         products.order_by(Product.name.asc(), Product.id.asc()).limit(20),
+         'idx_products_name'),
+        ('latest soil record per farm',
+         latest_soil_query(['farm-1', 'farm-2']),
+         'idx_soil_records_farm_date'),
+        ('soil history range',
+         SoilRecord.query.filter(SoilRecord.farm_id == 'farm-1', SoilRecord.record_date >= date(2026, 1, 1))
+         .order_by(SoilRecord.record_date.asc()),
+         'idx_soil_records_farm_date'),
+        ('crops of a farm',
+         Crop.query.filter_by(farm_id='farm-1'),
+         'idx_crops_farm'),
+        ('equipment due',
+         get_due_equipment(7),
+         'idx_equipment_due'),
+        ('equipment due by status',
+         get_due_equipment(7, status='Operational'),
+         'idx_equipment_status_next_maintenance'),
+        ('orders of a user',
+         Order.query.filter(Order.user_id == 'user-1').order_by(Order.order_date.desc(), Order.id.desc()).limit(50),
+         'idx_orders_user_date'),
+        ('login by email',
+         User.query.filter_by(email='farmer@example.com'),
+         'users'),
+    ]
+
+@contextmanager
+def explained(engine):
+    """Prefix every statement with EXPLAIN while active."""
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+
+    def to_explain(conn, cursor, statement, parameters, context, executemany):
+        return prefix + statement, parameters
+
+    event.listen(engine, 'before_cursor_execute', to_explain, retval=True)
+    try:
+        yield
+    finally:
+        event.remove(engine, 'before_cursor_execute', to_explain)
+
+def plan_text(connection, statement):
+    if hasattr(statement, 'statement'):
+        statement = statement.statement
+    rows = connection.execute(statement).fetchall()
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+def main():
+    if not os.getenv('INDEX_CHECK_URL'):
+        upgrade_database(app)
+
+    failed = False
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql':
+                connection.execute(text('SET enable_seqscan = off'))
+
+            for description, statement, index in checks():
+                with explained(engine):
+                    plan = plan_text(connection, statement)
+
+                # users.email is looked up through its UNIQUE constraint's index,
+                # whose name depends on the database
+                used = index in plan if index != 'users' else ('INDEX' in plan.upper() and 'users' in plan)
+                status = 'ok' if used else 'MISSING'
+                failed = failed or not used
+                print(f"{status:<8} {description:<34} {index}")
+                if not used:
+                    print('         ' + plan.replace('\n', '\n         '))
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Check that listing orders runs a fixed number of SQL statements.
+
+Seeds a throwaway SQLite database with increasing numbers of orders and lines,
+counts the statements behind GET /api/orders/ for each size and exits non-zero
+if the count grows with the number of rows.
+
+    python benchmarks/order_queries.py
+"""
+import os
+import sys
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'order_queries.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, User, Product, Order, OrderItem
+from query_counter import count_queries
+
+app = create_app({'AUTH_REQUIRED': False})
+
+SIZES = [(1, 1), (10, 3), (100, 5)]
+
+def seed(orders, lines):
+    db.drop_all()
+    db.create_all()
+
+    user = User(name='Buyer', email='buyer@example.com', password_hash='x')
+    products = [Product(name=f'Product {i}', price=1.0 + i, category='Seeds') for i in range(lines)]
+    db.session.add(user)
+    db.session.add_all(products)
+    db.session.flush()
+
+    for _ in range(orders):
+        order = Order(user_id=user.id, total_amount=0)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all(
+            OrderItem(order_id=order.id, product_id=product.id, quantity=1, price=product.price)
+            for product in products
+        )
+
+    db.session.commit()
+    return user.id
+
+def main():
+    client = app.test_client()
+    counts = {}
+
+    for orders, lines in SIZES:
+        with app.app_context():
+            user_id = seed(orders, lines)
+
+            for label, url in [('user', f'/api/orders/?user_id={user_id}&limit=200'),
+                               ('admin', '/api/orders/?limit=200')]:
+                with count_queries(db.engine) as statements:
+                    response = client.get(url)
+                assert response.status_code == 200, response.get_json()
+                assert len(response.get_json()) == orders
+
+                counts.setdefault(label, []).append(len(statements))
+                print(f"{label:5} orders={orders:4} lines/order={lines} queries={len(statements)}")
+
+    for label, values in counts.items():
+        if len(set(values)) != 1:
+            raise SystemExit(f"{label} listing query count grows with rows: {values}")
+
+if __name__ == '__main__':
+    main()
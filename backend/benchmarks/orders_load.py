@@ -0,0 +1,87 @@
+"""Concurrent checkout load test against a running server.
+
+Creates one hot product and many buyers, then has every buyer place orders for
+that product at the same time. Reports throughput and checks that stock was
+never oversold.
+
+    python benchmarks/orders_load.py --url http://localhost:5000 --buyers 50
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+def call(url, method='GET', body=None, token=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    req = urllib.request.Request(url, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.loads(response.read() or b'null')
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'null')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--buyers', type=int, default=50)
+    parser.add_argument('--orders', type=int, default=20, help='orders per buyer')
+    parser.add_argument('--stock', type=int, default=500)
+    args = parser.parse_args()
+
+    api = args.url.rstrip('/') + '/api'
+
+    buyers = []
+    for _ in range(args.buyers):
+        credentials = {'email': f'buyer-{uuid.uuid4().hex}@example.com', 'password': 'load-test-password'}
+        status, user = call(f'{api}/users/register', 'POST', {'name': 'Buyer', **credentials})
+        assert status == 201, user
+        status, session = call(f'{api}/users/login', 'POST', credentials)
+        assert status == 200, session
+        buyers.append((user['id'], session['access_token']))
+
+    status, product = call(f'{api}/products/', 'POST', {
+        'name': 'Load test seed', 'price': 9.99, 'category': 'Seeds',
+        'stock_quantity': args.stock
+    }, token=buyers[0][1])
+    assert status == 201, product
+
+    def buyer(credentials):
+        user_id, token = credentials
+        results = []
+        for _ in range(args.orders):
+            status, _ = call(f'{api}/orders/', 'POST', {
+                'user_id': user_id,
+                'items': [{'product_id': product['id'], 'quantity': 1}]
+            }, token=token)
+            results.append(status)
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.buyers) as pool:
+        statuses = [status for results in pool.map(buyer, buyers) for status in results]
+    elapsed = time.perf_counter() - started
+
+    placed = statuses.count(201)
+    rejected = statuses.count(409)
+    errors = len(statuses) - placed - rejected
+
+    # Bypass any cached copy of the product
+    _, final = call(f"{api}/products/{product['id']}?fresh={uuid.uuid4().hex}")
+    expected_stock = args.stock - placed
+
+    print(f"buyers={args.buyers} requests={len(statuses)} elapsed={elapsed:.2f}s "
+          f"throughput={len(statuses) / elapsed:.1f} req/s")
+    print(f"placed={placed} out_of_stock={rejected} errors={errors}")
+    print(f"final stock={final['stock_quantity']} expected={expected_stock}")
+
+    if final['stock_quantity'] != expected_stock or final['stock_quantity'] < 0:
+        raise SystemExit('Stock mismatch: orders were oversold or lost')
+
+if __name__ == '__main__':
+    main()
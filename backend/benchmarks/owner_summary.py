@@ -0,0 +1,95 @@
+"""Owner dashboard latency from summaries versus child collections.
+
+Seeds a throwaway SQLite database with one cooperative owning 5,000 farms,
+each with crops, equipment and soil readings, fills the summary tables, then
+times through the test client:
+
+  dashboard    GET /api/farm/dashboard (farms with every child collection)
+  summary      GET /api/farm/summary (owner totals plus the first page of farms)
+  full page    the same with the largest page size (1,000 farms)
+  write        POST /api/farm/<id>/crops, which also refreshes the summaries
+
+Each figure is the median of REPEAT requests.
+
+    python benchmarks/owner_summary.py
+"""
+from datetime import date, timedelta
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'owner_summary.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app
+from models import db, generate_uuid, User, Farm, Crop, SoilRecord, Equipment
+from routes.farm import MAX_SUMMARY_PAGE_SIZE
+from summaries import rebuild_summaries
+
+app = create_app({'AUTH_REQUIRED': False})
+
+FARMS = 5000
+CROPS_PER_FARM = 4
+EQUIPMENT_PER_FARM = 2
+READINGS_PER_FARM = 10
+REPEAT = 9
+
+def seed():
+    db.drop_all()
+    db.create_all()
+
+    owner = User(name='Cooperative', email='coop@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+
+    farm_ids = [generate_uuid() for _ in range(FARMS)]
+    db.session.execute(insert(Farm), [
+        {'id': farm_id, 'name': f'Farm {i:05d}', 'location': 'Valley', 'size': 50.0, 'owner_id': owner.id}
+        for i, farm_id in enumerate(farm_ids)
+    ])
+    db.session.execute(insert(Crop), [
+        {'id': generate_uuid(), 'farm_id': farm_id, 'name': 'Wheat', 'area': 5.0,
+         'status': 'Harvested' if i == 0 else 'Growing'}
+        for farm_id in farm_ids for i in range(CROPS_PER_FARM)
+    ])
+    db.session.execute(insert(Equipment), [
+        {'id': generate_uuid(), 'farm_id': farm_id, 'name': f'Tractor {i}',
+         'status': 'Repair' if i == 0 else 'Operational', 'next_maintenance': date.today() + timedelta(days=30)}
+        for farm_id in farm_ids for i in range(EQUIPMENT_PER_FARM)
+    ])
+    db.session.execute(insert(SoilRecord), [
+        {'id': generate_uuid(), 'farm_id': farm_id, 'ph': 6.0 + i / 10, 'nitrogen': 30.0, 'phosphorus': 20.0,
+         'potassium': 150.0, 'organic_matter': 3.0, 'record_date': date.today() - timedelta(days=30 * i)}
+        for farm_id in farm_ids for i in range(READINGS_PER_FARM)
+    ])
+    db.session.commit()
+
+    rebuild_summaries(db.session)
+    db.session.commit()
+    return owner.id, farm_ids
+
+def median_ms(send):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        response = send()
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code < 300, response.get_json()
+    return statistics.median(timings)
+
+def main():
+    with app.app_context():
+        owner_id, farm_ids = seed()
+
+    client = app.test_client()
+    print(f"dashboard  {median_ms(lambda: client.get(f'/api/farm/dashboard?owner_id={owner_id}')):8.1f} ms")
+    print(f"summary    {median_ms(lambda: client.get(f'/api/farm/summary?owner_id={owner_id}')):8.1f} ms")
+    print(f"full page  {median_ms(lambda: client.get(f'/api/farm/summary?owner_id={owner_id}&limit={MAX_SUMMARY_PAGE_SIZE}')):8.1f} ms")
+    print(f"write      {median_ms(lambda: client.post(f'/api/farm/{farm_ids[0]}/crops', json={'name': 'Oats', 'area': 1})):8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Memory and latency of read-only projections for large listings.
+
+Seeds a throwaway SQLite database with 10k and then 100k farms and products
+and builds the GET /api/farm/ and GET /api/products/ response bodies two ways:
+
+  orm         Model.query.all(), to_dict() per row, default JSON provider
+  projection  serializer.fetch_dicts() column rows, JSONProvider
+
+Latency is the best of REPEAT runs; peak memory is measured with tracemalloc in
+a separate run, so tracing does not distort the timings.
+
+    python benchmarks/projection_memory.py
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'projection_memory.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+from app import create_app
+from json_provider import JSONProvider
+from models import db, generate_uuid, User, Farm, Product
+from serializers import farm_serializer, product_serializer
+
+app = create_app({'AUTH_REQUIRED': False})
+
+SIZES = [10000, 100000]
+REPEAT = 3
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+
+    owner = User(name='Owner', email='owner@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+
+    db.session.execute(insert(Farm), [
+        {'id': generate_uuid(), 'name': f'Farm {i}', 'location': 'North Field', 'size': 10.0 + i % 300,
+         'owner_id': owner.id}
+        for i in range(rows)
+    ])
+    db.session.execute(insert(Product), [
+        {'id': generate_uuid(), 'name': f'Seed pack {i}', 'description': 'Certified seed', 'price': 1.5 + i % 200,
+         'category': 'Seeds', 'stock_quantity': i % 1000}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+def measure(build):
+    best = float('inf')
+    for _ in range(REPEAT):
+        db.session.expunge_all()
+        gc.collect()
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+
+    db.session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    body = build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak, body
+
+def main():
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = JSONProvider(app)
+
+    listings = [('farms', Farm, farm_serializer), ('products', Product, product_serializer)]
+
+    print(f"{'listing':<10} {'rows':>7} {'approach':<11} {'latency':>10} {'peak memory':>12}")
+    with app.app_context():
+        for rows in SIZES:
+            seed(rows)
+
+            for name, model, serializer in listings:
+                results = {
+                    'orm': measure(lambda: default_provider.response(
+                        [row.to_dict() for row in model.query.all()]).get_data()),
+                    'projection': measure(lambda: fast_provider.response(
+                        serializer.fetch_dicts(model.query)).get_data()),
+                }
+                assert results['orm'][2] == results['projection'][2], f"{name}: response bodies differ"
+
+                for approach, (seconds, peak, _) in results.items():
+                    print(f"{name:<10} {rows:>7} {approach:<11} {seconds * 1000:>8.0f}ms {peak / 2 ** 20:>10.1f}MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Compare the serializer + orjson path with to_dict + the default JSON provider.
+
+Seeds a throwaway SQLite database with ROWS rows per model, then for each model
+times loading the rows, building dicts and encoding the response both ways. It
+exits non-zero if the two response bodies differ by a single byte, or if a
+model's rows do not take the orjson path.
+
+    python benchmarks/serialization.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'serialization.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from json_provider import JSONProvider
+from models import db, User, Farm, Crop, Equipment, Product
+from serializers import farm_serializer, crop_serializer, equipment_serializer, product_serializer
+
+app = create_app({'AUTH_REQUIRED': False})
+
+ROWS = int(os.getenv('BENCH_ROWS', '20000'))
+REPEAT = 5
+
+MODELS = [
+    ('farm', Farm, farm_serializer),
+    ('crop', Crop, crop_serializer),
+    ('equipment', Equipment, equipment_serializer),
+    ('product', Product, product_serializer),
+]
+
+def seed():
+    random.seed(3)
+    db.drop_all()
+    db.create_all()
+
+    owner = User(name='Owner', email='owner@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+
+    farms = [Farm(name=f'Farm {i}', location='North Field', size=round(random.uniform(1, 500), 2), owner_id=owner.id)
+             for i in range(ROWS)]
+    db.session.add_all(farms)
+    db.session.flush()
+
+    start = date(2026, 1, 1)
+    db.session.add_all(
+        Crop(farm_id=farms[i % len(farms)].id, name='Maize', area=random.uniform(0.1, 50),
+             planted_date=start + timedelta(days=i % 90),
+             harvest_date=start + timedelta(days=120 + i % 90) if i % 3 else None)
+        for i in range(ROWS)
+    )
+    db.session.add_all(
+        Equipment(farm_id=farms[i % len(farms)].id, name='Tractor',
+                  last_maintenance=start + timedelta(days=i % 60) if i % 2 else None,
+                  next_maintenance=start + timedelta(days=180 + i % 60))
+        for i in range(ROWS)
+    )
+    db.session.add_all(
+        Product(name=f'Seed pack {i}', description='Certified seed', price=round(random.uniform(1, 200), 2),
+                category='Seeds', stock_quantity=random.randint(0, 1000), image_url=None)
+        for i in range(ROWS)
+    )
+    db.session.commit()
+
+def best_of(function):
+    best = float('inf')
+    for _ in range(REPEAT):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = JSONProvider(app)
+
+    with app.app_context():
+        seed()
+        print(f"{'model':<10} {'to_dict+json':>13} {'serializer+orjson':>18} {'speedup':>8}")
+
+        failed = False
+        for name, model, serializer in MODELS:
+            old_seconds, old = best_of(
+                lambda: default_provider.response([row.to_dict() for row in model.query.all()]).get_data())
+            new_seconds, new = best_of(
+                lambda: fast_provider.response(serializer.fetch_dicts(model.query)).get_data())
+
+            if old != new:
+                failed = True
+                print(f"{name}: response bodies differ")
+
+            # Ordinary rows, ids included, must not be sent through the json fallback
+            if fast_provider.fast_dumps(serializer.fetch_dicts(model.query)) is None:
+                failed = True
+                print(f"{name}: fell back to json")
+
+            print(f"{name:<10} {old_seconds * 1000:>11.1f}ms {new_seconds * 1000:>16.1f}ms {old_seconds / new_seconds:>7.1f}x")
+
+        # Values orjson formats differently must fall back to json unchanged
+        awkward = [{'name': 'Café ñandú', 'ph': 1e-05, 'big': 1.5e16, 'n': 2 ** 70, 'd': date(2026, 5, 1)},
+                   {1: 'int key', 2: 'tab\there \x7f'}]
+        if default_provider.response(awkward).get_data().replace(b'"Fri, 01 May 2026 00:00:00 GMT"', b'"2026-05-01"') \
+                != fast_provider.response(awkward).get_data():
+            failed = True
+            print("fallback: response bodies differ")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""HTTP load generator for comparing serving modes.
+
+Sends GET requests from a pool of client threads for a fixed duration and
+reports requests per second and latency percentiles. Run it against the dev
+server and against gunicorn with the same arguments:
+
+    python app.py                                   # dev server on :5000
+    gunicorn -c gunicorn.conf.py wsgi:app           # production on :8000
+
+    python benchmarks/serve_load.py --url http://localhost:5000/api/products/
+    python benchmarks/serve_load.py --url http://localhost:8000/api/products/
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import http.client
+import time
+import urllib.parse
+
+def worker(url, deadline, headers):
+    parsed = urllib.parse.urlsplit(url)
+    path = parsed.path + (f'?{parsed.query}' if parsed.query else '')
+    latencies = []
+    errors = 0
+    connection = http.client.HTTPConnection(parsed.netloc, timeout=30)
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(parsed.netloc, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+    connection.close()
+    return latencies, errors
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:5000/api/products/')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--token', help='access token for protected endpoints')
+    args = parser.parse_args()
+
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    deadline = time.perf_counter() + args.duration
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: worker(args.url, deadline, headers), range(args.concurrency)))
+
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    errors = sum(worker_errors for _, worker_errors in results)
+
+    print(f"url={args.url} concurrency={args.concurrency} duration={args.duration:.0f}s")
+    print(f"requests={len(latencies)} errors={errors} throughput={len(latencies) / args.duration:.1f} req/s")
+    print(f"latency p50={percentile(latencies, 0.5) * 1000:.1f} ms "
+          f"p90={percentile(latencies, 0.9) * 1000:.1f} ms "
+          f"p99={percentile(latencies, 0.99) * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
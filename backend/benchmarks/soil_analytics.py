@@ -0,0 +1,53 @@
+"""Benchmark the vectorized soil analytics core on synthetic farms.
+
+Times analytics.compute for growing numbers of farms, with a fixed number of
+readings per farm, and prints the cost per farm, which should stay roughly flat.
+
+    python benchmarks/soil_analytics.py --readings 24
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import compute
+
+def synthetic(farms, readings, rng):
+    starts = np.arange(farms) * readings
+    days = np.tile(np.arange(readings, dtype=np.float64) * 30 + 738000, farms)
+    values = np.column_stack([
+        rng.uniform(5.0, 8.0, farms * readings),
+        rng.uniform(10, 60, farms * readings),
+        rng.uniform(5, 40, farms * readings),
+        rng.uniform(80, 220, farms * readings),
+        rng.uniform(1, 5, farms * readings)
+    ])
+    area = rng.uniform(1, 500, farms)
+    return starts, days, values, area
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readings', type=int, default=24, help='readings per farm')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    for farms in [1000, 10000, 100000]:
+        data = synthetic(farms, args.readings, rng)
+
+        best = float('inf')
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            compute(*data)
+            best = min(best, time.perf_counter() - started)
+
+        print(f"farms={farms:7} readings={farms * args.readings:9} "
+              f"time={best * 1000:8.1f} ms  per_farm={best / farms * 1e6:6.2f} us")
+
+if __name__ == '__main__':
+    main()
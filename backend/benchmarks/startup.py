@@ -0,0 +1,82 @@
+"""Startup time budget check.
+
+Measures, in fresh interpreters:
+  * the import cost of the app module (python -X importtime)
+  * the time from process start to the first served request
+
+and exits non-zero when the median of several runs exceeds its budget.
+
+    python benchmarks/startup.py --import-budget-ms 800 --first-request-budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = """
+import time
+started = time.perf_counter()
+from app import create_app
+app = create_app({'AUTH_REQUIRED': False})
+response = app.test_client().get('/api/farm/equipment/alerts')
+assert response.status_code == 200, response.status_code
+print((time.perf_counter() - started) * 1000)
+"""
+
+def run_python(args):
+    env = dict(os.environ, DATABASE_URL=os.getenv('DATABASE_URL', 'sqlite://'))
+    return subprocess.run([sys.executable, *args], cwd=BACKEND, env=env,
+                          capture_output=True, text=True, check=True)
+
+def import_profile():
+    """Return the app import time in ms and the modules with the highest self time."""
+    stderr = run_python(['-X', 'importtime', '-c', 'import app']).stderr
+    modules = []
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+
+    total = next(cumulative for _, cumulative, name in modules if name == 'app')
+    return total / 1000, sorted(modules, reverse=True)[:10]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=800)
+    parser.add_argument('--first-request-budget-ms', type=float, default=1500)
+    args = parser.parse_args()
+
+    import_times = []
+    slowest = []
+    for _ in range(args.runs):
+        total, slowest = import_profile()
+        import_times.append(total)
+
+    first_requests = [float(run_python(['-c', FIRST_REQUEST]).stdout.strip().splitlines()[-1])
+                      for _ in range(args.runs)]
+
+    import_ms = statistics.median(import_times)
+    first_request_ms = statistics.median(first_requests)
+
+    print("slowest modules (self ms):")
+    for self_us, _, name in slowest:
+        print(f"  {self_us / 1000:8.1f}  {name}")
+    print(f"import app:     {import_ms:8.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"first request:  {first_request_ms:8.1f} ms (budget {args.first_request_budget_ms:.0f} ms)")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append('import time')
+    if first_request_ms > args.first_request_budget_ms:
+        failures.append('time to first request')
+    if failures:
+        raise SystemExit(f"Startup budget exceeded: {', '.join(failures)}")
+
+if __name__ == '__main__':
+    main()
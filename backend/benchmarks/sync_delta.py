@@ -0,0 +1,162 @@
+"""Delta sync against a full download for an offline field device.
+
+Seeds a throwaway SQLite database with one owner's 2,000 farms, each with
+crops, equipment and soil readings, then measures the time and bytes on the
+wire through the test client for:
+
+  dashboard    GET /api/farm/dashboard, every farm with its crops, equipment
+               and latest soil reading, downloaded in full
+  full sync    GET /api/sync pages until has_more is false, gzipped
+  delta        GET /api/sync with the token from the full sync after 1% of
+               the crops were updated and a few machines deleted
+  push         POST /api/sync with 100 gzipped crop updates
+
+The delta runs are timed with the watermark lookback set to zero, so only the
+rows changed since the previous pull are sent.
+
+    python benchmarks/sync_delta.py
+"""
+from datetime import date, datetime, timedelta
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'sync_delta.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text, update
+from app import create_app
+from models import db, generate_uuid, User, Farm, Crop, SoilRecord, Equipment
+from batch_ops import run_batch
+import sync
+
+app = create_app({'AUTH_REQUIRED': False})
+
+FARMS = 2000
+CROPS_PER_FARM = 4
+EQUIPMENT_PER_FARM = 2
+READINGS_PER_FARM = 10
+CHANGED = FARMS * CROPS_PER_FARM // 100
+DELETED = 20
+PUSHED = 100
+PAGE_SIZE = sync.MAX_LIMIT
+
+def seed():
+    db.drop_all()
+    db.create_all()
+
+    owner = User(name='Cooperative', email='coop@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+
+    farm_ids = [generate_uuid() for _ in range(FARMS)]
+    db.session.execute(insert(Farm), [
+        {'id': farm_id, 'name': f'Farm {i:05d}', 'location': 'Valley', 'size': 50.0, 'owner_id': owner.id}
+        for i, farm_id in enumerate(farm_ids)
+    ])
+    crop_ids = [generate_uuid() for _ in range(FARMS * CROPS_PER_FARM)]
+    db.session.execute(insert(Crop), [
+        {'id': crop_id, 'farm_id': farm_ids[i % FARMS], 'name': 'Wheat', 'area': 5.0, 'status': 'Growing',
+         'planted_date': date.today() - timedelta(days=30)}
+        for i, crop_id in enumerate(crop_ids)
+    ])
+    equipment_ids = [generate_uuid() for _ in range(FARMS * EQUIPMENT_PER_FARM)]
+    db.session.execute(insert(Equipment), [
+        {'id': equipment_id, 'farm_id': farm_ids[i % FARMS], 'name': f'Tractor {i}', 'status': 'Operational',
+         'next_maintenance': date.today() + timedelta(days=30)}
+        for i, equipment_id in enumerate(equipment_ids)
+    ])
+    db.session.execute(insert(SoilRecord), [
+        {'id': generate_uuid(), 'farm_id': farm_id, 'ph': 6.0 + i / 10, 'nitrogen': 30.0, 'phosphorus': 20.0,
+         'potassium': 150.0, 'organic_matter': 3.0, 'record_date': date.today() - timedelta(days=30 * i)}
+        for farm_id in farm_ids for i in range(READINGS_PER_FARM)
+    ])
+    db.session.commit()
+
+    # Table statistics, as a long-running database would have
+    db.session.execute(text('ANALYZE'))
+    return owner.id, crop_ids, equipment_ids
+
+def timed(send):
+    started = time.perf_counter()
+    response = send()
+    elapsed = (time.perf_counter() - started) * 1000
+    assert response.status_code < 300, response.data[:200]
+    return response, elapsed
+
+def body(response):
+    data = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+def report(label, elapsed, wire, rows):
+    print(f"{label:<11} {elapsed:8.1f} ms  {wire / 1024:9.1f} KiB  {rows:>7} rows")
+
+def pull_all(client, owner_id, since=None):
+    """Follow has_more to the end, returning the last token and the totals."""
+    elapsed = wire = rows = 0
+    while True:
+        query = f'/api/sync/?owner_id={owner_id}&limit={PAGE_SIZE}' + (f'&since={since}' if since else '')
+        response, took = timed(lambda: client.get(query, headers={'Accept-Encoding': 'gzip'}))
+        page = body(response)
+        elapsed += took
+        wire += len(response.get_data())
+        rows += sum(len(page[key]) for key in ('farms', 'crops', 'equipment', 'soil_records', 'tombstones'))
+        since = page['since']
+        if not page['has_more']:
+            return since, elapsed, wire, rows
+
+def main():
+    sync.SYNC_LOOKBACK = timedelta(0)
+    with app.app_context():
+        owner_id, crop_ids, equipment_ids = seed()
+
+    client = app.test_client()
+
+    response, elapsed = timed(lambda: client.get(f'/api/farm/dashboard?owner_id={owner_id}'))
+    farms = response.get_json()
+    rows = sum(1 + len(farm['crops']) + len(farm['equipment']) + (farm['latest_soil'] is not None) for farm in farms)
+    report('dashboard', elapsed, len(response.get_data()), rows)
+
+    since, elapsed, wire, rows = pull_all(client, owner_id)
+    report('full sync', elapsed, wire, rows)
+
+    # Let the clock move past the watermark before changing rows
+    time.sleep(0.01)
+    rng = random.Random(22)
+    with app.app_context():
+        db.session.execute(update(Crop), [
+            {'id': crop_id, 'area': 6.0, 'updated_at': datetime.utcnow()} for crop_id in rng.sample(crop_ids, CHANGED)
+        ])
+        db.session.commit()
+        run_batch([{'op': 'delete', 'resource': 'equipment', 'id': equipment_id}
+                   for equipment_id in rng.sample(equipment_ids, DELETED)])
+
+    since, elapsed, wire, rows = pull_all(client, owner_id, since)
+    report('delta', elapsed, wire, rows)
+
+    since, elapsed, wire, rows = pull_all(client, owner_id, since)
+    report('noop', elapsed, wire, rows)
+
+    with app.app_context():
+        current = dict(db.session.execute(
+            Crop.__table__.select().with_only_columns(Crop.id, Crop.updated_at).where(Crop.id.in_(crop_ids[:PUSHED]))
+        ).all())
+    payload = gzip.compress(json.dumps({'owner_id': owner_id, 'changes': [
+        {'op': 'update', 'resource': 'crop', 'id': crop_id, 'data': {'status': 'Harvested'},
+         'base_updated_at': current[crop_id].isoformat()}
+        for crop_id in crop_ids[:PUSHED]
+    ]}).encode('utf-8'))
+    response, elapsed = timed(lambda: client.post('/api/sync/', data=payload, headers={
+        'Content-Type': 'application/json', 'Content-Encoding': 'gzip', 'Accept-Encoding': 'gzip'
+    }))
+    report('push', elapsed, len(payload) + len(response.get_data()), body(response)['succeeded'])
+
+if __name__ == '__main__':
+    main()
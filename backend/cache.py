@@ -0,0 +1,225 @@
+"""Read-through response cache for the product catalog endpoints.
+
+Each cached response belongs to a scope (the product list, the featured list,
+one product) with a generation counter in the backend. Keys include the
+scope's generation when they are read, and writes bump the generations of the
+scopes they change instead of deleting entries, so an old entry can no longer
+be found, even one a slow request stores after the bump.
+
+CACHE_BACKEND picks where entries and generations live:
+
+    memory  an in-process LRU with a TTL. Every process has its own, so a
+            write only invalidates the process that handled it; the others
+            serve the old catalog until CACHE_TTL runs out.
+    redis   shared by every process, at CACHE_REDIS_URL. Needs the redis
+            package. CACHE_REDIS_URL=memory:// runs the same backend against
+            an in-process stand-in for Redis, without a server.
+
+gunicorn.conf.py defaults to redis when it runs more than one worker.
+"""
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, make_response, request
+import hashlib
+import json
+import os
+import threading
+import time
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.evictions += 1
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, scope):
+        with self.lock:
+            return self.generations.get(scope, 0)
+
+    def bump(self, scope):
+        # Entries of the old generation are left to the LRU and the TTL
+        with self.lock:
+            self.generations[scope] = self.generations.get(scope, 0) + 1
+
+    def size(self):
+        return len(self.entries)
+
+class LocalRedis:
+    """In-process stand-in for the few Redis commands RedisCache uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value, expires_at = self.values.get(key, (None, None))
+            if expires_at is not None and expires_at < time.monotonic():
+                del self.values[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.values[key] = (value, time.monotonic() + ex if ex else None)
+
+    def incr(self, key):
+        with self.lock:
+            value = int(self.values.get(key, (0, None))[0]) + 1
+            self.values[key] = (value, None)
+            return value
+
+class RedisCache:
+    """Shared cache backend with the same interface as LRUCache."""
+
+    def __init__(self, url, ttl=60, prefix='agritech:'):
+        if url == 'memory://':
+            self.client = LocalRedis()
+        else:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError(
+                    "CACHE_BACKEND=redis needs the redis package (pip install redis); "
+                    "set CACHE_BACKEND=memory for a cache per process"
+                ) from None
+            self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        # Redis expires and evicts entries itself
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def generation(self, scope):
+        value = self.client.get(self.prefix + 'generation:' + scope)
+        return int(value) if value is not None else 0
+
+    def bump(self, scope):
+        self.client.incr(self.prefix + 'generation:' + scope)
+
+    def size(self):
+        return None
+
+def create_cache():
+    ttl = int(os.getenv('CACHE_TTL', '60'))
+
+    if os.getenv('CACHE_BACKEND') == 'redis':
+        return RedisCache(os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'), ttl=ttl)
+
+    return LRUCache(max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '1024')), ttl=ttl)
+
+response_cache = create_cache()
+
+stats = {
+    'hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+}
+stats_lock = threading.Lock()
+
+def count(name, amount=1):
+    with stats_lock:
+        stats[name] += amount
+
+def make_scope(namespace, view_args):
+    return ':'.join([namespace, *(str(view_args[name]) for name in sorted(view_args))])
+
+def make_key(scope, generation):
+    parts = [scope, f'v{generation}']
+    parts.extend(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+    return ':'.join(parts)
+
+def cached_response(namespace):
+    """Cache successful JSON responses of a view and answer If-None-Match with 304."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            # Read before the view runs: if a write bumps it meanwhile, what
+            # the view returns is stored under a key nothing looks up any more
+            scope = make_scope(namespace, view_args)
+            key = make_key(scope, response_cache.generation(scope))
+            entry = response_cache.get(key)
+
+            if entry is None:
+                count('misses')
+                response = make_response(view(**view_args))
+
+                # Only cache complete, successful responses
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+
+                body = response.get_data(as_text=True)
+                etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+                entry = [body, response.mimetype, etag]
+                response_cache.set(key, entry)
+            else:
+                count('hits')
+
+            body, mimetype, etag = entry
+
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype=mimetype)
+
+            response.set_etag(etag)
+            return response
+
+        return wrapper
+    return decorator
+
+def invalidate_product(product_id=None):
+    """Invalidate cached catalog responses that may include the given product."""
+    scopes = ['products:list', 'products:featured']
+    if product_id:
+        scopes.append(f'products:item:{product_id}')
+    for scope in scopes:
+        response_cache.bump(scope)
+    count('invalidations', len(scopes))
+
+def get_stats():
+    with stats_lock:
+        counters = dict(stats)
+    return {
+        'backend': type(response_cache).__name__,
+        'hits': counters['hits'],
+        'misses': counters['misses'],
+        'evictions': response_cache.evictions,
+        'invalidations': counters['invalidations'],
+        'entries': response_cache.size(),
+    }
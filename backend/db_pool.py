@@ -0,0 +1,88 @@
+"""Database connection pool settings and checkout metrics.
+
+Pool sizing is read from the environment so each deployment can match it to
+its worker and thread counts:
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+"""
+from sqlalchemy import event
+import os
+import threading
+import time
+
+def engine_options(database_url):
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true') == 'true',
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    }
+
+    # SQLite uses its own pool classes that take no sizing options
+    if database_url and not database_url.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        })
+
+    return options
+
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.held_seconds = 0.0
+        self.engine = None
+
+    def attach(self, engine):
+        self.engine = engine
+        event.listen(engine, 'connect', self.on_connect)
+        event.listen(engine, 'checkout', self.on_checkout)
+        event.listen(engine, 'checkin', self.on_checkin)
+        event.listen(engine, 'invalidate', self.on_invalidate)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        with self.lock:
+            self.checkins += 1
+            if started is not None:
+                self.checked_out -= 1
+                self.held_seconds += time.perf_counter() - started
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self.lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        with self.lock:
+            stats = {
+                'pid': os.getpid(),
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'mean_hold_ms': (self.held_seconds / self.checkins * 1000) if self.checkins else 0.0,
+            }
+
+        if self.engine is not None:
+            stats['status'] = self.engine.pool.status()
+        return stats
+
+pool_metrics = PoolMetrics()
@@ -0,0 +1,4 @@
+"""Flask extensions, created unbound and attached to an app in create_app."""
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
@@ -0,0 +1,62 @@
+"""Background refresh of harvest forecasts.
+
+GET /api/farm/forecast only reads crop_forecasts. This worker keeps them
+current by running the incremental refresh every FORECAST_REFRESH_SECONDS. When
+several processes run a worker, a refresh that finds another one in progress
+is skipped rather than queued behind it.
+"""
+from models import db
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = int(os.getenv('FORECAST_REFRESH_SECONDS', '60'))
+
+class ForecastRefresher:
+    def __init__(self, interval=REFRESH_SECONDS):
+        self.interval = interval
+        self.thread = None
+        self.stopping = threading.Event()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def refresh(self):
+        # NumPy is only loaded by processes that compute forecasts
+        from forecasting import refresh_forecasts
+
+        try:
+            recomputed = refresh_forecasts(wait=False)
+            if recomputed:
+                logger.info("Recomputed %d crop forecasts", recomputed)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Forecast refresh failed")
+        finally:
+            db.session.remove()
+
+    def run(self, app):
+        with app.app_context():
+            while not self.stopping.is_set():
+                self.refresh()
+                self.stopping.wait(self.interval)
+
+    def start(self, app):
+        if self.running:
+            return
+
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, args=(app,), name='forecast-refresher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+refresher = ForecastRefresher()
@@ -0,0 +1,282 @@
+"""Harvest and crop-yield forecasts from crop planting data.
+
+Each crop's growth stage, expected harvest week and expected volume are
+computed for all crops at once with NumPy, from a per-crop-type profile of
+days to maturity and yield per hectare, and stored in crop_forecasts. A refresh
+only recomputes crops changed since the last run plus forecasts whose stage
+or harvest week has moved on since they were computed, so the cost follows
+the number of changes rather than the number of crops. Weekly totals per farm,
+region or crop are then one GROUP BY over the stored rows.
+
+Reads never refresh: forecast_worker.py runs the incremental refresh in the
+background, and POST /api/farm/forecast/refresh runs it on demand.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, or_, select
+from models import db, Farm, Crop, CropForecast
+import numpy as np
+
+# Days from planting to harvest and yield in tonnes per hectare, by crop name
+CROP_PROFILES = {
+    'wheat': (120, 3.5),
+    'maize': (120, 9.0),
+    'corn': (120, 9.0),
+    'rice': (130, 4.5),
+    'soybean': (110, 2.8),
+    'barley': (100, 3.2),
+    'potato': (100, 20.0),
+    'tomato': (80, 50.0),
+    'lettuce': (55, 30.0),
+    'carrot': (75, 30.0),
+    'cotton': (160, 2.0),
+    'sorghum': (115, 3.0),
+    'oats': (100, 2.5),
+}
+DEFAULT_PROFILE = (100, 4.0)
+
+# Growing stages start at these fractions of the time from planting to harvest
+STAGE_BOUNDS = np.array([0.1, 0.45, 0.8])
+
+STAGES = ('planned', 'establishment', 'vegetative', 'reproductive', 'maturation',
+          'overdue', 'harvested', 'unscheduled')
+PLANNED, ESTABLISHMENT, MATURATION, OVERDUE, HARVESTED, UNSCHEDULED = 0, 1, 4, 5, 6, 7
+
+# Share of the profile yield expected at each stage; early estimates are discounted
+STAGE_CONFIDENCE = np.array([0.85, 0.85, 0.9, 0.95, 1.0, 1.0, 0.0, 0.0])
+
+GROUPS = ('farm', 'region', 'crop')
+DEFAULT_WEEKS = 12
+
+# Crops updated just before the previous run may have committed after it read them
+WATERMARK_LOOKBACK = timedelta(minutes=5)
+WRITE_CHUNK_SIZE = 5000
+
+# PostgreSQL advisory lock held by the running refresh ('fcst')
+REFRESH_LOCK_ID = 0x66637374
+
+def profile_arrays(names):
+    """Maturity days and yield per crop, looked up once per distinct name."""
+    unique, inverse = np.unique(np.char.lower(np.char.strip(np.asarray(names, dtype=str))), return_inverse=True)
+    profiles = np.array([CROP_PROFILES.get(name, DEFAULT_PROFILE) for name in unique], dtype=np.float64).reshape(-1, 2)
+    return profiles[inverse, 0], profiles[inverse, 1]
+
+def monday(days):
+    # Ordinal 1 (0001-01-01) is a Monday
+    return days - (days - 1) % 7
+
+def compute(names, area, planted, harvest, harvested, today):
+    """Stage, expected harvest day, harvest week, volume and recompute day per crop.
+
+    planted and harvest are day ordinals with NaN where unknown; harvested is
+    a boolean array. Returns float arrays of ordinals (NaN for none) and the
+    stage index per crop.
+    """
+    maturity, yield_per_ha = profile_arrays(names)
+
+    # A recorded harvest date wins over the profile's days to maturity
+    expected = np.where(np.isnan(harvest), planted + maturity, harvest)
+    length = np.maximum(expected - planted, 1.0)
+    progress = (today - planted) / length
+
+    with np.errstate(invalid='ignore'):
+        stage = np.digitize(progress, STAGE_BOUNDS) + ESTABLISHMENT
+        stage = np.where(np.isnan(planted) | (planted > today), PLANNED, stage)
+        stage = np.where(today > expected, OVERDUE, stage)
+    stage = np.where(np.isnan(expected), UNSCHEDULED, stage)
+    stage = np.where(harvested, HARVESTED, stage)
+
+    scheduled = stage < HARVESTED
+    volume = np.where(scheduled, area * yield_per_ha * STAGE_CONFIDENCE[stage], 0.0)
+
+    # Overdue crops are expected to come in this week
+    harvest_day = np.where(stage == OVERDUE, today, expected)
+    week = np.where(scheduled, monday(harvest_day), np.nan)
+
+    # The day the stage changes: planting, the next stage bound, or the day after
+    # the expected harvest. Overdue forecasts move with the current week.
+    starts = np.where(np.isnan(planted), expected + 1, planted)
+    bounds = np.r_[0.0, STAGE_BOUNDS, np.inf][np.clip(stage, ESTABLISHMENT, MATURATION)]
+    with np.errstate(invalid='ignore'):
+        next_change = np.where(stage == MATURATION, expected + 1, np.ceil(planted + bounds * length))
+    recompute = np.select(
+        [stage == PLANNED, stage == OVERDUE, scheduled],
+        [starts, monday(today) + 7, next_change],
+        np.nan
+    )
+
+    return stage, expected, week, volume, recompute
+
+def to_dates(days):
+    """Dates for an array of ordinals, converting each distinct day once."""
+    unique, inverse = np.unique(days, return_inverse=True)
+    dates = [None if np.isnan(day) else date.fromordinal(int(day)) for day in unique]
+    return [dates[index] for index in inverse.ravel()]
+
+def forecast_rows(rows, today):
+    """Forecast rows for crop_forecasts from (id, farm_id, name, area, status, planted, harvest, updated_at) rows."""
+    if not rows:
+        return []
+
+    ids, farm_ids, names, areas, statuses, planted, harvest, updated = zip(*rows)
+
+    def ordinals(dates):
+        return np.fromiter((day.toordinal() if day else np.nan for day in dates), dtype=np.float64, count=len(dates))
+
+    stage, expected, week, volume, recompute = compute(
+        names,
+        np.asarray(areas, dtype=np.float64),
+        ordinals(planted),
+        ordinals(harvest),
+        np.array([status == 'Harvested' for status in statuses]),
+        float(today.toordinal())
+    )
+
+    expected, week, recompute = to_dates(expected), to_dates(week), to_dates(recompute)
+    volume = volume.tolist()
+
+    now = datetime.utcnow()
+    return [
+        {
+            'crop_id': ids[i],
+            'farm_id': farm_ids[i],
+            'crop_name': names[i],
+            'stage': STAGES[stage[i]],
+            'expected_harvest_date': expected[i],
+            'harvest_week': week[i],
+            'expected_volume': volume[i],
+            'recompute_on': recompute[i],
+            'crop_updated_at': updated[i],
+            'computed_at': now,
+        }
+        for i in range(len(ids))
+    ]
+
+def lock_refresh(wait):
+    """Take the refresh lock for this transaction; False if wait is off and it is taken.
+
+    Refreshes in other processes would otherwise delete and insert the same
+    forecast rows at the same time. SQLite already allows one writer at a time.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return True
+    if wait:
+        db.session.execute(select(func.pg_advisory_xact_lock(REFRESH_LOCK_ID)))
+        return True
+    return db.session.execute(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID))).scalar()
+
+def discard_forecasts(model, ids):
+    """Delete the forecasts of crops, or of every crop of farms, being deleted.
+
+    Refreshes only select existing crops, so forecasts left behind where the
+    database does not cascade (SQLite without foreign keys) would otherwise
+    stay until the next full refresh.
+    """
+    column = CropForecast.farm_id if model is Farm else CropForecast.crop_id
+    db.session.execute(
+        delete(CropForecast)
+        .where(column.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+
+def refresh_forecasts(full=False, today=None, wait=True):
+    """Recompute forecasts for changed crops, or for every crop if full is set.
+
+    Returns the number of crops recomputed, or None if wait is off and another
+    refresh is running.
+    """
+    today = today or date.today()
+    if not lock_refresh(wait):
+        db.session.rollback()
+        return None
+
+    query = select(
+        Crop.id, Crop.farm_id, Crop.name, Crop.area, Crop.status,
+        Crop.planted_date, Crop.harvest_date, Crop.updated_at
+    )
+
+    watermark = db.session.execute(select(func.max(CropForecast.crop_updated_at))).scalar()
+
+    if full or watermark is None:
+        # Forecasts of deleted crops, where the database does not cascade
+        db.session.execute(
+            delete(CropForecast)
+            .where(CropForecast.crop_id.not_in(select(Crop.id)))
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        due = select(CropForecast.crop_id).where(CropForecast.recompute_on <= today)
+        query = (
+            query
+            .outerjoin(CropForecast, CropForecast.crop_id == Crop.id)
+            .where(or_(Crop.updated_at >= watermark - WATERMARK_LOOKBACK, Crop.id.in_(due)))
+            # Crops in the lookback window whose forecast is already current are skipped
+            .where(or_(
+                CropForecast.crop_id.is_(None),
+                CropForecast.crop_updated_at != Crop.updated_at,
+                CropForecast.recompute_on <= today
+            ))
+        )
+
+    rows = forecast_rows(db.session.execute(query).all(), today)
+
+    # Replace each crop's forecast in chunks
+    for start in range(0, len(rows), WRITE_CHUNK_SIZE):
+        chunk = rows[start:start + WRITE_CHUNK_SIZE]
+        db.session.execute(
+            delete(CropForecast)
+            .where(CropForecast.crop_id.in_([row['crop_id'] for row in chunk]))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(CropForecast.__table__.insert(), chunk)
+
+    db.session.commit()
+    return len(rows)
+
+def weekly_forecast(group='farm', owner_id=None, farm_id=None, weeks=DEFAULT_WEEKS, today=None):
+    """Expected harvest volume per week for each farm, region or crop name."""
+    today = today or date.today()
+    first_week = date.fromordinal(int(monday(today.toordinal())))
+    last_week = first_week + timedelta(weeks=weeks - 1)
+
+    key = {
+        'farm': CropForecast.farm_id,
+        'region': Farm.location,
+        'crop': CropForecast.crop_name,
+    }[group]
+
+    query = (
+        select(
+            key.label('key'),
+            CropForecast.harvest_week,
+            func.sum(CropForecast.expected_volume).label('volume'),
+            func.count().label('crops')
+        )
+        .join(Farm, Farm.id == CropForecast.farm_id)
+        .where(CropForecast.harvest_week.between(first_week, last_week))
+        .group_by(key, CropForecast.harvest_week)
+        .order_by(key, CropForecast.harvest_week)
+    )
+    if owner_id:
+        query = query.where(Farm.owner_id == owner_id)
+    if farm_id:
+        query = query.where(CropForecast.farm_id == farm_id)
+
+    week_starts = [first_week + timedelta(weeks=i) for i in range(weeks)]
+    series = {}
+    for row in db.session.execute(query):
+        entry = series.setdefault(row.key, {'key': row.key, 'volumes': [0.0] * weeks, 'crops': 0, 'total': 0.0})
+        entry['volumes'][(row.harvest_week - first_week).days // 7] = row.volume
+        entry['crops'] += row.crops
+        entry['total'] += row.volume
+
+    if group == 'farm' and series:
+        names = dict(db.session.execute(select(Farm.id, Farm.name).where(Farm.id.in_(list(series)))).all())
+        for farm_key, entry in series.items():
+            entry['name'] = names.get(farm_key)
+
+    return {
+        'group': group,
+        'unit': 't',
+        'weeks': [week.isoformat() for week in week_starts],
+        'series': list(series.values())
+    }
@@ -0,0 +1,385 @@
+"""Bounding-box, radius and nearest-neighbour queries over farm coordinates.
+
+Farms carry a latitude and longitude. On PostgreSQL with PostGIS, migration
+0006 adds a GiST index on the farms' geography and queries use ST_DWithin and
+the <-> distance operator. Everywhere else (SQLite, or PostgreSQL without
+PostGIS) farms are bucketed into a fixed grid of GRID_CELL_DEGREES cells
+numbered row by row, stored in farms.grid_cell and indexed together with the
+coordinates. A box is then one index range per grid row, and nearest-neighbour
+searches widen a square of cells around the point until no unsearched cell
+can hold anything closer than the k-th farm found. Searches that would need
+more than MAX_RANGES ranges use a coarser grid of GRID_BLOCK by GRID_BLOCK
+cells instead, stored and indexed the same way in farms.grid_block: boxes
+become one range per block row, and nearest-neighbour searches read blocks in
+order of their distance from the point, so where farms are sparse they stop at
+the blocks that can hold the k nearest instead of reading every farm.
+
+Writes that set coordinates must also set grid_cell and grid_block: ORM writes
+get them from the mapper hooks installed by track_grid_cells(), bulk
+statements call grid_values() on each row.
+"""
+from sqlalchemy import event, func, literal_column, or_, select, text
+from models import db, Farm
+from serializers import farm_serializer
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Changing the cell size means recomputing every farm's grid_cell
+GRID_CELL_DEGREES = 0.05
+GRID_ROWS = round(180 / GRID_CELL_DEGREES)
+GRID_COLUMNS = round(360 / GRID_CELL_DEGREES)
+
+# Searches needing more cell ranges than this search by block instead
+MAX_RANGES = 256
+
+# Blocks of 2 by 2 degrees; GRID_COLUMNS and GRID_ROWS must be multiples
+GRID_BLOCK = 40
+BLOCK_ROWS = GRID_ROWS // GRID_BLOCK
+BLOCK_COLUMNS = GRID_COLUMNS // GRID_BLOCK
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Matches the expression of idx_farms_geography so PostgreSQL can use the index
+FARM_GEOGRAPHY = literal_column('geography(ST_SetSRID(ST_MakePoint(farms.longitude, farms.latitude), 4326))')
+
+# Engine URL -> whether idx_farms_geography exists
+postgis_engines = {}
+
+def validate_coordinates(latitude, longitude):
+    """Return the pair as floats, or raise ValueError."""
+    if latitude is None and longitude is None:
+        return None, None
+    if latitude is None or longitude is None:
+        raise ValueError("latitude and longitude must be given together")
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid latitude or longitude")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be between -90 and 90 and longitude between -180 and 180")
+    return latitude, longitude
+
+def grid_row(latitude):
+    return min(int(math.floor((latitude + 90) / GRID_CELL_DEGREES)), GRID_ROWS - 1)
+
+def grid_column(longitude):
+    return int(math.floor((longitude + 180) / GRID_CELL_DEGREES)) % GRID_COLUMNS
+
+def grid_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return grid_row(latitude) * GRID_COLUMNS + grid_column(longitude)
+
+def grid_block(cell):
+    """The block holding a grid cell."""
+    if cell is None:
+        return None
+    return cell // GRID_COLUMNS // GRID_BLOCK * BLOCK_COLUMNS + cell % GRID_COLUMNS // GRID_BLOCK
+
+def grid_values(values):
+    """Validate the coordinates in a row dict for a bulk write and add its grid_cell and grid_block."""
+    if 'latitude' in values or 'longitude' in values:
+        latitude, longitude = validate_coordinates(values.get('latitude'), values.get('longitude'))
+        values['latitude'], values['longitude'] = latitude, longitude
+        values['grid_cell'] = grid_cell(latitude, longitude)
+        values['grid_block'] = grid_block(values['grid_cell'])
+    return values
+
+def set_grid_cell(mapper, connection, farm):
+    farm.grid_cell = grid_cell(farm.latitude, farm.longitude)
+    farm.grid_block = grid_block(farm.grid_cell)
+
+def track_grid_cells():
+    """Keep grid_cell in step with the coordinates on every ORM farm write."""
+    for name in ('before_insert', 'before_update'):
+        if not event.contains(Farm, name, set_grid_cell):
+            event.listen(Farm, name, set_grid_cell)
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Haversine distance between two points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+def column_ranges(first, last, width=GRID_COLUMNS):
+    """Column ranges for columns first..last of a grid width columns wide, wrapping at the antimeridian."""
+    if last < first:
+        return []
+    if last - first + 1 >= width:
+        return [(0, width - 1)]
+    first, last = first % width, last % width
+    if first <= last:
+        return [(first, last)]
+    return [(first, width - 1), (0, last)]
+
+def cell_ranges(rows, columns, width=GRID_COLUMNS):
+    """Cell (or block) number ranges covering the given rows, each with the same column span."""
+    return [
+        (row * width + first, row * width + last)
+        for row in rows
+        for first, last in columns
+    ]
+
+def ring_ranges(square, searched, height, width):
+    """Ranges of the cells (or blocks) in square that are not in searched.
+
+    Both are (first_row, last_row, first_column, last_column) on a grid of
+    height rows and width columns, with searched inside square or None.
+    Columns may run past the antimeridian; rows are clipped at the poles.
+    """
+    first_row, last_row, first_column, last_column = square
+    rows = range(max(first_row, 0), min(last_row, height - 1) + 1)
+    columns = column_ranges(first_column, last_column, width)
+    if searched is None:
+        return cell_ranges(rows, columns, width)
+
+    # Rows above and below the searched ones, then the columns either side of it
+    searched_first_row, searched_last_row, searched_first_column, searched_last_column = searched
+    searched_rows = range(max(searched_first_row, 0), min(searched_last_row, height - 1) + 1)
+    if searched_last_column - searched_first_column + 1 >= width:
+        sides = []
+    elif last_column - first_column + 1 >= width:
+        sides = column_ranges(searched_last_column + 1, searched_first_column - 1 + width, width)
+    else:
+        sides = (column_ranges(first_column, searched_first_column - 1, width)
+                 + column_ranges(searched_last_column + 1, last_column, width))
+    return (
+        cell_ranges([row for row in rows if row not in searched_rows], columns, width)
+        + cell_ranges(searched_rows, sides, width)
+    )
+
+def block_square(square):
+    """The square of blocks holding a square of cells."""
+    first_row, last_row, first_column, last_column = square
+    if last_column - first_column + 1 >= GRID_COLUMNS:
+        first_column, last_column = 0, GRID_COLUMNS - 1
+    return (
+        max(first_row, 0) // GRID_BLOCK, min(last_row, GRID_ROWS - 1) // GRID_BLOCK,
+        first_column // GRID_BLOCK, last_column // GRID_BLOCK
+    )
+
+def in_ranges(ranges, column=Farm.grid_cell):
+    return or_(*(column.between(low, high) for low, high in ranges))
+
+def uses_postgis():
+    engine = db.engine
+    key = str(engine.url)
+    if key not in postgis_engines:
+        postgis_engines[key] = engine.dialect.name == 'postgresql' and db.session.execute(
+            text("SELECT to_regclass('idx_farms_geography') IS NOT NULL")
+        ).scalar()
+    return postgis_engines[key]
+
+def point_geography(latitude, longitude):
+    return func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
+
+def in_box(min_lat, min_lon, max_lat, max_lon, limit=DEFAULT_LIMIT):
+    """Up to limit farms inside the box, in no particular order, and whether there are more.
+
+    min_lon greater than max_lon means the box crosses the antimeridian.
+    """
+    longitude = (
+        Farm.longitude.between(min_lon, max_lon) if min_lon <= max_lon
+        else or_(Farm.longitude >= min_lon, Farm.longitude <= max_lon)
+    )
+    query = farm_serializer.select().where(Farm.latitude.between(min_lat, max_lat), longitude)
+
+    if uses_postgis():
+        envelopes = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+        query = query.where(or_(*(
+            FARM_GEOGRAPHY.op('&&')(func.geography(func.ST_MakeEnvelope(west, min_lat, east, max_lat, 4326)))
+            for west, east in envelopes
+        )))
+    else:
+        first = grid_column(min_lon)
+        last = grid_column(max_lon)
+        if last < first:
+            last += GRID_COLUMNS
+        square = (grid_row(min_lat), grid_row(max_lat), first, last)
+        ranges = ring_ranges(square, None, GRID_ROWS, GRID_COLUMNS)
+        if len(ranges) <= MAX_RANGES:
+            query = query.where(in_ranges(ranges))
+        else:
+            query = query.where(in_ranges(
+                ring_ranges(block_square(square), None, BLOCK_ROWS, BLOCK_COLUMNS), Farm.grid_block
+            ))
+
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    return farm_serializer.dump_rows(rows[:limit]), len(rows) > limit
+
+def nearest_postgis(latitude, longitude, k, max_km):
+    point = point_geography(latitude, longitude)
+    query = (
+        select(Farm.id, func.ST_Distance(FARM_GEOGRAPHY, point).label('distance'))
+        .where(Farm.latitude.isnot(None))
+        .order_by(FARM_GEOGRAPHY.op('<->')(point))
+        .limit(k)
+    )
+    if max_km is not None:
+        query = query.where(func.ST_DWithin(FARM_GEOGRAPHY, point, max_km * 1000))
+    return [(row.id, row.distance / 1000) for row in db.session.execute(query)]
+
+def searched_radius_km(latitude, longitude, row, column, half_width):
+    """Distance from the point within which the searched square holds every farm."""
+    # Distance to the nearest latitude edge of the square, unless it reaches a pole
+    edges = []
+    low, high = row - half_width, row + half_width
+    if low > 0:
+        edges.append(latitude - (low * GRID_CELL_DEGREES - 90))
+    if high < GRID_ROWS - 1:
+        edges.append((high + 1) * GRID_CELL_DEGREES - 90 - latitude)
+    radius = min(edges, default=math.inf)
+    radius = math.radians(radius) * EARTH_RADIUS_KM
+
+    # Distance to the great circles of the nearest bounding meridians
+    if 2 * half_width + 1 < GRID_COLUMNS:
+        west = longitude - ((column - half_width) * GRID_CELL_DEGREES - 180)
+        east = (column + half_width + 1) * GRID_CELL_DEGREES - 180 - longitude
+        angle = math.radians(min(west, east, 90.0))
+        radius = min(radius, EARTH_RADIUS_KM * math.asin(min(1.0, math.cos(math.radians(latitude)) * math.sin(angle))))
+    return radius
+
+def block_bounds(latitude, longitude):
+    """(distance, block) for every block, lowest first: no farm in the block is closer than distance.
+
+    The bounds are quick to compute but loose; block_distance_km() is exact.
+    """
+    block_degrees = GRID_BLOCK * GRID_CELL_DEGREES
+    row_bounds = []
+    for block_row in range(BLOCK_ROWS):
+        south = block_row * block_degrees - 90
+        gap = max(south - latitude, latitude - (south + block_degrees), 0.0)
+        row_bounds.append(math.radians(gap) * EARTH_RADIUS_KM)
+
+    # As in searched_radius_km, the distance to the great circle of the nearest bounding meridian
+    column_bounds = []
+    for block_column in range(BLOCK_COLUMNS):
+        west = block_column * block_degrees - 180
+        if west <= longitude <= west + block_degrees:
+            column_bounds.append(0.0)
+            continue
+        gap = min((west - longitude) % 360, (longitude - west - block_degrees) % 360, 90.0)
+        column_bounds.append(EARTH_RADIUS_KM * math.asin(min(1.0, math.cos(math.radians(latitude)) * math.sin(math.radians(gap)))))
+
+    return sorted(
+        (max(row_bound, column_bound), block_row * BLOCK_COLUMNS + block_column)
+        for block_row, row_bound in enumerate(row_bounds)
+        for block_column, column_bound in enumerate(column_bounds)
+    )
+
+def block_distance_km(latitude, longitude, block):
+    """Distance from the point to the nearest point of a block."""
+    block_degrees = GRID_BLOCK * GRID_CELL_DEGREES
+    south = block // BLOCK_COLUMNS * block_degrees - 90
+    north = south + block_degrees
+    west = block % BLOCK_COLUMNS * block_degrees - 180
+    east = west + block_degrees
+    if west <= longitude <= east:
+        return math.radians(max(south - latitude, latitude - north, 0.0)) * EARTH_RADIUS_KM
+
+    # Otherwise the nearest point is on the meridian closer in longitude, either
+    # where the great circle through the point meets it at a right angle or at an end
+    edge = west if (west - longitude) % 360 <= (longitude - east) % 360 else east
+    phi = math.radians(latitude)
+    foot = math.degrees(math.atan2(math.sin(phi), math.cos(phi) * math.cos(math.radians(edge - longitude))))
+    return min(
+        distance_km(latitude, longitude, edge_latitude, edge)
+        for edge_latitude in (south, north, min(max(foot, south), north))
+    )
+
+def nearest_grid(latitude, longitude, k, max_km):
+    row, column = grid_row(latitude), grid_column(longitude)
+    candidates = select(Farm.id, Farm.latitude, Farm.longitude)
+    # Farm id -> distance; block searches may read farms already found
+    found = {}
+
+    def collect(query):
+        for farm_id, farm_lat, farm_lon in db.session.execute(query):
+            found[farm_id] = distance_km(latitude, longitude, farm_lat, farm_lon)
+
+    def kth_distance():
+        return heapq.nsmallest(k, found.values())[-1] if len(found) >= k else math.inf
+
+    # Search squares of 1, 3, 5, 9, 17, ... cells, one ring of new cells at a time
+    searched = None
+    half_width = 0
+    while True:
+        square = (row - half_width, row + half_width, column - half_width, column + half_width)
+        ranges = ring_ranges(square, searched, GRID_ROWS, GRID_COLUMNS)
+        if len(ranges) > MAX_RANGES:
+            break
+
+        collect(candidates.where(in_ranges(ranges)))
+        searched = square
+        radius = searched_radius_km(latitude, longitude, row, column, half_width)
+
+        if radius == math.inf or (max_km is not None and radius >= max_km) or kth_distance() <= radius:
+            return nearest_found(found, k, max_km)
+        half_width = max(1, half_width * 2)
+
+    # Farms are sparse around the point: read whole blocks, nearest first, until
+    # no unread block can hold anything closer than the k-th farm found
+    bounds = block_bounds(latitude, longitude)
+    position = 0
+    # (distance, block) of blocks whose bound has been passed, nearest first
+    pending = []
+
+    def next_block():
+        nonlocal position
+        while position < len(bounds) and (not pending or bounds[position][0] < pending[0][0]):
+            block = bounds[position][1]
+            heapq.heappush(pending, (block_distance_km(latitude, longitude, block), block))
+            position += 1
+        return pending[0] if pending else None
+
+    step_km = math.radians(GRID_BLOCK * GRID_CELL_DEGREES) * EARTH_RADIUS_KM / 2
+    while next_block():
+        limit_km = min(kth_distance(), math.inf if max_km is None else max_km)
+        first = pending[0][0]
+        if first > limit_km:
+            break
+
+        # Until k farms are found, read the blocks up to step_km further out
+        # together; after that, only the ones that can hold a closer farm
+        batch = []
+        while next_block() and len(batch) < MAX_RANGES and pending[0][0] <= min(first + step_km, limit_km):
+            batch.append(heapq.heappop(pending)[1])
+        query = candidates.where(Farm.grid_block.in_(batch))
+        if limit_km < math.inf:
+            spread = math.degrees(limit_km / EARTH_RADIUS_KM)
+            query = query.where(Farm.latitude.between(latitude - spread, latitude + spread))
+        collect(query)
+
+    return nearest_found(found, k, max_km)
+
+def nearest_found(found, k, max_km):
+    return [
+        (farm_id, distance)
+        for farm_id, distance in heapq.nsmallest(k, found.items(), key=lambda item: (item[1], item[0]))
+        if max_km is None or distance <= max_km
+    ]
+
+def nearest(latitude, longitude, k, max_km=None):
+    """The k farms closest to the point, optionally within max_km, nearest first.
+
+    Each farm dict gets a distance_km.
+    """
+    if uses_postgis():
+        found = nearest_postgis(latitude, longitude, k, max_km)
+    else:
+        found = nearest_grid(latitude, longitude, k, max_km)
+    if not found:
+        return []
+
+    rows = {
+        row['id']: row for row in farm_serializer.dump_rows(db.session.execute(
+            farm_serializer.select().where(Farm.id.in_([farm_id for farm_id, _ in found]))
+        ))
+    }
+    return [
+        {**rows[farm_id], 'distance_km': round(distance, 3)}
+        for farm_id, distance in found if farm_id in rows
+    ]
@@ -0,0 +1,61 @@
+"""Gunicorn settings for serving the API in production.
+
+The app is imported once in the master (preload_app) and then forked, so the
+workers share its memory copy-on-write. Each worker drops the database
+connections inherited from the master and opens its own.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# A write only invalidates the catalog cache of the process that handles it,
+# so several workers share one unless CACHE_BACKEND says otherwise
+if workers > 1:
+    os.environ.setdefault('CACHE_BACKEND', 'redis')
+
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically so slow leaks cannot build up
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+# Set GUNICORN_ACCESS_LOG to an empty value to disable access logging
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+
+def when_ready(server):
+    # Move everything allocated while importing the app out of the GC's reach,
+    # so collections in the workers do not touch (and copy) the shared pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    from wsgi import app
+    from extensions import db
+    from maintenance import scheduler
+    from forecast_worker import refresher
+
+    # Connections opened in the master must not be shared between processes
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    # Every worker starts one; a single elected worker runs the schedule and
+    # another takes over if it exits
+    if os.getenv('MAINTENANCE_WORKER', 'true') == 'true':
+        scheduler.start(app)
+    if os.getenv('FORECAST_WORKER', 'true') == 'true':
+        refresher.start(app)
+
+def worker_exit(server, worker):
+    from maintenance import scheduler
+    from forecast_worker import refresher
+
+    scheduler.stop()
+    refresher.stop()
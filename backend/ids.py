@@ -0,0 +1,258 @@
+"""Primary key generation and storage.
+
+Ids are UUIDs, always exchanged with clients in their 36-character string
+form. Two settings control how they are made and stored:
+
+    ID_FORMAT   uuid4 (random, the default) or uuid7 (time-ordered). UUIDv7
+                ids made close together share a prefix, so new rows land at
+                the end of each primary key and foreign key index instead of
+                on a random page. They also reveal when a row was created.
+    ID_STORAGE  string (VARCHAR(36), the default) or binary: PostgreSQL's
+                native 16-byte uuid, or a 16-byte BLOB on SQLite. Ids are
+                converted at the driver boundary, so queries, responses and
+                cursors keep using strings.
+
+Changing ID_STORAGE on an existing database needs its id columns converted,
+which migration 0007 does for the storage configured when it runs. To switch
+a database that is already at that revision, convert it with:
+
+    ID_STORAGE=binary python ids.py
+
+In binary storage every id must be a UUID. Ids sent by clients are checked
+with check_id(); a string that is not a UUID still works in lookups, where it
+simply matches nothing.
+"""
+from sqlalchemy import LargeBinary, String, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+import os
+import secrets
+import threading
+import time
+import uuid
+
+ID_FORMAT = os.getenv('ID_FORMAT', 'uuid4')
+ID_STORAGE = os.getenv('ID_STORAGE', 'string')
+
+# Every column holding an id, by table
+ID_COLUMNS = {
+    'users': ['id'],
+    'farms': ['id', 'owner_id'],
+    'crops': ['id', 'farm_id'],
+    'crop_forecasts': ['crop_id', 'farm_id'],
+    'soil_records': ['id', 'farm_id'],
+    'soil_rollups': ['farm_id'],
+    'equipment': ['id', 'farm_id'],
+    'maintenance_alerts': ['equipment_id'],
+    'farm_summaries': ['farm_id', 'owner_id'],
+    'owner_summaries': ['owner_id'],
+    'sync_tombstones': ['row_id', 'owner_id'],
+    'products': ['id'],
+    'orders': ['id', 'user_id'],
+    'order_items': ['id', 'order_id', 'product_id'],
+}
+
+# Matches nothing: generated UUIDs are never nil
+NIL = uuid.UUID(int=0)
+
+uuid7_lock = threading.Lock()
+uuid7_state = {'ms': 0, 'counter': 0}
+
+def uuid7():
+    """A UUIDv7 (RFC 9562): 48 bits of Unix milliseconds, then random bits.
+
+    The 12 bits after the version hold a counter that starts at a random value
+    each millisecond and counts up within it, so ids made by one process are
+    strictly increasing.
+    """
+    with uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > uuid7_state['ms']:
+            uuid7_state['ms'] = ms
+            uuid7_state['counter'] = secrets.randbits(11)
+        else:
+            uuid7_state['counter'] += 1
+            if uuid7_state['counter'] > 0xFFF:
+                # Out of ids this millisecond: borrow the next one
+                uuid7_state['ms'] += 1
+                uuid7_state['counter'] = secrets.randbits(11)
+        ms, counter = uuid7_state['ms'], uuid7_state['counter']
+
+    value = (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | secrets.randbits(62)
+    return uuid.UUID(int=value)
+
+def generate_uuid():
+    return str(uuid7() if ID_FORMAT == 'uuid7' else uuid.uuid4())
+
+def parse_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+def id_bytes(value):
+    """The 16 bytes of a UUID string, or None if it is not one."""
+    # Canonical strings skip uuid.UUID, which costs several times as much
+    if isinstance(value, str) and len(value) == 36 and value[8] == value[13] == value[18] == value[23] == '-':
+        try:
+            raw = bytes.fromhex(value.replace('-', ''))
+        except ValueError:
+            raw = None
+        if raw is not None and len(raw) == 16:
+            return raw
+    parsed = parse_id(value)
+    return parsed.bytes if parsed else None
+
+def id_text(raw):
+    digits = raw.hex()
+    return f'{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}'
+
+def check_id(value):
+    """Raise ValueError if value can not be stored as an id."""
+    if ID_STORAGE == 'binary' and parse_id(value) is None:
+        raise ValueError("id must be a UUID")
+
+class BinaryUUID(TypeDecorator):
+    """A UUID held in 16 bytes, read and written as its string form."""
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'postgresql':
+            return str(parse_id(value) or NIL)
+        # Anything else can never equal a stored 16-byte id
+        return id_bytes(value) or str(value).encode('utf-8')
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'postgresql':
+            return str(value)
+        return id_text(value)
+
+def id_type(storage=None):
+    """The column type for ids under the given (or configured) storage."""
+    return BinaryUUID() if (storage or ID_STORAGE) == 'binary' else String(36)
+
+# Converting stored ids
+def uuid_bytes(value):
+    return None if value is None else id_bytes(value)
+
+def uuid_text(value):
+    return None if value is None else id_text(value)
+
+def existing_id_columns(bind):
+    """ID_COLUMNS for the tables the database has; migration 0007 runs before later ones add theirs."""
+    from sqlalchemy import inspect
+
+    tables = set(inspect(bind).get_table_names())
+    return {table: columns for table, columns in ID_COLUMNS.items() if table in tables}
+
+def invalid_ids(bind):
+    """(table, column, value) of stored ids that are not UUIDs, a few per column."""
+    found = []
+    for table, columns in existing_id_columns(bind).items():
+        for column in columns:
+            for (value,) in bind.execute(text(f'SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL')):
+                if not isinstance(value, (bytes, uuid.UUID)) and parse_id(value) is None:
+                    found.append((table, column, value))
+                    if len(found) >= 20:
+                        return found
+    return found
+
+def current_storage(bind):
+    from sqlalchemy import inspect
+
+    column = next(column for column in inspect(bind).get_columns('users') if column['name'] == 'id')
+    return 'string' if isinstance(column['type'], String) else 'binary'
+
+def convert_id_storage(operations, storage):
+    """Convert every id column to the given storage ('string' or 'binary').
+
+    operations is an alembic Operations object (op inside a migration). Does
+    nothing if the columns already use that storage.
+    """
+    if storage not in ('string', 'binary'):
+        raise ValueError("ID_STORAGE must be string or binary")
+    bind = operations.get_bind()
+    if current_storage(bind) == storage:
+        return False
+    if storage == 'binary':
+        invalid = invalid_ids(bind)
+        if invalid:
+            raise ValueError(f"Ids that are not UUIDs can not be stored as binary: {invalid}")
+
+    if bind.dialect.name == 'postgresql':
+        convert_postgresql(operations, bind, storage)
+    else:
+        convert_sqlite(operations, bind, storage)
+    return True
+
+def convert_postgresql(operations, bind, storage):
+    from sqlalchemy import inspect
+
+    # Foreign keys between id columns must go while both ends change type
+    inspector = inspect(bind)
+    id_columns = existing_id_columns(bind)
+    foreign_keys = [
+        (table, key) for table in id_columns
+        for key in inspector.get_foreign_keys(table)
+    ]
+    for table, key in foreign_keys:
+        operations.drop_constraint(key['name'], table, type_='foreignkey')
+
+    for table, columns in id_columns.items():
+        for column in columns:
+            if storage == 'binary':
+                operations.alter_column(table, column, type_=postgresql.UUID(), postgresql_using=f'{column}::uuid')
+            else:
+                operations.alter_column(table, column, type_=String(36), postgresql_using=f'{column}::text')
+
+    for table, key in foreign_keys:
+        operations.create_foreign_key(
+            key['name'], table, key['referred_table'], key['constrained_columns'], key['referred_columns'],
+            ondelete=key.get('options', {}).get('ondelete')
+        )
+
+def convert_sqlite(operations, bind, storage):
+    from search import create_search_index
+
+    # Rewrite the values in SQL with Python functions, then change the declared types
+    raw = bind.connection.driver_connection
+    raw.create_function('uuid_bytes', 1, uuid_bytes, deterministic=True)
+    raw.create_function('uuid_text', 1, uuid_text, deterministic=True)
+    function = 'uuid_bytes' if storage == 'binary' else 'uuid_text'
+
+    for table, columns in existing_id_columns(bind).items():
+        assignments = ', '.join(f'{column} = {function}({column})' for column in columns)
+        bind.execute(text(f'UPDATE {table} SET {assignments}'))
+        with operations.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(column, type_=LargeBinary(16) if storage == 'binary' else String(36))
+
+    # Rebuilding products drops the full-text triggers and may renumber rowids
+    if bind.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")).first():
+        create_search_index(bind)
+        bind.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+def main():
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    from sqlalchemy import create_engine
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    engine = create_engine(os.getenv('DATABASE_URL'))
+    with engine.begin() as connection:
+        converted = convert_id_storage(Operations(MigrationContext.configure(connection)), ID_STORAGE)
+    print(f"Converted id columns to {ID_STORAGE} storage" if converted else f"Id columns already use {ID_STORAGE} storage")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""Per-endpoint request, query and serialization metrics.
+
+SQLAlchemy engine events time every statement; Flask request hooks add the
+statements run during a request to that endpoint's totals. Each endpoint keeps
+histograms of request time, database time, serialization time and query count,
+plus its slowest statements. Histograms are cumulative for Prometheus and also
+keep a rolling window of recent samples for the percentiles in snapshot().
+
+Settings (environment or app config):
+
+    SLOW_QUERY_MS        statements slower than this are logged (default 200)
+    SLOW_QUERY_LOG_FILE  also write the slow-query log to this file
+    SERVER_TIMING        'true' adds a Server-Timing header to every response
+
+Metrics are per process; under gunicorn each worker reports its own.
+"""
+from bisect import bisect_left
+from collections import deque
+from flask import g, has_request_context, request
+from sqlalchemy import event
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('slow_queries')
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+WINDOW_SIZE = 1000
+SLOWEST_PER_ENDPOINT = 5
+STATEMENT_PREVIEW = 500
+
+class Histogram:
+    def __init__(self, buckets, window=WINDOW_SIZE):
+        self.buckets = buckets
+        # One count per bucket plus +Inf; cumulative sums are built on export
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+class EndpointStats:
+    def __init__(self):
+        self.request_seconds = Histogram(DURATION_BUCKETS)
+        self.db_seconds = Histogram(DURATION_BUCKETS)
+        self.serialize_seconds = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses = {}
+        # statement -> slowest duration seen, pruned to the top SLOWEST_PER_ENDPOINT
+        self.slowest = {}
+
+    def add_slow_statement(self, statement, seconds):
+        if seconds <= self.slowest.get(statement, 0.0):
+            return
+        self.slowest[statement] = seconds
+        if len(self.slowest) > SLOWEST_PER_ENDPOINT:
+            del self.slowest[min(self.slowest, key=self.slowest.get)]
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class RequestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.db_errors = {}
+        self.slow_queries = 0
+        self.slow_query_seconds = 0.2
+        self.server_timing = False
+
+    def init_app(self, app, engine):
+        self.slow_query_seconds = float(app.config.get('SLOW_QUERY_MS', os.getenv('SLOW_QUERY_MS', '200'))) / 1000
+        self.server_timing = str(app.config.get('SERVER_TIMING', os.getenv('SERVER_TIMING', 'false'))).lower() == 'true'
+
+        log_file = app.config.get('SLOW_QUERY_LOG_FILE', os.getenv('SLOW_QUERY_LOG_FILE'))
+        if log_file and not any(getattr(handler, 'baseFilename', None) == os.path.abspath(log_file)
+                                for handler in slow_query_logger.handlers):
+            handler = logging.FileHandler(log_file)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_query_logger.addHandler(handler)
+            slow_query_logger.setLevel(logging.INFO)
+
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+        # Time JSON encoding by wrapping the app's JSON provider
+        encode = app.json.response
+
+        def timed_response(*args, **kwargs):
+            started = time.perf_counter()
+            response = encode(*args, **kwargs)
+            current = self.current()
+            if current is not None:
+                current['serialize_seconds'] += time.perf_counter() - started
+            return response
+
+        app.json.response = timed_response
+
+    def current(self):
+        if not has_request_context():
+            return None
+        return g.get('request_metrics')
+
+    # Flask request hooks
+    def start_request(self):
+        g.request_metrics = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_seconds': 0.0,
+            'serialize_seconds': 0.0,
+            'slowest': None
+        }
+
+    def finish_request(self, response):
+        current = g.pop('request_metrics', None)
+        if current is None:
+            return response
+
+        elapsed = time.perf_counter() - current['started']
+        endpoint = request.endpoint or 'unmatched'
+
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.request_seconds.observe(elapsed)
+            stats.db_seconds.observe(current['db_seconds'])
+            stats.serialize_seconds.observe(current['serialize_seconds'])
+            stats.queries.observe(current['queries'])
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            if current['slowest'] is not None:
+                stats.add_slow_statement(*current['slowest'])
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;dur={current["db_seconds"] * 1000:.2f};desc="{current["queries"]} queries", '
+                f'serialize;dur={current["serialize_seconds"] * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+
+        return response
+
+    # SQLAlchemy engine events
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        elapsed = time.perf_counter() - started
+        statement = statement[:STATEMENT_PREVIEW]
+
+        current = self.current()
+        if current is not None:
+            current['queries'] += 1
+            current['db_seconds'] += elapsed
+            if current['slowest'] is None or elapsed > current['slowest'][1]:
+                current['slowest'] = (statement, elapsed)
+
+        if elapsed >= self.slow_query_seconds:
+            with self.lock:
+                self.slow_queries += 1
+            # Parameters are left out on purpose; they may hold personal data
+            slow_query_logger.warning(
+                "slow query %.1fms endpoint=%s: %s",
+                elapsed * 1000, request.endpoint if current is not None else '-', ' '.join(statement.split())
+            )
+
+    def handle_error(self, context):
+        # Statements that fail never reach after_cursor_execute
+        if context.connection is not None:
+            pending = context.connection.info.get('query_started')
+            if pending:
+                pending.pop()
+
+        error = type(context.original_exception).__name__
+        with self.lock:
+            self.db_errors[error] = self.db_errors.get(error, 0) + 1
+
+        # Routes turn exceptions into 500 responses, so log them here where the cause is known
+        logger.warning(
+            "database error %s endpoint=%s: %s", error,
+            request.endpoint if has_request_context() else '-', context.original_exception
+        )
+
+    # Reporting
+    def snapshot(self):
+        def summary(histogram, scale=1000):
+            p50, p95, p99 = (histogram.percentile(fraction) for fraction in (0.5, 0.95, 0.99))
+            return {
+                'mean': histogram.sum / histogram.count * scale if histogram.count else 0.0,
+                'p50': p50 * scale if p50 is not None else None,
+                'p95': p95 * scale if p95 is not None else None,
+                'p99': p99 * scale if p99 is not None else None,
+            }
+
+        with self.lock:
+            endpoints = {
+                endpoint: {
+                    'requests': stats.request_seconds.count,
+                    'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+                    'request_ms': summary(stats.request_seconds),
+                    'db_ms': summary(stats.db_seconds),
+                    'serialize_ms': summary(stats.serialize_seconds),
+                    'queries': summary(stats.queries, scale=1),
+                    'slowest_statements': [
+                        {'statement': ' '.join(statement.split()), 'ms': seconds * 1000}
+                        for statement, seconds in sorted(stats.slowest.items(), key=lambda item: -item[1])
+                    ]
+                }
+                for endpoint, stats in self.endpoints.items()
+            }
+            return {
+                'pid': os.getpid(),
+                'slow_query_ms': self.slow_query_seconds * 1000,
+                'slow_queries': self.slow_queries,
+                'db_errors': dict(self.db_errors),
+                'endpoints': endpoints
+            }
+
+    def prometheus(self, pool_stats=None):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, help_text, attribute):
+            family(name, 'histogram', help_text)
+            for endpoint, stats in self.endpoints.items():
+                values = getattr(stats, attribute)
+                label = f'endpoint="{escape_label(endpoint)}"'
+                for bound, total in values.cumulative():
+                    lines.append(f'{name}_bucket{{{label},le="{format_number(bound)}"}} {total}')
+                lines.append(f'{name}_sum{{{label}}} {format_number(values.sum)}')
+                lines.append(f'{name}_count{{{label}}} {values.count}')
+
+        with self.lock:
+            family('http_requests_total', 'counter', 'Requests by endpoint and status code.')
+            for endpoint, stats in self.endpoints.items():
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'http_requests_total{{endpoint="{escape_label(endpoint)}",status="{status}"}} {count}')
+
+            histogram('http_request_duration_seconds', 'Time spent handling the request.', 'request_seconds')
+            histogram('db_time_seconds', 'Time spent in database statements per request.', 'db_seconds')
+            histogram('serialization_seconds', 'Time spent encoding JSON per request.', 'serialize_seconds')
+            histogram('db_queries_per_request', 'Database statements executed per request.', 'queries')
+
+            family('db_slow_queries_total', 'counter', 'Statements slower than SLOW_QUERY_MS.')
+            lines.append(f'db_slow_queries_total {self.slow_queries}')
+
+            family('db_errors_total', 'counter', 'Database errors by exception type.')
+            for error, count in sorted(self.db_errors.items()):
+                lines.append(f'db_errors_total{{error="{escape_label(error)}"}} {count}')
+
+        if pool_stats:
+            family('db_pool_checked_out', 'gauge', 'Connections currently checked out of the pool.')
+            lines.append(f'db_pool_checked_out {pool_stats["checked_out"]}')
+            family('db_pool_checkouts_total', 'counter', 'Connection checkouts from the pool.')
+            lines.append(f'db_pool_checkouts_total {pool_stats["checkouts"]}')
+            family('db_pool_invalidations_total', 'counter', 'Pooled connections invalidated.')
+            lines.append(f'db_pool_invalidations_total {pool_stats["invalidations"]}')
+
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,86 @@
+"""JSON provider that encodes responses with orjson when it is installed.
+
+Set JSON_BACKEND=json to always use the standard library encoder.
+"""
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+USE_ORJSON = orjson is not None and os.getenv('JSON_BACKEND', 'orjson') == 'orjson'
+
+# orjson and json only disagree on non-ASCII text (json escapes it), on DEL and
+# on floats below 1e-4 or from 1e16 up (json writes 1e-05 and 1e+16, orjson
+# 0.00001 and 1e16). Bodies that could contain any of these are re-encoded with
+# json. Hex ids such as UUIDs often contain digit-e-digit runs, so exponent
+# matches only count when they sit in a number, i.e. after ':', '[' or ','.
+EXPONENT = re.compile(rb'[0-9][eE][-+0-9]')
+NUMBER_CHARS = frozenset(b'0123456789.-')
+NUMBER_STARTS = frozenset(b':[,')
+
+def needs_stdlib(body):
+    if b'0.0000' in body or b'\x7f' in body:
+        return True
+    for match in EXPONENT.finditer(body):
+        start = match.start()
+        while start > 0 and body[start - 1] in NUMBER_CHARS:
+            start -= 1
+        if start > 0 and body[start - 1] in NUMBER_STARTS:
+            return True
+    return False
+
+def iso_default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with ISO 8601 dates, encoded with orjson when installed.
+
+    Responses are byte-for-byte what the default provider gives for the same
+    data: sorted keys, ASCII only, compact separators and a trailing newline.
+    The one exception is NaN and infinity, which orjson writes as null.
+    """
+    default = staticmethod(iso_default)
+
+    def fast_dumps(self, obj):
+        try:
+            body = orjson.dumps(obj, default=iso_default,
+                                option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            # Types orjson does not handle the same way, e.g. non-string keys or big ints
+            return None
+
+        if not body.isascii() or needs_stdlib(body):
+            return None
+        return body
+
+    def response_body(self, obj):
+        """Encode obj as jsonify would, trailing newline included, e.g. for NDJSON lines."""
+        compact = self.compact is True or (self.compact is None and not self._app.debug)
+
+        if USE_ORJSON and compact and self.sort_keys and self.ensure_ascii:
+            body = self.fast_dumps(obj)
+            if body is not None:
+                return body
+
+        dump_args = {'separators': (',', ':')} if compact else {'indent': 2}
+        return f"{self.dumps(obj, **dump_args)}\n".encode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.response_body(obj), mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        if USE_ORJSON and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # Let json decide, so NaN literals and huge ints parse as before
+                pass
+        return super().loads(s, **kwargs)
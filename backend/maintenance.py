@@ -0,0 +1,370 @@
+"""Equipment maintenance scheduler.
+
+Upcoming Equipment.next_maintenance dates are kept in a min-heap. A background
+thread sleeps until the earliest date, raises an alert for each piece of
+equipment that falls due and rolls its last/next maintenance dates forward.
+Each schedule or due event costs O(log n); nothing rescans the equipment table
+after the initial load.
+
+Every process starts the thread, but only one of them, the leader, loads the
+heap and runs the schedule: the others wait to take over if it goes away. The
+leader picks up dates written by any process from the equipment changed since
+its last look (idx_equipment_updated_at), every POLL_SECONDS, and handlers in
+its own process schedule theirs straight away. Alerts are stored in
+maintenance_alerts, so every process reads the same ones.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select, text, update
+from models import db, Equipment, Farm, MaintenanceAlert
+from summaries import mark_rows
+import heapq
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_DAYS = int(os.getenv('MAINTENANCE_INTERVAL_DAYS', '90'))
+POLL_SECONDS = int(os.getenv('MAINTENANCE_POLL_SECONDS', '60'))
+ELECTION_SECONDS = int(os.getenv('MAINTENANCE_ELECTION_SECONDS', '30'))
+ALERT_RETENTION = timedelta(days=int(os.getenv('MAINTENANCE_ALERT_DAYS', '90')))
+
+# Upper bound on how long the worker sleeps, so clock changes are picked up
+MAX_SLEEP_SECONDS = 3600
+
+# Equipment updated just before the previous poll may have committed after it
+CHANGE_LOOKBACK = timedelta(minutes=5)
+
+# PostgreSQL advisory lock held by the leading scheduler ('mntc')
+LEADER_LOCK_ID = 0x6d6e7463
+
+class Leadership:
+    """One leader among the processes sharing the database.
+
+    On PostgreSQL it holds a session advisory lock on a connection of its own;
+    on SQLite an exclusive lock on a file next to the database, which the
+    processes of one host share. Both go away with the process that held them.
+    """
+
+    def __init__(self, lock_id=LEADER_LOCK_ID):
+        self.lock_id = lock_id
+        self.connection = None
+        self.file = None
+        self.leading = False
+
+    def lock_path(self, engine):
+        database = engine.url.database
+        if not database or database == ':memory:':
+            return None
+        return database + '-maintenance.lock'
+
+    def acquire(self, engine):
+        if engine.dialect.name == 'postgresql':
+            self.connection = engine.connect()
+            self.leading = self.connection.execute(select(func.pg_try_advisory_lock(self.lock_id))).scalar()
+            self.connection.commit()
+            if not self.leading:
+                self.connection.close()
+                self.connection = None
+            return self.leading
+
+        path = self.lock_path(engine)
+        if path is None:
+            # An in-memory database belongs to this process alone
+            self.leading = True
+            return True
+
+        import fcntl
+
+        self.file = open(path, 'a')
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.file.close()
+            self.file = None
+            return False
+        self.leading = True
+        return True
+
+    def held(self):
+        """False once the lock is lost with its connection."""
+        if self.connection is None:
+            return self.leading
+        try:
+            self.connection.execute(select(1))
+            self.connection.commit()
+            return True
+        except Exception:
+            return False
+
+    def release(self):
+        self.leading = False
+        if self.connection is not None:
+            try:
+                self.connection.execute(select(func.pg_advisory_unlock(self.lock_id)))
+                self.connection.commit()
+            except Exception:
+                pass
+            self.connection.close()
+            self.connection = None
+        if self.file is not None:
+            # Closing the file drops its lock
+            self.file.close()
+            self.file = None
+
+    def taken(self, engine):
+        """Whether some process leads."""
+        if self.leading:
+            return True
+        if engine.dialect.name == 'postgresql':
+            # Bigint advisory keys are split into classid (high) and objid (low) halves
+            return db.session.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+                    "AND classid = :high AND objid = :low AND objsubid = 1)"
+                ),
+                {'high': self.lock_id >> 32, 'low': self.lock_id & 0xFFFFFFFF}
+            ).scalar()
+
+        path = self.lock_path(engine)
+        if path is None or not os.path.exists(path):
+            return False
+
+        import fcntl
+
+        with open(path, 'a') as probe:
+            try:
+                fcntl.flock(probe, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            return False
+
+class MaintenanceScheduler:
+    def __init__(self, interval_days=INTERVAL_DAYS):
+        self.interval = timedelta(days=interval_days)
+        self.heap = []
+        # Current due date per equipment id; heap entries that disagree are stale
+        self.due = {}
+        self.watermark = None
+        self.leadership = Leadership()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def leading(self):
+        return self.running and self.leadership.leading
+
+    def active(self):
+        """Whether a scheduler leads in any process."""
+        return self.leading or self.leadership.taken(db.engine)
+
+    def load(self):
+        self.watermark = datetime.utcnow()
+        rows = db.session.execute(
+            select(Equipment.id, Equipment.next_maintenance)
+            .where(Equipment.next_maintenance.isnot(None))
+        ).all()
+
+        with self.condition:
+            self.due = {equipment_id: due for equipment_id, due in rows}
+            self.heap = [(due, equipment_id) for equipment_id, due in rows]
+            heapq.heapify(self.heap)
+            self.condition.notify()
+
+    def track(self, equipment_id, due):
+        # Callers hold self.condition
+        if due is None:
+            self.due.pop(equipment_id, None)
+            return False
+        if self.due.get(equipment_id) == due:
+            return False
+
+        self.due[equipment_id] = due
+        heapq.heappush(self.heap, (due, equipment_id))
+        return self.heap[0] == (due, equipment_id)
+
+    def schedule(self, equipment_id, due):
+        """Track a new or changed maintenance date. No-op unless this process leads."""
+        if not self.leading:
+            return
+
+        with self.condition:
+            # Wake the worker only if this is now the earliest date
+            if self.track(equipment_id, due):
+                self.condition.notify()
+
+    def poll_changes(self):
+        """Track the dates of equipment changed by any process since the last poll."""
+        since = self.watermark - CHANGE_LOOKBACK
+        self.watermark = datetime.utcnow()
+        rows = db.session.execute(
+            select(Equipment.id, Equipment.next_maintenance)
+            .where(Equipment.updated_at >= since)
+        ).all()
+
+        with self.condition:
+            for equipment_id, due in rows:
+                self.track(equipment_id, due)
+
+    def pop_due(self, today):
+        due_items = []
+
+        while self.heap and self.heap[0][0] <= today:
+            due, equipment_id = heapq.heappop(self.heap)
+            if self.due.get(equipment_id) == due:
+                del self.due[equipment_id]
+                due_items.append((equipment_id, due))
+
+        return due_items
+
+    def seconds_until_next(self, now):
+        if not self.heap:
+            return MAX_SLEEP_SECONDS
+
+        wake_at = datetime.combine(self.heap[0][0], datetime.min.time())
+        return min(max((wake_at - now).total_seconds(), 0), MAX_SLEEP_SECONDS)
+
+    def roll_forward(self, equipment_id, due, today):
+        next_due = due + self.interval
+        while next_due <= today:
+            next_due += self.interval
+
+        # Only roll over a date nobody has changed since it was tracked
+        result = db.session.execute(
+            update(Equipment)
+            .where(Equipment.id == equipment_id, Equipment.next_maintenance == due)
+            .values(last_maintenance=due, next_maintenance=next_due, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            # The farm's next maintenance date moves with it
+            mark_rows(Equipment, [equipment_id])
+            db.session.execute(insert(MaintenanceAlert), [{
+                'equipment_id': equipment_id,
+                'due_date': due,
+                'next_maintenance': next_due,
+                'raised_at': datetime.utcnow(),
+            }])
+        db.session.commit()
+
+        if result.rowcount != 1:
+            return None
+        return next_due
+
+    def process_due(self):
+        today = datetime.utcnow().date()
+
+        with self.condition:
+            due_items = self.pop_due(today)
+
+        for equipment_id, due in due_items:
+            try:
+                next_due = self.roll_forward(equipment_id, due, today)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Failed to roll maintenance forward for equipment %s", equipment_id)
+                continue
+
+            if next_due is None:
+                continue
+
+            logger.warning("Maintenance due for equipment %s on %s", equipment_id, due.isoformat())
+
+            with self.condition:
+                self.track(equipment_id, next_due)
+
+        if due_items:
+            db.session.execute(
+                delete(MaintenanceAlert)
+                .where(MaintenanceAlert.raised_at < datetime.utcnow() - ALERT_RETENTION)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+    def lead(self):
+        self.load()
+        db.session.remove()
+
+        while True:
+            with self.condition:
+                if self.stopping:
+                    return
+                self.condition.wait(min(self.seconds_until_next(datetime.utcnow()), POLL_SECONDS))
+                if self.stopping:
+                    return
+
+            if not self.leadership.held():
+                logger.warning("Lost the maintenance scheduler lock")
+                return
+
+            self.poll_changes()
+            self.process_due()
+            db.session.remove()
+
+    def run(self, app):
+        with app.app_context():
+            while not self.stopping:
+                try:
+                    if self.leadership.acquire(db.engine):
+                        logger.info("Leading the maintenance scheduler")
+                        self.lead()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Maintenance scheduler failed")
+                finally:
+                    self.leadership.release()
+                    db.session.remove()
+                    with self.condition:
+                        self.heap = []
+                        self.due = {}
+
+                # Another process leads, or this one stopped leading: try again later
+                with self.condition:
+                    if not self.stopping:
+                        self.condition.wait(ELECTION_SECONDS)
+
+    def start(self, app):
+        if self.running:
+            return
+
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, args=(app,), name='maintenance-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+scheduler = MaintenanceScheduler()
+
+def recent_alerts(limit):
+    """The latest alerts raised by any process, oldest first."""
+    alerts = db.session.execute(
+        select(MaintenanceAlert).order_by(MaintenanceAlert.id.desc()).limit(limit)
+    ).scalars().all()
+    return [alert.to_dict() for alert in reversed(alerts)]
+
+def get_due_equipment(days, owner_id=None, status=None):
+    """Query for equipment due within `days` days, using the next_maintenance index."""
+    cutoff = datetime.utcnow().date() + timedelta(days=days)
+    query = Equipment.query.filter(
+        Equipment.next_maintenance.isnot(None),
+        Equipment.next_maintenance <= cutoff
+    )
+
+    if owner_id:
+        query = query.filter(Equipment.farm_id.in_(select(Farm.id).where(Farm.owner_id == owner_id)))
+    if status:
+        query = query.filter(Equipment.status == status)
+
+    return query.order_by(Equipment.next_maintenance.asc())
@@ -0,0 +1,59 @@
+"""Alembic environment.
+
+The database URL comes from the sqlalchemy.url option when it is set (app.py
+sets it from the app config), otherwise from DATABASE_URL.
+"""
+from alembic import context
+from dotenv import load_dotenv
+from logging.config import fileConfig
+from sqlalchemy import create_engine, pool
+from models import db
+import os
+
+load_dotenv()
+
+config = context.config
+if config.config_file_name is not None:
+    # Keep the app's loggers working when migrations run from app.py
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = db.metadata
+
+# Search objects live outside the models (see search.create_search_index)
+SEARCH_OBJECTS = {'idx_products_search', 'products_fts'}
+
+def include_name(name, type_, parent_names):
+    return not (name in SEARCH_OBJECTS or (name or '').startswith('products_fts_'))
+
+def database_url():
+    return config.get_main_option('sqlalchemy.url') or os.getenv('DATABASE_URL')
+
+def run_migrations_offline():
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'}
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    engine = create_engine(database_url(), poolclass=pool.NullPool)
+
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,132 @@
+"""Baseline schema, exactly as previously kept in database/schema.sql
+
+Databases created from that file are already at this revision:
+
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def decimal(precision, scale):
+    # SQLite would store DECIMAL with NUMERIC affinity and return 10.0 as 10
+    return sa.Numeric(precision, scale).with_variant(sa.Float(), 'sqlite')
+
+def timestamps():
+    return [
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp()),
+    ]
+
+def farm_id():
+    return sa.Column('farm_id', sa.String(36), sa.ForeignKey('farms.id', ondelete='CASCADE'), nullable=False)
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('email', sa.String(255), nullable=False, unique=True),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('role', sa.String(50), nullable=False, server_default='Farmer'),
+        *timestamps()
+    )
+
+    op.create_table(
+        'farms',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('location', sa.String(255), nullable=False),
+        sa.Column('size', decimal(10, 2), nullable=False),
+        sa.Column('owner_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        *timestamps()
+    )
+
+    op.create_table(
+        'crops',
+        sa.Column('id', sa.String(36), primary_key=True),
+        farm_id(),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('area', decimal(10, 2), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False, server_default='Planning'),
+        sa.Column('planted_date', sa.Date()),
+        sa.Column('harvest_date', sa.Date()),
+        *timestamps()
+    )
+
+    op.create_table(
+        'soil_records',
+        sa.Column('id', sa.String(36), primary_key=True),
+        farm_id(),
+        sa.Column('ph', decimal(4, 2), nullable=False),
+        sa.Column('nitrogen', decimal(6, 2), nullable=False),
+        sa.Column('phosphorus', decimal(6, 2), nullable=False),
+        sa.Column('potassium', decimal(6, 2), nullable=False),
+        sa.Column('organic_matter', decimal(4, 2), nullable=False),
+        sa.Column('record_date', sa.Date(), nullable=False, server_default=sa.text('CURRENT_DATE')),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp())
+    )
+
+    op.create_table(
+        'equipment',
+        sa.Column('id', sa.String(36), primary_key=True),
+        farm_id(),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False, server_default='Operational'),
+        sa.Column('last_maintenance', sa.Date()),
+        sa.Column('next_maintenance', sa.Date()),
+        *timestamps()
+    )
+
+    op.create_table(
+        'products',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('price', decimal(10, 2), nullable=False),
+        sa.Column('category', sa.String(100), nullable=False),
+        sa.Column('stock_quantity', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('image_url', sa.String(255)),
+        *timestamps()
+    )
+
+    op.create_table(
+        'orders',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False, server_default='Pending'),
+        sa.Column('total_amount', decimal(10, 2), nullable=False),
+        sa.Column('order_date', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp()),
+        sa.Column('delivery_date', sa.DateTime(timezone=True)),
+        *timestamps()
+    )
+
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('order_id', sa.String(36), sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('product_id', sa.String(36), sa.ForeignKey('products.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', decimal(10, 2), nullable=False)
+    )
+
+    op.create_index('idx_farms_owner', 'farms', ['owner_id'])
+    op.create_index('idx_crops_farm', 'crops', ['farm_id'])
+    op.create_index('idx_soil_records_farm', 'soil_records', ['farm_id'])
+    op.create_index('idx_equipment_farm', 'equipment', ['farm_id'])
+    op.create_index('idx_orders_user', 'orders', ['user_id'])
+    op.create_index('idx_order_items_order', 'order_items', ['order_id'])
+    op.create_index('idx_order_items_product', 'order_items', ['product_id'])
+    op.create_index('idx_products_category', 'products', ['category'])
+
+def downgrade():
+    for table in ('order_items', 'orders', 'products', 'equipment', 'soil_records', 'crops', 'farms', 'users'):
+        op.drop_table(table)
@@ -0,0 +1,156 @@
+"""Soil rollups, full-text search, and indexes for the list, dashboard and due-date queries
+
+Tables and indexes the application needs on top of the schema.sql baseline:
+
+- soil_rollups: daily, weekly and monthly soil reading aggregates (see
+  soil_history.py), filled here from the existing readings.
+- The product search index: a GIN index on PostgreSQL, an FTS5 table kept in
+  step by triggers on SQLite, which is filled from the existing products.
+- products: (category, price, id) and (category, name, id) serve the category
+  filter with either sort, including the keyset tiebreaker; (price, id) and
+  (name, id) serve the unfiltered listing. They replace idx_products_category.
+- soil_records: (farm_id, record_date DESC, created_at DESC) matches the
+  latest-record window and history ranges, replacing idx_soil_records_farm.
+- equipment: a partial index on next_maintenance for rows that have a date,
+  and (status, next_maintenance) for due lists filtered by status.
+- orders: (user_id, order_date DESC, id DESC) for a user's order history.
+
+users.email needs nothing new: its UNIQUE constraint is already indexed.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# Frozen copies of what soil_history.py and search.py held at this revision
+MEASUREMENTS = ['ph', 'nitrogen', 'phosphorus', 'potassium', 'organic_matter']
+
+# First day of each rollup period; weeks start on Monday
+PERIOD_STARTS = {
+    'postgresql': {
+        'day': 'record_date',
+        'week': "CAST(date_trunc('week', record_date) AS DATE)",
+        'month': "CAST(date_trunc('month', record_date) AS DATE)",
+    },
+    'sqlite': {
+        'day': 'record_date',
+        'week': "date(record_date, '-' || ((CAST(strftime('%w', record_date) AS INTEGER) + 6) % 7) || ' days')",
+        'month': "date(record_date, 'start of month')",
+    },
+}
+
+SEARCH_INDEX = {
+    'postgresql': [
+        "CREATE INDEX idx_products_search ON products "
+        "USING GIN (to_tsvector('english'::regconfig, name || ' ' || coalesce(description, '')))",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE products_fts USING fts5("
+        "name, description, content='products', content_rowid='rowid', "
+        "tokenize='porter unicode61')",
+        "CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts(rowid, name, description) "
+        "VALUES (new.rowid, new.name, new.description); END",
+        "CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.rowid, old.name, old.description); END",
+        "CREATE TRIGGER products_fts_update AFTER UPDATE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.rowid, old.name, old.description); "
+        "INSERT INTO products_fts(rowid, name, description) "
+        "VALUES (new.rowid, new.name, new.description); END",
+        # The triggers only cover later writes; index the products already there
+        "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+    ],
+}
+
+def upgrade():
+    op.create_table(
+        'soil_rollups',
+        sa.Column('farm_id', sa.String(36), sa.ForeignKey('farms.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('period', sa.String(10), primary_key=True),
+        sa.Column('period_start', sa.Date(), primary_key=True),
+        sa.Column('sample_count', sa.Integer(), nullable=False, server_default='0'),
+        *[
+            sa.Column(f'{measurement}_{stat}', sa.Float(), nullable=False)
+            for measurement in MEASUREMENTS
+            for stat in ('sum', 'min', 'max')
+        ]
+    )
+
+    dialect = op.get_bind().dialect.name
+    columns = ', '.join(
+        f'{measurement}_{stat}' for measurement in MEASUREMENTS for stat in ('sum', 'min', 'max')
+    )
+    stats = ', '.join(
+        f'{function}({measurement})' for measurement in MEASUREMENTS for function in ('SUM', 'MIN', 'MAX')
+    )
+    for period, start in PERIOD_STARTS.get(dialect, {}).items():
+        op.execute(
+            f"INSERT INTO soil_rollups (farm_id, period, period_start, sample_count, {columns}) "
+            f"SELECT farm_id, '{period}', {start}, COUNT(*), {stats} "
+            f"FROM soil_records GROUP BY farm_id, {start}"
+        )
+
+    # Creating the index also indexes the products already there
+    search_index = SEARCH_INDEX.get(dialect, [])
+    if dialect == 'sqlite':
+        try:
+            op.execute(search_index[0])
+        except Exception:
+            # SQLite was built without FTS5, search falls back to LIKE
+            search_index = []
+        else:
+            search_index = search_index[1:]
+    for statement in search_index:
+        op.execute(statement)
+
+    op.create_index('idx_products_category_price', 'products', ['category', 'price', 'id'])
+    op.create_index('idx_products_category_name', 'products', ['category', 'name', 'id'])
+    op.create_index('idx_products_price', 'products', ['price', 'id'])
+    op.create_index('idx_products_name', 'products', ['name', 'id'])
+    op.drop_index('idx_products_category', table_name='products')
+
+    op.drop_index('idx_soil_records_farm', table_name='soil_records')
+    op.create_index('idx_soil_records_farm_date', 'soil_records',
+                    ['farm_id', sa.text('record_date DESC'), sa.text('created_at DESC')])
+
+    op.create_index('idx_equipment_due', 'equipment', ['next_maintenance'],
+                    postgresql_where=sa.text('next_maintenance IS NOT NULL'),
+                    sqlite_where=sa.text('next_maintenance IS NOT NULL'))
+    op.create_index('idx_equipment_status_next_maintenance', 'equipment', ['status', 'next_maintenance'])
+
+    op.create_index('idx_orders_user_date', 'orders', ['user_id', sa.text('order_date DESC'), sa.text('id DESC')])
+    op.drop_index('idx_orders_user', table_name='orders')
+
+def downgrade():
+    op.create_index('idx_orders_user', 'orders', ['user_id'])
+    op.drop_index('idx_orders_user_date', table_name='orders')
+
+    op.drop_index('idx_equipment_status_next_maintenance', table_name='equipment')
+    op.drop_index('idx_equipment_due', table_name='equipment')
+
+    op.drop_index('idx_soil_records_farm_date', table_name='soil_records')
+    op.create_index('idx_soil_records_farm', 'soil_records', ['farm_id'])
+
+    op.create_index('idx_products_category', 'products', ['category'])
+    op.drop_index('idx_products_name', table_name='products')
+    op.drop_index('idx_products_price', table_name='products')
+    op.drop_index('idx_products_category_name', table_name='products')
+    op.drop_index('idx_products_category_price', table_name='products')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('products_fts_insert', 'products_fts_delete', 'products_fts_update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS products_fts')
+    else:
+        op.execute('DROP INDEX IF EXISTS idx_products_search')
+
+    op.drop_table('soil_rollups')
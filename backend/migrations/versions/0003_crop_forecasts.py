@@ -0,0 +1,41 @@
+"""Stored harvest forecasts per crop
+
+- crop_forecasts: one row per crop with its growth stage, expected harvest
+  week and volume, refreshed incrementally by forecasting.refresh_forecasts.
+- crops: an index on updated_at finds the crops changed since the last run.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'crop_forecasts',
+        sa.Column('crop_id', sa.String(36), sa.ForeignKey('crops.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('farm_id', sa.String(36), sa.ForeignKey('farms.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('crop_name', sa.String(255), nullable=False),
+        sa.Column('stage', sa.String(20), nullable=False),
+        sa.Column('expected_harvest_date', sa.Date()),
+        sa.Column('harvest_week', sa.Date()),
+        sa.Column('expected_volume', sa.Float(), nullable=False),
+        sa.Column('recompute_on', sa.Date()),
+        sa.Column('crop_updated_at', sa.DateTime(timezone=True)),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('idx_crop_forecasts_farm_week', 'crop_forecasts', ['farm_id', 'harvest_week'])
+    op.create_index('idx_crop_forecasts_week', 'crop_forecasts', ['harvest_week'])
+    op.create_index('idx_crop_forecasts_recompute', 'crop_forecasts', ['recompute_on'])
+
+    op.create_index('idx_crops_updated_at', 'crops', ['updated_at'])
+
+def downgrade():
+    op.drop_index('idx_crops_updated_at', table_name='crops')
+    op.drop_table('crop_forecasts')
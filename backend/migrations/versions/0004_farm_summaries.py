@@ -0,0 +1,68 @@
+"""Per-farm and per-owner summary tables
+
+- farm_summaries: hectares, crop, equipment and latest soil totals per farm.
+- owner_summaries: the same totals added up per owner; latest_ph_sum backs
+  average_ph so both can be adjusted by difference.
+
+Both are maintained by summaries.py on every write and filled here from the
+existing rows.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from summaries import rebuild_summaries
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def counter(name):
+    return sa.Column(name, sa.Integer(), nullable=False)
+
+def upgrade():
+    op.create_table(
+        'farm_summaries',
+        sa.Column('farm_id', sa.String(36), sa.ForeignKey('farms.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('owner_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('location', sa.String(255), nullable=False),
+        sa.Column('size', sa.Float(), nullable=False),
+        counter('crop_count'),
+        counter('active_crops'),
+        sa.Column('planted_area', sa.Float(), nullable=False),
+        counter('equipment_count'),
+        counter('equipment_needing_service'),
+        sa.Column('next_maintenance', sa.Date()),
+        sa.Column('latest_ph', sa.Float()),
+        sa.Column('latest_soil_date', sa.Date()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('idx_farm_summaries_owner', 'farm_summaries', ['owner_id', 'name', 'farm_id'])
+    op.create_index('idx_farm_summaries_owner_maintenance', 'farm_summaries', ['owner_id', 'next_maintenance'])
+
+    op.create_table(
+        'owner_summaries',
+        sa.Column('owner_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        counter('farm_count'),
+        sa.Column('total_size', sa.Float(), nullable=False),
+        counter('crop_count'),
+        counter('active_crops'),
+        sa.Column('planted_area', sa.Float(), nullable=False),
+        counter('equipment_count'),
+        counter('equipment_needing_service'),
+        sa.Column('next_maintenance', sa.Date()),
+        counter('farms_with_soil'),
+        sa.Column('latest_ph_sum', sa.Float(), nullable=False),
+        sa.Column('average_ph', sa.Float()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+
+    rebuild_summaries(op.get_bind())
+
+def downgrade():
+    op.drop_table('owner_summaries')
+    op.drop_table('farm_summaries')
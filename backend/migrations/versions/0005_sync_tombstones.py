@@ -0,0 +1,44 @@
+"""Delta sync for offline field devices
+
+- sync_tombstones: one row per deleted farm, crop or equipment row, kept for
+  SYNC_TOMBSTONE_DAYS so devices learn about deletions.
+- farms: (owner_id, updated_at, id) finds an owner's changed farms and
+  replaces idx_farms_owner.
+- equipment, soil_records: indexes on updated_at and created_at find the rows
+  changed since a device's watermark.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('resource', sa.String(20), nullable=False),
+        sa.Column('row_id', sa.String(36), nullable=False),
+        sa.Column('owner_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('idx_sync_tombstones_owner', 'sync_tombstones', ['owner_id', 'deleted_at', 'id'])
+    op.create_index('idx_sync_tombstones_deleted_at', 'sync_tombstones', ['deleted_at'])
+
+    op.create_index('idx_farms_owner_updated_at', 'farms', ['owner_id', 'updated_at', 'id'])
+    op.drop_index('idx_farms_owner', table_name='farms')
+    op.create_index('idx_equipment_updated_at', 'equipment', ['updated_at'])
+    op.create_index('idx_soil_records_created_at', 'soil_records', ['created_at'])
+
+def downgrade():
+    op.drop_index('idx_soil_records_created_at', table_name='soil_records')
+    op.drop_index('idx_equipment_updated_at', table_name='equipment')
+    op.create_index('idx_farms_owner', 'farms', ['owner_id'])
+    op.drop_index('idx_farms_owner_updated_at', table_name='farms')
+    op.drop_table('sync_tombstones')
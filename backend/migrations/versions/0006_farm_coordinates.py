@@ -0,0 +1,47 @@
+"""Farm coordinates and spatial indexes
+
+- farms: latitude and longitude, plus grid_cell, the fixed-size grid cell
+  geo.py buckets the coordinates into, indexed with the coordinates.
+- On PostgreSQL with PostGIS available, the extension is enabled and a GiST
+  index on the farms' geography serves box, radius and nearest-farm queries.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+def postgis_available(bind):
+    return bind.dialect.name == 'postgresql' and bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'postgis'")
+    ).scalar() is not None
+
+def upgrade():
+    with op.batch_alter_table('farms') as batch:
+        batch.add_column(sa.Column('latitude', sa.Float()))
+        batch.add_column(sa.Column('longitude', sa.Float()))
+        batch.add_column(sa.Column('grid_cell', sa.Integer()))
+    op.create_index('idx_farms_grid', 'farms', ['grid_cell', 'latitude', 'longitude', 'id'])
+
+    bind = op.get_bind()
+    if postgis_available(bind):
+        op.execute('CREATE EXTENSION IF NOT EXISTS postgis')
+        # geo.FARM_GEOGRAPHY must stay the same expression for queries to use this index
+        op.execute(
+            'CREATE INDEX idx_farms_geography ON farms USING gist '
+            '(geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)))'
+        )
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS idx_farms_geography')
+    op.drop_index('idx_farms_grid', table_name='farms')
+    with op.batch_alter_table('farms') as batch:
+        batch.drop_column('grid_cell')
+        batch.drop_column('longitude')
+        batch.drop_column('latitude')
@@ -0,0 +1,25 @@
+"""Id column storage
+
+Converts every id and foreign key column to the storage configured by
+ID_STORAGE (see ids.py): left as VARCHAR(36) for string, the default, or
+changed to PostgreSQL's native uuid, or a 16-byte BLOB on SQLite, for binary.
+Existing ids are converted in place and must all be UUIDs; the migration stops
+and names the offending values otherwise. Downgrading converts back to strings.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+from ids import ID_STORAGE, convert_id_storage
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    convert_id_storage(op, ID_STORAGE)
+
+def downgrade():
+    convert_id_storage(op, 'string')
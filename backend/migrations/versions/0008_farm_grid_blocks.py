@@ -0,0 +1,35 @@
+"""Coarse spatial grid for farms
+
+- farms: grid_block, the block of GRID_BLOCK by GRID_BLOCK grid cells holding
+  each farm (see geo.py), indexed with the coordinates. Searches too large for
+  the cell grid use it instead of scanning every farm. It is filled here from
+  grid_cell.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from geo import BLOCK_COLUMNS, GRID_BLOCK, GRID_COLUMNS
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('farms') as batch:
+        batch.add_column(sa.Column('grid_block', sa.Integer()))
+
+    # Same as geo.grid_block(); grid_cell is an integer, so / divides without a remainder
+    op.execute(
+        f'UPDATE farms SET grid_block = grid_cell / {GRID_COLUMNS * GRID_BLOCK} * {BLOCK_COLUMNS} '
+        f'+ grid_cell % {GRID_COLUMNS} / {GRID_BLOCK} WHERE grid_cell IS NOT NULL'
+    )
+    op.create_index('idx_farms_grid_block', 'farms', ['grid_block', 'latitude', 'longitude', 'id'])
+
+def downgrade():
+    op.drop_index('idx_farms_grid_block', table_name='farms')
+    with op.batch_alter_table('farms') as batch:
+        batch.drop_column('grid_block')
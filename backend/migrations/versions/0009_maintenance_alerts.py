@@ -0,0 +1,36 @@
+"""Maintenance alerts
+
+- maintenance_alerts: one row per maintenance date that fell due, written by
+  the scheduler in the same transaction that rolls the equipment's dates
+  forward, so every process reads the same alerts. Old ones are pruned by
+  raised_at.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Ids use whatever storage migration 0007 left the other tables in
+    users_id = next(column for column in sa.inspect(op.get_bind()).get_columns('users') if column['name'] == 'id')
+    id_type = sa.String(36) if isinstance(users_id['type'], sa.String) else users_id['type']
+
+    op.create_table(
+        'maintenance_alerts',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('equipment_id', id_type, nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('next_maintenance', sa.Date(), nullable=False),
+        sa.Column('raised_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('idx_maintenance_alerts_raised_at', 'maintenance_alerts', ['raised_at'])
+
+def downgrade():
+    op.drop_table('maintenance_alerts')
@@ -1,14 +1,11 @@
-from app import db
+from extensions import db
 from datetime import datetime
-import uuid
-
-def generate_uuid():
-    return str(uuid.uuid4())
+from ids import generate_uuid, id_type
 
 class User(db.Model):
     __tablename__ = 'users'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
@@ -32,11 +29,16 @@ class User(db.Model):
 class Farm(db.Model):
     __tablename__ = 'farms'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(255), nullable=False)
     location = db.Column(db.String(255), nullable=False)
     size = db.Column(db.Float, nullable=False)
-    owner_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    owner_id = db.Column(id_type(), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    # Spatial grid cell and coarser block of the coordinates, maintained by geo.py
+    grid_cell = db.Column(db.Integer)
+    grid_block = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -51,6 +53,8 @@ class Farm(db.Model):
             'location': self.location,
             'size': self.size,
             'owner_id': self.owner_id,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -58,8 +62,8 @@ class Farm(db.Model):
 class Crop(db.Model):
     __tablename__ = 'crops'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    farm_id = db.Column(db.String(36), db.ForeignKey('farms.id'), nullable=False)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
+    farm_id = db.Column(id_type(), db.ForeignKey('farms.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     area = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), default='Planning', nullable=False)
@@ -81,17 +85,43 @@ class Crop(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
 
+class CropForecast(db.Model):
+    __tablename__ = 'crop_forecasts'
+    
+    crop_id = db.Column(id_type(), db.ForeignKey('crops.id', ondelete='CASCADE'), primary_key=True)
+    farm_id = db.Column(id_type(), db.ForeignKey('farms.id', ondelete='CASCADE'), nullable=False)
+    crop_name = db.Column(db.String(255), nullable=False)
+    stage = db.Column(db.String(20), nullable=False)
+    expected_harvest_date = db.Column(db.Date)
+    harvest_week = db.Column(db.Date)
+    expected_volume = db.Column(db.Float, default=0.0, nullable=False)
+    recompute_on = db.Column(db.Date)
+    crop_updated_at = db.Column(db.DateTime)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'crop_id': self.crop_id,
+            'farm_id': self.farm_id,
+            'crop_name': self.crop_name,
+            'stage': self.stage,
+            'expected_harvest_date': self.expected_harvest_date.isoformat() if self.expected_harvest_date else None,
+            'harvest_week': self.harvest_week.isoformat() if self.harvest_week else None,
+            'expected_volume': self.expected_volume,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
 class SoilRecord(db.Model):
     __tablename__ = 'soil_records'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    farm_id = db.Column(db.String(36), db.ForeignKey('farms.id'), nullable=False)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
+    farm_id = db.Column(id_type(), db.ForeignKey('farms.id', ondelete='CASCADE'), nullable=False)
     ph = db.Column(db.Float, nullable=False)
     nitrogen = db.Column(db.Float, nullable=False)
     phosphorus = db.Column(db.Float, nullable=False)
     potassium = db.Column(db.Float, nullable=False)
     organic_matter = db.Column(db.Float, nullable=False)
-    record_date = db.Column(db.Date, default=datetime.utcnow().date)
+    record_date = db.Column(db.Date, default=datetime.utcnow().date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -107,11 +137,49 @@ class SoilRecord(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class SoilRollup(db.Model):
+    __tablename__ = 'soil_rollups'
+    
+    farm_id = db.Column(id_type(), db.ForeignKey('farms.id', ondelete='CASCADE'), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    sample_count = db.Column(db.Integer, default=0, nullable=False)
+    ph_sum = db.Column(db.Float, nullable=False)
+    ph_min = db.Column(db.Float, nullable=False)
+    ph_max = db.Column(db.Float, nullable=False)
+    nitrogen_sum = db.Column(db.Float, nullable=False)
+    nitrogen_min = db.Column(db.Float, nullable=False)
+    nitrogen_max = db.Column(db.Float, nullable=False)
+    phosphorus_sum = db.Column(db.Float, nullable=False)
+    phosphorus_min = db.Column(db.Float, nullable=False)
+    phosphorus_max = db.Column(db.Float, nullable=False)
+    potassium_sum = db.Column(db.Float, nullable=False)
+    potassium_min = db.Column(db.Float, nullable=False)
+    potassium_max = db.Column(db.Float, nullable=False)
+    organic_matter_sum = db.Column(db.Float, nullable=False)
+    organic_matter_min = db.Column(db.Float, nullable=False)
+    organic_matter_max = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        result = {
+            'farm_id': self.farm_id,
+            'period': self.period,
+            'period_start': self.period_start.isoformat(),
+            'count': self.sample_count
+        }
+        for field in ['ph', 'nitrogen', 'phosphorus', 'potassium', 'organic_matter']:
+            result[field] = {
+                'mean': getattr(self, f'{field}_sum') / self.sample_count,
+                'min': getattr(self, f'{field}_min'),
+                'max': getattr(self, f'{field}_max')
+            }
+        return result
+
 class Equipment(db.Model):
     __tablename__ = 'equipment'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    farm_id = db.Column(db.String(36), db.ForeignKey('farms.id'), nullable=False)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
+    farm_id = db.Column(id_type(), db.ForeignKey('farms.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     status = db.Column(db.String(50), default='Operational', nullable=False)
     last_maintenance = db.Column(db.Date)
@@ -131,10 +199,71 @@ class Equipment(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
 
+class MaintenanceAlert(db.Model):
+    __tablename__ = 'maintenance_alerts'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    equipment_id = db.Column(id_type(), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    next_maintenance = db.Column(db.Date, nullable=False)
+    raised_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'equipment_id': self.equipment_id,
+            'due_date': self.due_date.isoformat(),
+            'next_maintenance': self.next_maintenance.isoformat(),
+            'raised_at': self.raised_at.isoformat()
+        }
+
+class FarmSummary(db.Model):
+    __tablename__ = 'farm_summaries'
+    
+    farm_id = db.Column(id_type(), db.ForeignKey('farms.id', ondelete='CASCADE'), primary_key=True)
+    owner_id = db.Column(id_type(), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    location = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Float, nullable=False)
+    crop_count = db.Column(db.Integer, default=0, nullable=False)
+    active_crops = db.Column(db.Integer, default=0, nullable=False)
+    planted_area = db.Column(db.Float, default=0.0, nullable=False)
+    equipment_count = db.Column(db.Integer, default=0, nullable=False)
+    equipment_needing_service = db.Column(db.Integer, default=0, nullable=False)
+    next_maintenance = db.Column(db.Date)
+    latest_ph = db.Column(db.Float)
+    latest_soil_date = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OwnerSummary(db.Model):
+    __tablename__ = 'owner_summaries'
+    
+    owner_id = db.Column(id_type(), db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    farm_count = db.Column(db.Integer, default=0, nullable=False)
+    total_size = db.Column(db.Float, default=0.0, nullable=False)
+    crop_count = db.Column(db.Integer, default=0, nullable=False)
+    active_crops = db.Column(db.Integer, default=0, nullable=False)
+    planted_area = db.Column(db.Float, default=0.0, nullable=False)
+    equipment_count = db.Column(db.Integer, default=0, nullable=False)
+    equipment_needing_service = db.Column(db.Integer, default=0, nullable=False)
+    next_maintenance = db.Column(db.Date)
+    farms_with_soil = db.Column(db.Integer, default=0, nullable=False)
+    latest_ph_sum = db.Column(db.Float, default=0.0, nullable=False)
+    average_ph = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SyncTombstone(db.Model):
+    __tablename__ = 'sync_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    resource = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(id_type(), nullable=False)
+    owner_id = db.Column(id_type(), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class Product(db.Model):
     __tablename__ = 'products'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
@@ -162,8 +291,8 @@ class Product(db.Model):
 class Order(db.Model):
     __tablename__ = 'orders'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
+    user_id = db.Column(id_type(), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(50), default='Pending', nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
     order_date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -189,9 +318,9 @@ class Order(db.Model):
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), nullable=False)
-    product_id = db.Column(db.String(36), db.ForeignKey('products.id'), nullable=False)
+    id = db.Column(id_type(), primary_key=True, default=generate_uuid)
+    order_id = db.Column(id_type(), db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(id_type(), db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
     
@@ -205,3 +334,52 @@ class OrderItem(db.Model):
             'price': self.price,
             'subtotal': self.quantity * self.price
         }
+
+# Indexes, kept in step with the migrations in migrations/versions. Composite
+# indexes follow the filters and sort orders the routes actually use.
+db.Index('idx_crops_farm', Crop.farm_id)
+db.Index('idx_equipment_farm', Equipment.farm_id)
+db.Index('idx_order_items_order', OrderItem.order_id)
+db.Index('idx_order_items_product', OrderItem.product_id)
+
+# Product listing: category filter with name/price sort, id as the keyset tiebreaker
+db.Index('idx_products_category_price', Product.category, Product.price, Product.id)
+db.Index('idx_products_category_name', Product.category, Product.name, Product.id)
+db.Index('idx_products_price', Product.price, Product.id)
+db.Index('idx_products_name', Product.name, Product.id)
+
+# Latest soil record per farm, soil history ranges and analytics
+db.Index('idx_soil_records_farm_date', SoilRecord.farm_id, SoilRecord.record_date.desc(), SoilRecord.created_at.desc())
+
+# Maintenance due dates; only equipment with a date is ever scheduled
+db.Index('idx_equipment_due', Equipment.next_maintenance,
+         postgresql_where=Equipment.next_maintenance.isnot(None),
+         sqlite_where=Equipment.next_maintenance.isnot(None))
+db.Index('idx_equipment_status_next_maintenance', Equipment.status, Equipment.next_maintenance)
+db.Index('idx_maintenance_alerts_raised_at', MaintenanceAlert.raised_at)
+
+# Crops changed since the last forecast run, and forecasts by week or due to be recomputed
+db.Index('idx_crops_updated_at', Crop.updated_at)
+db.Index('idx_crop_forecasts_farm_week', CropForecast.farm_id, CropForecast.harvest_week)
+db.Index('idx_crop_forecasts_week', CropForecast.harvest_week)
+db.Index('idx_crop_forecasts_recompute', CropForecast.recompute_on)
+
+# An owner's farm summaries, listed by name with farm_id as the keyset tiebreaker,
+# and the owner's earliest maintenance date
+db.Index('idx_farm_summaries_owner', FarmSummary.owner_id, FarmSummary.name, FarmSummary.farm_id)
+db.Index('idx_farm_summaries_owner_maintenance', FarmSummary.owner_id, FarmSummary.next_maintenance)
+
+# A user's orders, newest first
+db.Index('idx_orders_user_date', Order.user_id, Order.order_date.desc(), Order.id.desc())
+
+# Delta sync: rows changed since a device's watermark, per owner, and expired tombstones.
+# (owner_id, updated_at, id) also serves every owner_id lookup on farms.
+db.Index('idx_farms_owner_updated_at', Farm.owner_id, Farm.updated_at, Farm.id)
+db.Index('idx_equipment_updated_at', Equipment.updated_at)
+db.Index('idx_soil_records_created_at', SoilRecord.created_at)
+db.Index('idx_sync_tombstones_owner', SyncTombstone.owner_id, SyncTombstone.deleted_at, SyncTombstone.id)
+db.Index('idx_sync_tombstones_deleted_at', SyncTombstone.deleted_at)
+
+# Farms by spatial grid cell, covering the coordinates for box and nearest-farm searches
+db.Index('idx_farms_grid', Farm.grid_cell, Farm.latitude, Farm.longitude, Farm.id)
+db.Index('idx_farms_grid_block', Farm.grid_block, Farm.latitude, Farm.longitude, Farm.id)
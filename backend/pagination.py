@@ -0,0 +1,34 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor holds the sort value and id of the last row on a page; the next page
+starts strictly after that pair. Listings with several sorts or filters also
+store the sort and a hash of the filters, so a cursor is only accepted by the
+query that produced it.
+"""
+import base64
+import binascii
+import hashlib
+import json
+
+def filters_hash(filters):
+    payload = json.dumps(filters, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+def cursor_context(sort, filters):
+    if sort is None and filters is None:
+        return []
+    return [sort, filters_hash(filters or {})]
+
+def encode_cursor(value, row_id, sort=None, filters=None):
+    payload = json.dumps([value, row_id, *cursor_context(sort, filters)]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_cursor(cursor, sort=None, filters=None):
+    try:
+        value, row_id, *context = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+    if context != cursor_context(sort, filters):
+        raise ValueError("Cursor does not match the sort and filters of this request")
+    return value, row_id
@@ -0,0 +1,22 @@
+"""Count the SQL statements a block of code sends to the database."""
+from contextlib import contextmanager
+from sqlalchemy import event
+
+@contextmanager
+def count_queries(engine):
+    """Yield a list that collects every statement executed on the engine.
+
+        with count_queries(db.engine) as statements:
+            client.get('/api/orders/')
+        assert len(statements) == 2
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,91 @@
+from flask import Blueprint, jsonify, request
+from models import Farm, Product
+from sqlalchemy import select
+from async_db import async_db
+from auth import public
+from routes.farm import assemble_dashboards, dashboard_queries
+from serializers import farm_serializer
+import asyncio
+
+async_bp = Blueprint('async_api', __name__)
+
+@async_bp.record_once
+def setup_async_db(state):
+    async_db.init_app(state.app)
+
+async def load_dashboards(farm_query, farm_ids):
+    # The farms and their three child collections are independent, so all four
+    # queries run at the same time, each on its own pooled connection
+    return await asyncio.gather(*(
+        async_db.rows(query) for query in dashboard_queries(farm_query, farm_ids)
+    ))
+
+# Views take the query arguments and URL parameters and return (body, status).
+# They run on the engine's event loop: asgi.py serves them from the ASGI
+# server's loop without a thread per request, and async_bp through Flask.
+async def get_farms(args):
+    owner_id = args.get('owner_id')
+
+    query = farm_serializer.select()
+    if owner_id:
+        query = query.where(Farm.owner_id == owner_id)
+
+    farms = await async_db.rows(query)
+
+    return farm_serializer.dump_rows(farms), 200
+
+async def get_owner_dashboard(args):
+    owner_id = args.get('owner_id')
+
+    if not owner_id:
+        return {"error": "Missing required parameter: owner_id"}, 400
+
+    owner_farm_ids = select(Farm.id).where(Farm.owner_id == owner_id)
+    farms, crops, equipment_list, soil_records = await load_dashboards(
+        farm_serializer.select().where(Farm.owner_id == owner_id), owner_farm_ids
+    )
+
+    return assemble_dashboards(farms, crops, equipment_list, soil_records), 200
+
+async def get_farm_dashboard(args, farm_id):
+    farms, crops, equipment_list, soil_records = await load_dashboards(
+        farm_serializer.select().where(Farm.id == farm_id), [farm_id]
+    )
+
+    if not farms:
+        return {"error": "Farm not found"}, 404
+
+    return assemble_dashboards(farms, crops, equipment_list, soil_records)[0], 200
+
+async def get_product(args, product_id):
+    products = await async_db.scalars(select(Product).where(Product.id == product_id))
+
+    if not products:
+        return {"error": "Product not found"}, 404
+
+    return products[0].to_dict(), 200
+
+# (rule, view, public), all GET
+ROUTES = [
+    ('/farm/', get_farms, False),
+    ('/farm/dashboard', get_owner_dashboard, False),
+    ('/farm/<farm_id>/dashboard', get_farm_dashboard, False),
+    ('/products/<product_id>', get_product, True),
+]
+
+async def call_view(view, args, params):
+    try:
+        return await async_db.run(view(args, **params))
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+def flask_view(view, is_public):
+    async def handle(**params):
+        body, status = await call_view(view, request.args, params)
+        return jsonify(body), status
+
+    handle.__name__ = view.__name__
+    return public(handle) if is_public else handle
+
+for rule, view, is_public in ROUTES:
+    async_bp.add_url_rule(rule, view_func=flask_view(view, is_public), methods=['GET'])
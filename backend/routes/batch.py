@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify, request
+from batch_ops import run_batch, DEFAULT_CHUNK_SIZE, MAX_OPERATIONS
+from maintenance import scheduler
+
+batch_bp = Blueprint('batch', __name__)
+
+@batch_bp.route('/', methods=['POST'])
+def run_operations():
+    try:
+        data = request.get_json()
+
+        # Accept either a bare list of operations or {"operations": [...]}
+        if isinstance(data, dict):
+            operations = data.get('operations')
+        else:
+            operations = data
+
+        if not isinstance(operations, list):
+            return jsonify({"error": "Missing required field: operations"}), 400
+        if len(operations) > MAX_OPERATIONS:
+            return jsonify({"error": f"Too many operations, at most {MAX_OPERATIONS} per request"}), 413
+
+        try:
+            chunk_size = int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            return jsonify({"error": "Invalid chunk_size"}), 400
+        chunk_size = max(1, min(chunk_size, 10000))
+
+        results, written = run_batch(operations, chunk_size)
+
+        # Keep the maintenance worker in step with bulk written equipment
+        for _, equipment_id, resource, op, values in written:
+            if resource == 'equipment' and op != 'delete' and 'next_maintenance' in values:
+                scheduler.schedule(equipment_id, values['next_maintenance'])
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+
+        return jsonify({
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,9 +1,26 @@
 from flask import Blueprint, jsonify, request
-from models import db, Farm, Crop, SoilRecord, Equipment
+from models import db, Farm, Crop, SoilRecord, Equipment, FarmSummary, OwnerSummary
 from datetime import datetime
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
+import soil_ingest
+from soil_history import get_history, update_rollups
+from maintenance import scheduler, get_due_equipment, recent_alerts
+from pagination import encode_cursor, decode_cursor
+from geo import in_box, nearest, validate_coordinates, DEFAULT_LIMIT, MAX_LIMIT
+from serializers import (
+    farm_serializer, crop_serializer, soil_record_serializer, equipment_serializer,
+    farm_summary_serializer, owner_summary_serializer
+)
 
 farm_bp = Blueprint('farm', __name__)
 
+SUMMARY_PAGE_SIZE = 100
+MAX_SUMMARY_PAGE_SIZE = 1000
+
+# The most maintenance alerts returned at once
+MAX_ALERTS = 1000
+
 # Farm endpoints
 @farm_bp.route('/', methods=['GET'])
 def get_farms():
@@ -18,11 +35,8 @@ def get_farms():
         if owner_id:
             query = query.filter(Farm.owner_id == owner_id)
         
-        # Execute query
-        farms = query.all()
-        
-        # Convert to dict
-        result = [farm.to_dict() for farm in farms]
+        # Execute query, selecting only the serialized columns
+        result = farm_serializer.fetch_dicts(query)
         
         return jsonify(result)
     
@@ -53,12 +67,20 @@ def create_farm():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        # Coordinates are optional, but must come as a valid pair
+        try:
+            latitude, longitude = validate_coordinates(data.get('latitude'), data.get('longitude'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Create new farm
         farm = Farm(
             name=data['name'],
             location=data['location'],
             size=data['size'],
-            owner_id=data['owner_id']
+            owner_id=data['owner_id'],
+            latitude=latitude,
+            longitude=longitude
         )
         
         # Save to database
@@ -71,6 +93,327 @@ def create_farm():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Soil analytics across farms
+@farm_bp.route('/analytics', methods=['GET'])
+def get_soil_analytics():
+    try:
+        # NumPy is only loaded once analytics are actually requested
+        from analytics import analyze_farms, DEFAULT_WINDOW
+        
+        owner_id = request.args.get('owner_id')
+        
+        try:
+            window = int(request.args.get('window', DEFAULT_WINDOW))
+        except ValueError:
+            return jsonify({"error": "Invalid window"}), 400
+        
+        if window < 1:
+            return jsonify({"error": "Invalid window"}), 400
+        
+        return jsonify(analyze_farms(owner_id, window))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Summary endpoints
+@farm_bp.route('/summary', methods=['GET'])
+def get_owner_summary():
+    try:
+        # Get query parameters
+        owner_id = request.args.get('owner_id')
+        cursor = request.args.get('cursor')
+        
+        if not owner_id:
+            return jsonify({"error": "Missing required parameter: owner_id"}), 400
+        
+        try:
+            limit = int(request.args.get('limit', SUMMARY_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+        
+        if limit < 1:
+            return jsonify({"error": "Invalid limit"}), 400
+        limit = min(limit, MAX_SUMMARY_PAGE_SIZE)
+        
+        # Totals are kept up to date on every write, so this is one primary key
+        # lookup plus one page of idx_farm_summaries_owner
+        owner = db.session.execute(
+            owner_summary_serializer.select().where(OwnerSummary.owner_id == owner_id)
+        ).first()
+        
+        query = (
+            farm_summary_serializer.select()
+            .where(FarmSummary.owner_id == owner_id)
+            .order_by(FarmSummary.name, FarmSummary.farm_id)
+        )
+        
+        # Resume after the last farm of the previous page
+        if cursor:
+            try:
+                name, farm_id = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            query = query.where(or_(
+                FarmSummary.name > name,
+                and_(FarmSummary.name == name, FarmSummary.farm_id > farm_id)
+            ))
+        
+        # Fetch one extra row to find out whether another page exists
+        farms = db.session.execute(query.limit(limit + 1)).all()
+        has_more = len(farms) > limit
+        farms = farms[:limit]
+        
+        if owner is None:
+            totals = {key: 0 for key in owner_summary_serializer.keys}
+            totals.update(owner_id=owner_id, total_size=0.0, planted_area=0.0,
+                          next_maintenance=None, average_ph=None, updated_at=None)
+        else:
+            totals = owner_summary_serializer.dump(owner)
+        
+        return jsonify({
+            'owner': totals,
+            'farms': farm_summary_serializer.dump_rows(farms),
+            'next_cursor': encode_cursor(farms[-1].name, farms[-1].farm_id) if has_more else None
+        })
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/<farm_id>/summary', methods=['GET'])
+def get_farm_summary(farm_id):
+    try:
+        summary = db.session.execute(
+            farm_summary_serializer.select().where(FarmSummary.farm_id == farm_id)
+        ).first()
+        
+        if summary is None:
+            return jsonify({"error": "Farm not found"}), 404
+        
+        return jsonify(farm_summary_serializer.dump(summary))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Spatial search
+def coordinate_args(*names):
+    """Read float query parameters, raising ValueError naming the first bad one."""
+    values = []
+    for name in names:
+        try:
+            values.append(float(request.args[name]))
+        except KeyError:
+            raise ValueError(f"Missing required parameter: {name}")
+        except ValueError:
+            raise ValueError(f"Invalid {name}")
+    return values
+
+def limit_arg(default=DEFAULT_LIMIT):
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        raise ValueError("Invalid limit")
+    return max(1, min(limit, MAX_LIMIT))
+
+@farm_bp.route('/bbox', methods=['GET'])
+def get_farms_in_box():
+    try:
+        # Get query parameters
+        try:
+            min_lat, min_lon, max_lat, max_lon = coordinate_args('min_lat', 'min_lon', 'max_lat', 'max_lon')
+            validate_coordinates(min_lat, min_lon)
+            validate_coordinates(max_lat, max_lon)
+            limit = limit_arg()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if min_lat > max_lat:
+            return jsonify({"error": "min_lat must not be greater than max_lat"}), 400
+        
+        farms, has_more = in_box(min_lat, min_lon, max_lat, max_lon, limit)
+        
+        return jsonify({"farms": farms, "has_more": has_more})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/within', methods=['GET'])
+def get_farms_within():
+    try:
+        # Get query parameters
+        try:
+            latitude, longitude, radius_km = coordinate_args('lat', 'lon', 'radius_km')
+            validate_coordinates(latitude, longitude)
+            limit = limit_arg()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if radius_km < 0:
+            return jsonify({"error": "Invalid radius_km"}), 400
+        
+        # Nearest first, so a page cut off at limit keeps the closest farms
+        farms = nearest(latitude, longitude, limit + 1, radius_km)
+        
+        return jsonify({"farms": farms[:limit], "has_more": len(farms) > limit})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/nearest', methods=['GET'])
+def get_nearest_farms():
+    try:
+        # Get query parameters
+        try:
+            latitude, longitude = coordinate_args('lat', 'lon')
+            validate_coordinates(latitude, longitude)
+            radius_km = coordinate_args('radius_km')[0] if 'radius_km' in request.args else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            k = int(request.args.get('k', 10))
+        except ValueError:
+            return jsonify({"error": "Invalid k"}), 400
+        
+        if not 1 <= k <= MAX_LIMIT:
+            return jsonify({"error": f"k must be between 1 and {MAX_LIMIT}"}), 400
+        if radius_km is not None and radius_km < 0:
+            return jsonify({"error": "Invalid radius_km"}), 400
+        
+        return jsonify({"farms": nearest(latitude, longitude, k, radius_km)})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Harvest forecasts
+@farm_bp.route('/forecast', methods=['GET'])
+def get_forecast():
+    try:
+        # NumPy is only loaded once forecasts are actually requested
+        from forecasting import weekly_forecast, GROUPS, DEFAULT_WEEKS
+        
+        # Get query parameters
+        group = request.args.get('group', 'farm')
+        owner_id = request.args.get('owner_id')
+        farm_id = request.args.get('farm_id')
+        
+        if group not in GROUPS:
+            return jsonify({"error": "group must be farm, region or crop"}), 400
+        
+        try:
+            weeks = int(request.args.get('weeks', DEFAULT_WEEKS))
+        except ValueError:
+            return jsonify({"error": "Invalid weeks"}), 400
+        
+        if not 1 <= weeks <= 104:
+            return jsonify({"error": "Invalid weeks"}), 400
+        
+        # Read-only: forecast_worker.py keeps the stored forecasts current
+        return jsonify(weekly_forecast(group, owner_id, farm_id, weeks))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/forecast/refresh', methods=['POST'])
+def refresh_forecast():
+    try:
+        from forecasting import refresh_forecasts
+        
+        full = request.args.get('full', 'false').lower() == 'true'
+        
+        return jsonify({"recomputed": refresh_forecasts(full=full)})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# Dashboard endpoints
+def latest_soil_query(farm_ids):
+    # Rank each farm's records newest first and keep the top one, in a single query
+    ranked = (
+        select(
+            SoilRecord,
+            func.row_number().over(
+                partition_by=SoilRecord.farm_id,
+                order_by=(SoilRecord.record_date.desc(), SoilRecord.created_at.desc())
+            ).label('position')
+        )
+        .where(SoilRecord.farm_id.in_(farm_ids))
+        .subquery()
+    )
+    latest = aliased(SoilRecord, ranked)
+    
+    return soil_record_serializer.select(latest).where(ranked.c.position == 1)
+
+def dashboard_queries(farm_query, farm_ids):
+    """Read-only selects for the farms and their crops, equipment and latest soil record."""
+    return (
+        farm_query,
+        crop_serializer.select().where(Crop.farm_id.in_(farm_ids)),
+        equipment_serializer.select().where(Equipment.farm_id.in_(farm_ids)),
+        latest_soil_query(farm_ids)
+    )
+
+def assemble_dashboards(farms, crops, equipment_list, soil_records):
+    # Every argument is a list of column rows from dashboard_queries
+    dashboards = {
+        farm.id: {
+            'farm': farm_serializer.dump(farm),
+            'crops': [],
+            'latest_soil': None,
+            'equipment': []
+        }
+        for farm in farms
+    }
+    
+    for crop in crops:
+        dashboards[crop.farm_id]['crops'].append(crop_serializer.dump(crop))
+    for equipment in equipment_list:
+        dashboards[equipment.farm_id]['equipment'].append(equipment_serializer.dump(equipment))
+    for soil_record in soil_records:
+        dashboards[soil_record.farm_id]['latest_soil'] = soil_record_serializer.dump(soil_record)
+    
+    return [dashboards[farm.id] for farm in farms]
+
+def build_dashboards(farm_query, farm_ids):
+    """Collect crops, latest soil record and equipment for the given farms.
+    
+    farm_query selects the farms' columns; farm_ids may be a list of ids or a
+    select of Farm.id. Either way this runs four queries no matter how many
+    farms there are.
+    """
+    results = [db.session.execute(query).all() for query in dashboard_queries(farm_query, farm_ids)]
+    
+    return assemble_dashboards(*results)
+
+@farm_bp.route('/dashboard', methods=['GET'])
+def get_owner_dashboard():
+    try:
+        owner_id = request.args.get('owner_id')
+        
+        if not owner_id:
+            return jsonify({"error": "Missing required parameter: owner_id"}), 400
+        
+        farm_query = farm_serializer.select().where(Farm.owner_id == owner_id)
+        owner_farm_ids = select(Farm.id).where(Farm.owner_id == owner_id)
+        
+        return jsonify(build_dashboards(farm_query, owner_farm_ids))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/<farm_id>/dashboard', methods=['GET'])
+def get_farm_dashboard(farm_id):
+    try:
+        dashboards = build_dashboards(farm_serializer.select().where(Farm.id == farm_id), [farm_id])
+        
+        if not dashboards:
+            return jsonify({"error": "Farm not found"}), 404
+        
+        return jsonify(dashboards[0])
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # Crop endpoints
 @farm_bp.route('/<farm_id>/crops', methods=['GET'])
 def get_crops(farm_id):
@@ -80,8 +423,7 @@ def get_crops(farm_id):
         if not farm:
             return jsonify({"error": "Farm not found"}), 404
         
-        crops = Crop.query.filter_by(farm_id=farm_id).all()
-        result = [crop.to_dict() for crop in crops]
+        result = crop_serializer.fetch_dicts(Crop.query.filter_by(farm_id=farm_id))
         
         return jsonify(result)
     
@@ -194,8 +536,13 @@ def create_soil_record(farm_id):
             record_date=record_date
         )
         
-        # Save to database
+        # Save to database, folding the reading into its daily/weekly/monthly rollups
         db.session.add(soil_record)
+        update_rollups([{
+            'farm_id': farm_id,
+            'record_date': record_date,
+            **{field: float(data[field]) for field in required_fields}
+        }])
         db.session.commit()
         
         return jsonify(soil_record.to_dict()), 201
@@ -204,7 +551,110 @@ def create_soil_record(farm_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@farm_bp.route('/<farm_id>/soil/history', methods=['GET'])
+def get_soil_history(farm_id):
+    try:
+        farm = Farm.query.get(farm_id)
+        
+        if not farm:
+            return jsonify({"error": "Farm not found"}), 404
+        
+        interval = request.args.get('interval', 'day')
+        if interval not in ('raw', 'day', 'week', 'month'):
+            return jsonify({"error": "Invalid interval. Use raw, day, week or month"}), 400
+        
+        # Parse the date range if provided
+        dates = {}
+        for name in ['start', 'end']:
+            value = request.args.get(name)
+            dates[name] = None
+            if value:
+                try:
+                    dates[name] = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    return jsonify({"error": f"Invalid {name} format. Use YYYY-MM-DD"}), 400
+        
+        return jsonify(get_history(farm_id, dates['start'], dates['end'], interval))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def ingest_soil_batch(farm_id=None):
+    try:
+        chunk_size = int(request.args.get('chunk_size', soil_ingest.DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid chunk_size"}), 400
+    
+    if chunk_size < 1:
+        return jsonify({"error": "Invalid chunk_size"}), 400
+    
+    try:
+        summary = soil_ingest.ingest(soil_ingest.parse_rows(request), farm_id, chunk_size)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(summary)
+
+@farm_bp.route('/soil/batch', methods=['POST'])
+def create_soil_records_batch():
+    try:
+        return ingest_soil_batch()
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/<farm_id>/soil/batch', methods=['POST'])
+def create_farm_soil_records_batch(farm_id):
+    try:
+        farm = Farm.query.get(farm_id)
+        
+        if not farm:
+            return jsonify({"error": "Farm not found"}), 404
+        
+        return ingest_soil_batch(farm_id)
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 # Equipment endpoints
+@farm_bp.route('/equipment/due', methods=['GET'])
+def get_due_maintenance():
+    try:
+        owner_id = request.args.get('owner_id')
+        status = request.args.get('status')
+        
+        try:
+            days = int(request.args.get('days', 7))
+        except ValueError:
+            return jsonify({"error": "Invalid days"}), 400
+        
+        return jsonify(equipment_serializer.fetch_dicts(get_due_equipment(days, owner_id, status)))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@farm_bp.route('/equipment/alerts', methods=['GET'])
+def get_maintenance_alerts():
+    try:
+        try:
+            limit = int(request.args.get('limit', MAX_ALERTS))
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+
+        if limit < 1:
+            return jsonify({"error": "Invalid limit"}), 400
+
+        return jsonify({
+            "running": scheduler.active(),
+            "alerts": recent_alerts(min(limit, MAX_ALERTS))
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @farm_bp.route('/<farm_id>/equipment', methods=['GET'])
 def get_equipment(farm_id):
     try:
@@ -213,8 +663,7 @@ def get_equipment(farm_id):
         if not farm:
             return jsonify({"error": "Farm not found"}), 404
         
-        equipment_list = Equipment.query.filter_by(farm_id=farm_id).all()
-        result = [equipment.to_dict() for equipment in equipment_list]
+        result = equipment_serializer.fetch_dicts(Equipment.query.filter_by(farm_id=farm_id))
         
         return jsonify(result)
     
@@ -262,6 +711,7 @@ def create_equipment(farm_id):
         # Save to database
         db.session.add(equipment)
         db.session.commit()
+        scheduler.schedule(equipment.id, equipment.next_maintenance)
         
         return jsonify(equipment.to_dict()), 201
     
@@ -0,0 +1,183 @@
+from flask import Blueprint, jsonify, request
+from models import db, Order, OrderItem, Product, User
+from sqlalchemy import case, func, insert, literal, select, update
+from sqlalchemy.orm import selectinload
+from cache import invalidate_product
+from auth import can_access_user, current_user_id, forbidden, is_admin
+
+orders_bp = Blueprint('orders', __name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def with_items(query):
+    # Load every order's items, and their product names, in one extra query
+    # instead of one lazy load per order and per item
+    return query.options(
+        selectinload(Order.items)
+        .joinedload(OrderItem.product)
+        .load_only(Product.name)
+    )
+
+@orders_bp.route('/', methods=['GET'])
+def get_orders():
+    try:
+        # Get query parameters; without user_id this is the admin listing of all orders
+        user_id = request.args.get('user_id')
+        status = request.args.get('status')
+
+        if user_id and not can_access_user(user_id):
+            return forbidden()
+        if not user_id and not is_admin():
+            return forbidden()
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({"error": "Invalid limit or offset"}), 400
+
+        if limit < 1 or offset < 0:
+            return jsonify({"error": "Invalid limit or offset"}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        query = Order.query
+
+        if user_id:
+            query = query.filter(Order.user_id == user_id)
+        if status:
+            query = query.filter(Order.status == status)
+
+        orders = (
+            with_items(query)
+            .order_by(Order.order_date.desc(), Order.id.desc())
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
+
+        return jsonify([order.to_dict() for order in orders])
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@orders_bp.route('/', methods=['POST'])
+def place_order():
+    try:
+        data = request.json
+
+        # The order belongs to the token's user; admins may order for someone else
+        user_id = (data.get('user_id') if is_admin() else None) or current_user_id()
+        if not user_id:
+            return jsonify({"error": "Missing required field: user_id"}), 400
+        if 'items' not in data:
+            return jsonify({"error": "Missing required field: items"}), 400
+
+        if not isinstance(data['items'], list) or not data['items']:
+            return jsonify({"error": "items must be a non-empty list"}), 400
+
+        # Merge lines for the same product so each row is locked and updated once
+        quantities = {}
+        for item in data['items']:
+            if 'product_id' not in item or 'quantity' not in item:
+                return jsonify({"error": "Each item needs product_id and quantity"}), 400
+
+            quantity = item['quantity']
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+                return jsonify({"error": "quantity must be a positive integer"}), 400
+
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + quantity
+
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        # Lock all product rows in one statement, in id order, so concurrent
+        # checkouts touching the same products always lock them in the same order
+        product_ids = sorted(quantities)
+        products = db.session.execute(
+            select(Product.id, Product.price, Product.stock_quantity)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update()
+        ).all()
+
+        found = {product.id for product in products}
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            db.session.rollback()
+            return jsonify({"error": "Product not found", "product_ids": missing}), 404
+
+        short = [product.id for product in products if product.stock_quantity < quantities[product.id]]
+        if short:
+            db.session.rollback()
+            return jsonify({"error": "Insufficient stock", "product_ids": short}), 409
+
+        # Decrement stock for every product in a single UPDATE. The stock condition
+        # guards against overselling on databases that ignore FOR UPDATE. The ids
+        # are bound as the id column's type, so they match under binary storage.
+        ordered = case(
+            {literal(product_id, Product.id.type): quantity for product_id, quantity in quantities.items()},
+            value=Product.id
+        )
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id.in_(product_ids), Product.stock_quantity >= ordered)
+            .values(stock_quantity=Product.stock_quantity - ordered)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(product_ids):
+            db.session.rollback()
+            return jsonify({"error": "Insufficient stock"}), 409
+
+        # Create the order and insert all lines in one batch
+        order = Order(user_id=user.id, total_amount=0)
+        db.session.add(order)
+        db.session.flush()
+
+        db.session.execute(insert(OrderItem), [
+            {
+                'order_id': order.id,
+                'product_id': product.id,
+                'quantity': quantities[product.id],
+                'price': product.price
+            }
+            for product in products
+        ])
+
+        # Compute the total in SQL from the inserted lines
+        db.session.execute(
+            update(Order)
+            .where(Order.id == order.id)
+            .values(total_amount=select(func.coalesce(func.sum(OrderItem.quantity * OrderItem.price), 0))
+                    .where(OrderItem.order_id == Order.id)
+                    .scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+
+        order_id = order.id
+        db.session.commit()
+
+        # Stock levels are part of the cached catalog responses
+        for product_id in product_ids:
+            invalidate_product(product_id)
+
+        order = with_items(Order.query).filter(Order.id == order_id).first()
+        return jsonify(order.to_dict()), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@orders_bp.route('/<order_id>', methods=['GET'])
+def get_order(order_id):
+    try:
+        order = with_items(Order.query).filter(Order.id == order_id).first()
+
+        if not order or not can_access_user(order.user_id):
+            return jsonify({"error": "Order not found"}), 404
+
+        return jsonify(order.to_dict())
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,16 +1,59 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, Response, stream_with_context
 from models import db, Product
-from sqlalchemy import or_
+from sqlalchemy import or_, and_
+from search import search_products
+from cache import cached_response, invalidate_product, get_stats
+from auth import public
+from serializers import product_serializer
+from pagination import encode_cursor, decode_cursor
 
 products_bp = Blueprint('products', __name__)
 
+# Sort options for the product listing. Every sort ends with Product.id so that
+# keyset (cursor) pagination always has a unique, stable position to resume from.
+SORT_OPTIONS = {
+    'name': (Product.name, 'asc'),
+    'price-low': (Product.price, 'asc'),
+    'price-high': (Product.price, 'desc'),
+}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 500
+
+def apply_keyset(query, column, direction, cursor, sort, filters):
+    value, product_id = decode_cursor(cursor, sort, filters)
+    
+    if direction == 'asc':
+        return query.filter(or_(
+            column > value,
+            and_(column == value, Product.id > product_id)
+        ))
+    
+    return query.filter(or_(
+        column < value,
+        and_(column == value, Product.id < product_id)
+    ))
+
+def stream_products(query):
+    # Rows are fetched in batches and written out one JSON object per line,
+    # so memory use does not grow with the size of the catalog. Each line is
+    # encoded exactly as jsonify would encode the product
+    for row in product_serializer.stream(query, STREAM_BATCH_SIZE):
+        yield current_app.json.response_body(product_serializer.dump(row))
+
 @products_bp.route('/', methods=['GET'])
+@public
+@cached_response('products:list')
 def get_products():
     try:
         # Get query parameters
         category = request.args.get('category')
         search = request.args.get('search')
         sort = request.args.get('sort')
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
+        stream = request.args.get('format') == 'ndjson'
         
         # Start with base query
         query = Product.query
@@ -19,40 +62,75 @@ def get_products():
         if category:
             query = query.filter(Product.category == category)
         
-        # Apply search filter
+        # Apply search filter through the full-text index
+        rank = None
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term)
-                )
-            )
-        
-        # Apply sorting
-        if sort:
-            if sort == 'price-low':
-                query = query.order_by(Product.price.asc())
-            elif sort == 'price-high':
-                query = query.order_by(Product.price.desc())
-            elif sort == 'name':
-                query = query.order_by(Product.name.asc())
-        else:
-            # Default sort by name
-            query = query.order_by(Product.name.asc())
+            query, rank = search_products(query, search)
         
-        # Execute query
-        products = query.all()
+        # Apply sorting (default sort by relevance when searching, otherwise by name),
+        # with id as the tiebreaker
+        if not sort:
+            sort = 'relevance' if rank is not None else 'name'
         
-        # Convert to dict
-        result = [product.to_dict() for product in products]
-        
-        return jsonify(result)
+        if sort == 'relevance' and rank is not None:
+            column, direction = rank, 'desc'
+        else:
+            sort = sort if sort in SORT_OPTIONS else 'name'
+            column, direction = SORT_OPTIONS[sort]
+        if direction == 'asc':
+            query = query.order_by(column.asc(), Product.id.asc())
+        else:
+            query = query.order_by(column.desc(), Product.id.desc())
+        
+        # Resume after the last row of the previous page. A cursor only
+        # continues the sort and filters it was created with
+        filters = {'category': category, 'search': search}
+        if cursor:
+            try:
+                query = apply_keyset(query, column, direction, cursor, sort, filters)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        
+        # Streaming mode: NDJSON, one product per line
+        if stream:
+            return Response(stream_with_context(stream_products(query)),
+                            mimetype='application/x-ndjson')
+        
+        # Without pagination parameters, keep returning the full list
+        if limit is None and cursor is None:
+            result = product_serializer.fetch_dicts(query)
+            return jsonify(result)
+        
+        # Cursor pagination
+        try:
+            limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+        
+        if limit < 1:
+            return jsonify({"error": "Invalid limit"}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+        
+        # Fetch one extra row to find out whether another page exists
+        rows = product_serializer.fetch(query.limit(limit + 1), column.label('sort_key'))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor(rows[-1].sort_key, rows[-1].id, sort, filters)
+        
+        return jsonify({
+            "products": product_serializer.dump_rows(rows),
+            "next_cursor": next_cursor
+        })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @products_bp.route('/<product_id>', methods=['GET'])
+@public
+@cached_response('products:item')
 def get_product(product_id):
     try:
         product = Product.query.get(product_id)
@@ -66,13 +144,13 @@ def get_product(product_id):
         return jsonify({"error": str(e)}), 500
 
 @products_bp.route('/featured', methods=['GET'])
+@public
+@cached_response('products:featured')
 def get_featured_products():
     try:
         # In a real app, you might have a featured flag or use other criteria
         # For now, just return the first 3 products
-        products = Product.query.limit(3).all()
-        
-        result = [product.to_dict() for product in products]
+        result = product_serializer.fetch_dicts(Product.query.limit(3))
         
         return jsonify(result)
     
@@ -103,6 +181,7 @@ def create_product():
         # Save to database
         db.session.add(product)
         db.session.commit()
+        invalidate_product(product.id)
         
         return jsonify(product.to_dict()), 201
     
@@ -136,6 +215,7 @@ def update_product(product_id):
         
         # Save changes
         db.session.commit()
+        invalidate_product(product.id)
         
         return jsonify(product.to_dict())
     
@@ -153,9 +233,14 @@ def delete_product(product_id):
         
         db.session.delete(product)
         db.session.commit()
+        invalidate_product(product_id)
         
         return jsonify({"message": "Product deleted successfully"})
     
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
+
+@products_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(get_stats())
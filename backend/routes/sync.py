@@ -0,0 +1,111 @@
+from flask import Blueprint, jsonify, request
+from maintenance import scheduler
+from auth import can_access_user, current_user_id, forbidden
+from sync import pull, push, SyncError, SyncReset, DEFAULT_LIMIT, MAX_LIMIT, MAX_CHANGES
+import gzip
+import json
+import zlib
+
+sync_bp = Blueprint('sync', __name__)
+
+# Field devices are often on metered links, so anything but tiny payloads is compressed
+MIN_COMPRESS_SIZE = 1024
+COMPRESS_LEVEL = 6
+
+# A gzip request body may expand to at most this many bytes
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+def compressed(response):
+    """gzip the response body if the client accepts it."""
+    if 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return response
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+    response.set_data(gzip.compress(body, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def read_json():
+    """The request body as JSON, inflating it first if it was sent gzipped."""
+    if request.headers.get('Content-Encoding', '').lower() != 'gzip':
+        return request.get_json()
+
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = inflater.decompress(request.get_data(), MAX_BODY_SIZE)
+    if inflater.unconsumed_tail:
+        raise SyncError("Request body is too large")
+    return json.loads(body)
+
+@sync_bp.route('/', methods=['GET'])
+def pull_changes():
+    try:
+        # Get query parameters; devices sync their own user's farms unless an admin names another owner
+        owner_id = request.args.get('owner_id') or current_user_id()
+        since = request.args.get('since')
+
+        if not owner_id:
+            return jsonify({"error": "Missing required parameter: owner_id"}), 400
+        if not can_access_user(owner_id):
+            return forbidden()
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        try:
+            changes = pull(owner_id, since, limit)
+        except SyncError as e:
+            return jsonify({"error": str(e)}), 400
+        except SyncReset as e:
+            return jsonify({"error": str(e), "reset": True}), 410
+
+        return compressed(jsonify(changes))
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@sync_bp.route('/', methods=['POST'])
+def push_changes():
+    try:
+        try:
+            data = read_json()
+        except (SyncError, ValueError, zlib.error) as e:
+            return jsonify({"error": f"Invalid request body: {e}"}), 400
+
+        changes = data.get('changes') if isinstance(data, dict) else None
+        if not isinstance(changes, list):
+            return jsonify({"error": "Missing required field: changes"}), 400
+        if len(changes) > MAX_CHANGES:
+            return jsonify({"error": f"Too many changes, at most {MAX_CHANGES} per request"}), 413
+
+        # Changes are applied for the token's user, or the owner an admin names
+        owner_id = data.get('owner_id') or current_user_id()
+        if not owner_id:
+            return jsonify({"error": "Missing required field: owner_id"}), 400
+        if not can_access_user(owner_id):
+            return forbidden()
+
+        results, written = push(changes, owner_id)
+
+        # Keep the maintenance worker in step with equipment written offline
+        for _, equipment_id, resource, op, values in written:
+            if resource == 'equipment' and op != 'delete' and 'next_maintenance' in values:
+                scheduler.schedule(equipment_id, values['next_maintenance'])
+
+        counts = {"ok": 0, "conflict": 0, "error": 0}
+        for result in results:
+            counts[result['status']] += 1
+
+        return compressed(jsonify({
+            "results": results,
+            "succeeded": counts["ok"],
+            "conflicts": counts["conflict"],
+            "failed": counts["error"]
+        }))
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request
 from models import db, User
-from werkzeug.security import generate_password_hash, check_password_hash
+from auth import (AuthError, HashingBusy, can_access_user, create_tokens, decode_token, forbidden,
+                  hash_password, is_admin, needs_rehash, public, verify_password)
 import re
 
 users_bp = Blueprint('users', __name__)
 
 @users_bp.route('/register', methods=['POST'])
+@public
 def register():
     try:
         data = request.json
@@ -30,12 +32,11 @@ def register():
         if len(data['password']) < 8:
             return jsonify({"error": "Password must be at least 8 characters long"}), 400
         
-        # Create new user
+        # Create new user; roles are only granted by admins through update_user
         user = User(
             name=data['name'],
             email=data['email'],
-            password_hash=generate_password_hash(data['password']),
-            role=data.get('role', 'Farmer')
+            password_hash=hash_password(data['password'])
         )
         
         # Save to database
@@ -45,11 +46,16 @@ def register():
         # Return user data without password
         return jsonify(user.to_dict()), 201
     
+    except HashingBusy as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 503
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route('/login', methods=['POST'])
+@public
 def login():
     try:
         data = request.json
@@ -64,22 +70,58 @@ def login():
         user = User.query.filter_by(email=data['email']).first()
         
         # Check if user exists and password is correct
-        if not user or not check_password_hash(user.password_hash, data['password']):
+        if not user or not verify_password(user.password_hash, data['password']):
             return jsonify({"error": "Invalid email or password"}), 401
         
-        # In a real app, you would generate a JWT token here
-        # For simplicity, we'll just return the user data
+        # Upgrade hashes made with outdated parameters while we have the password
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(data['password'])
+            db.session.commit()
+        
         return jsonify({
             "message": "Login successful",
-            "user": user.to_dict()
+            "user": user.to_dict(),
+            **create_tokens(user.id, user.role)
         })
     
+    except HashingBusy as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 503
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@users_bp.route('/refresh', methods=['POST'])
+@public
+def refresh():
+    try:
+        data = request.json
+        
+        if 'refresh_token' not in data:
+            return jsonify({"error": "Missing required field: refresh_token"}), 400
+        
+        try:
+            claims = decode_token(data['refresh_token'], 'refresh')
+        except AuthError as e:
+            return jsonify({"error": str(e)}), 401
+        
+        # Issue the user's current role, so a role change applies from the next refresh
+        user = db.session.get(User, claims['sub'])
+        if not user:
+            return jsonify({"error": "User not found"}), 401
+        
+        return jsonify(create_tokens(user.id, user.role))
+    
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route('/<user_id>', methods=['GET'])
 def get_user(user_id):
     try:
+        if not can_access_user(user_id):
+            return forbidden()
+        
         user = User.query.get(user_id)
         
         if not user:
@@ -93,6 +135,9 @@ def get_user(user_id):
 @users_bp.route('/<user_id>', methods=['PUT'])
 def update_user(user_id):
     try:
+        if not can_access_user(user_id):
+            return forbidden()
+        
         user = User.query.get(user_id)
         
         if not user:
@@ -100,6 +145,10 @@ def update_user(user_id):
         
         data = request.json
         
+        # Only admins change roles
+        if 'role' in data and not is_admin():
+            return forbidden()
+        
         # Update fields
         if 'name' in data:
             user.name = data['name']
@@ -122,7 +171,7 @@ def update_user(user_id):
             if len(data['password']) < 8:
                 return jsonify({"error": "Password must be at least 8 characters long"}), 400
             
-            user.password_hash = generate_password_hash(data['password'])
+            user.password_hash = hash_password(data['password'])
         
         if 'role' in data:
             user.role = data['role']
@@ -0,0 +1,144 @@
+"""Full-text product search.
+
+Postgres uses a GIN index over a tsvector of name + description (created by
+the baseline migration). SQLite uses an FTS5 table kept in sync with the products
+table by triggers. Any other database falls back to ILIKE matching.
+"""
+import re
+from sqlalchemy import Float, Integer, cast, func, literal_column, or_, text
+from models import db, Product
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Must match the expression of idx_products_search exactly so Postgres uses it
+TS_CONFIG = literal_column("'english'::regconfig")
+
+# Resolved search backend per database URL
+_backends = {}
+
+def tokenize(search):
+    return [token.lower() for token in TOKEN_RE.findall(search)]
+
+def search_document():
+    return func.to_tsvector(
+        TS_CONFIG,
+        Product.name.op('||')(literal_column("' '")).op('||')(func.coalesce(Product.description, ''))
+    )
+
+def get_backend():
+    engine = db.engine
+    key = str(engine.url)
+
+    if key not in _backends:
+        if engine.dialect.name == 'postgresql':
+            _backends[key] = 'postgres'
+        elif engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+                )).first()
+            _backends[key] = 'fts5' if exists else 'like'
+        else:
+            _backends[key] = 'like'
+
+    return _backends[key]
+
+def search_products(query, search):
+    """Filter a Product query by a search string.
+
+    Returns the filtered query and a relevance expression (higher is better),
+    or None for the relevance when the backend cannot rank results.
+    """
+    tokens = tokenize(search)
+    if not tokens:
+        return query, None
+
+    backend = get_backend()
+
+    if backend == 'postgres':
+        # Every token must match, as a word prefix
+        ts_query = func.to_tsquery(TS_CONFIG, ' & '.join(f"{token}:*" for token in tokens))
+        document = search_document()
+        query = query.filter(document.op('@@')(ts_query))
+        return query, cast(func.ts_rank(document, ts_query), Float)
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        hits = text(
+            "SELECT rowid AS product_rowid, -bm25(products_fts) AS rank "
+            "FROM products_fts WHERE products_fts MATCH :match"
+        ).bindparams(match=match).columns(product_rowid=Integer, rank=Float).subquery('search_hits')
+        query = query.join(hits, hits.c.product_rowid == literal_column('products.rowid'))
+        return query, hits.c.rank
+
+    for token in tokens:
+        search_term = f"%{token}%"
+        query = query.filter(
+            or_(
+                Product.name.ilike(search_term),
+                Product.description.ilike(search_term)
+            )
+        )
+    return query, None
+
+def create_search_index(conn):
+    """Create the search index (and its sync triggers on SQLite) if missing."""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_products_search ON products "
+            "USING GIN (to_tsvector('english'::regconfig, name || ' ' || coalesce(description, '')))"
+        ))
+    elif conn.dialect.name == 'sqlite':
+        created = not conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        )).first()
+        try:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+                "name, description, content='products', content_rowid='rowid', "
+                "tokenize='porter unicode61')"
+            ))
+        except Exception:
+            # SQLite was built without FTS5, search falls back to LIKE
+            return
+
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+            "INSERT INTO products_fts(rowid, name, description) "
+            "VALUES (new.rowid, new.name, new.description); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+            "INSERT INTO products_fts(products_fts, rowid, name, description) "
+            "VALUES ('delete', old.rowid, old.name, old.description); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN "
+            "INSERT INTO products_fts(products_fts, rowid, name, description) "
+            "VALUES ('delete', old.rowid, old.name, old.description); "
+            "INSERT INTO products_fts(rowid, name, description) "
+            "VALUES (new.rowid, new.name, new.description); END"
+        ))
+
+        # The triggers only cover later writes; index the products already there
+        if created:
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+def ensure_search_index():
+    """Create the search index for databases built with db.create_all()."""
+    engine = db.engine
+
+    with engine.begin() as conn:
+        create_search_index(conn)
+
+    _backends.pop(str(engine.url), None)
+
+def rebuild_search_index():
+    """Rebuild the SQLite FTS5 index from the products table.
+
+    The FTS5 rows are keyed by the products rowid, which VACUUM may renumber,
+    so run this after vacuuming a SQLite database.
+    """
+    if get_backend() == 'fts5':
+        with db.engine.begin() as conn:
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
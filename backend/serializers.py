@@ -0,0 +1,139 @@
+"""Read-only projections and fast serialization for list responses.
+
+Each Serializer lists the response keys of one model in to_dict order, with the
+column behind each key. Read-only paths select just those columns, so rows
+come back as SQLAlchemy Row named tuples (attribute access by response key)
+without building ORM objects, instrumenting attributes or touching the
+identity map. Every row becomes a response dict with one zip.
+
+Dates stay as date objects. json_provider.JSONProvider writes them out as ISO 8601,
+which gives the same bytes as calling isoformat() in to_dict.
+"""
+from sqlalchemy import select
+from models import Farm, Crop, SoilRecord, Equipment, FarmSummary, OwnerSummary, Product
+
+class Serializer:
+    def __init__(self, fields):
+        self.fields = fields
+        self.keys = tuple(fields)
+        self.columns = self.columns_of()
+
+    def columns_of(self, entity=None):
+        """The labelled columns, optionally taken from an aliased entity."""
+        return tuple(
+            (getattr(entity, column.key) if entity is not None else column).label(key)
+            for key, column in self.fields.items()
+        )
+
+    def select(self, entity=None):
+        return select(*self.columns_of(entity))
+
+    def dump(self, row):
+        return dict(zip(self.keys, row))
+
+    def dump_rows(self, rows):
+        # Rows may carry extra trailing columns (e.g. a sort key); zip drops them
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+    def fetch(self, query, *extra_columns):
+        """Run a Model.query with only this serializer's columns selected."""
+        return query.with_entities(*self.columns, *extra_columns).all()
+
+    def fetch_dicts(self, query):
+        return self.dump_rows(self.fetch(query))
+
+    def stream(self, query, batch_size):
+        """Yield rows in batches of batch_size, for listings too big to hold in memory."""
+        return query.with_entities(*self.columns).yield_per(batch_size)
+
+farm_serializer = Serializer({
+    'id': Farm.id,
+    'name': Farm.name,
+    'location': Farm.location,
+    'size': Farm.size,
+    'owner_id': Farm.owner_id,
+    'latitude': Farm.latitude,
+    'longitude': Farm.longitude,
+    'created_at': Farm.created_at,
+    'updated_at': Farm.updated_at,
+})
+
+crop_serializer = Serializer({
+    'id': Crop.id,
+    'farm_id': Crop.farm_id,
+    'name': Crop.name,
+    'area': Crop.area,
+    'status': Crop.status,
+    'planted_date': Crop.planted_date,
+    'harvest_date': Crop.harvest_date,
+    'created_at': Crop.created_at,
+    'updated_at': Crop.updated_at,
+})
+
+soil_record_serializer = Serializer({
+    'id': SoilRecord.id,
+    'farm_id': SoilRecord.farm_id,
+    'ph': SoilRecord.ph,
+    'nitrogen': SoilRecord.nitrogen,
+    'phosphorus': SoilRecord.phosphorus,
+    'potassium': SoilRecord.potassium,
+    'organic_matter': SoilRecord.organic_matter,
+    'record_date': SoilRecord.record_date,
+    'created_at': SoilRecord.created_at,
+})
+
+equipment_serializer = Serializer({
+    'id': Equipment.id,
+    'farm_id': Equipment.farm_id,
+    'name': Equipment.name,
+    'status': Equipment.status,
+    'last_maintenance': Equipment.last_maintenance,
+    'next_maintenance': Equipment.next_maintenance,
+    'created_at': Equipment.created_at,
+    'updated_at': Equipment.updated_at,
+})
+
+farm_summary_serializer = Serializer({
+    'farm_id': FarmSummary.farm_id,
+    'owner_id': FarmSummary.owner_id,
+    'name': FarmSummary.name,
+    'location': FarmSummary.location,
+    'size': FarmSummary.size,
+    'crop_count': FarmSummary.crop_count,
+    'active_crops': FarmSummary.active_crops,
+    'planted_area': FarmSummary.planted_area,
+    'equipment_count': FarmSummary.equipment_count,
+    'equipment_needing_service': FarmSummary.equipment_needing_service,
+    'next_maintenance': FarmSummary.next_maintenance,
+    'latest_ph': FarmSummary.latest_ph,
+    'latest_soil_date': FarmSummary.latest_soil_date,
+    'updated_at': FarmSummary.updated_at,
+})
+
+owner_summary_serializer = Serializer({
+    'owner_id': OwnerSummary.owner_id,
+    'farm_count': OwnerSummary.farm_count,
+    'total_size': OwnerSummary.total_size,
+    'crop_count': OwnerSummary.crop_count,
+    'active_crops': OwnerSummary.active_crops,
+    'planted_area': OwnerSummary.planted_area,
+    'equipment_count': OwnerSummary.equipment_count,
+    'equipment_needing_service': OwnerSummary.equipment_needing_service,
+    'next_maintenance': OwnerSummary.next_maintenance,
+    'farms_with_soil': OwnerSummary.farms_with_soil,
+    'average_ph': OwnerSummary.average_ph,
+    'updated_at': OwnerSummary.updated_at,
+})
+
+product_serializer = Serializer({
+    'id': Product.id,
+    'name': Product.name,
+    'description': Product.description,
+    'price': Product.price,
+    'category': Product.category,
+    'stock_quantity': Product.stock_quantity,
+    'image': Product.image_url,
+    'created_at': Product.created_at,
+    'updated_at': Product.updated_at,
+})
@@ -0,0 +1,130 @@
+"""Soil record history and downsampled rollups.
+
+Every inserted soil reading is folded into daily, weekly and monthly rollup rows
+(count, sum, min and max per measurement) in the same transaction, so history
+charts read a handful of precomputed rows instead of scanning raw readings.
+"""
+from datetime import timedelta
+from sqlalchemy import delete, func, select
+from models import db, SoilRecord, SoilRollup
+
+MEASUREMENTS = ['ph', 'nitrogen', 'phosphorus', 'potassium', 'organic_matter']
+PERIODS = ['day', 'week', 'month']
+
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+def aggregate(rows):
+    """Fold readings into rollup buckets keyed by (farm_id, period, period_start)."""
+    buckets = {}
+
+    for row in rows:
+        for period in PERIODS:
+            key = (row['farm_id'], period, period_start(row['record_date'], period))
+            bucket = buckets.get(key)
+
+            if bucket is None:
+                bucket = {'farm_id': key[0], 'period': period, 'period_start': key[2], 'sample_count': 0}
+                for field in MEASUREMENTS:
+                    bucket[f'{field}_sum'] = 0.0
+                    bucket[f'{field}_min'] = row[field]
+                    bucket[f'{field}_max'] = row[field]
+                buckets[key] = bucket
+
+            bucket['sample_count'] += 1
+            for field in MEASUREMENTS:
+                value = row[field]
+                bucket[f'{field}_sum'] += value
+                if value < bucket[f'{field}_min']:
+                    bucket[f'{field}_min'] = value
+                if value > bucket[f'{field}_max']:
+                    bucket[f'{field}_max'] = value
+
+    return list(buckets.values())
+
+def upsert_statement(dialect):
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        least, greatest = func.least, func.greatest
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        # SQLite's multi-argument min()/max() are scalar functions
+        least, greatest = func.min, func.max
+    else:
+        return None
+
+    table = SoilRollup.__table__
+    statement = insert(table)
+    excluded = statement.excluded
+
+    updates = {'sample_count': table.c.sample_count + excluded.sample_count}
+    for field in MEASUREMENTS:
+        updates[f'{field}_sum'] = table.c[f'{field}_sum'] + excluded[f'{field}_sum']
+        updates[f'{field}_min'] = least(table.c[f'{field}_min'], excluded[f'{field}_min'])
+        updates[f'{field}_max'] = greatest(table.c[f'{field}_max'], excluded[f'{field}_max'])
+
+    return statement.on_conflict_do_update(
+        index_elements=['farm_id', 'period', 'period_start'],
+        set_=updates
+    )
+
+def update_rollups(rows):
+    """Add newly inserted readings to their rollups. Call before committing the insert."""
+    buckets = aggregate(rows)
+    if not buckets:
+        return
+
+    statement = upsert_statement(db.session.get_bind().dialect.name)
+
+    if statement is not None:
+        db.session.execute(statement, buckets)
+    else:
+        # No native upsert: recompute the affected farms from raw readings
+        db.session.flush()
+        rebuild_rollups({bucket['farm_id'] for bucket in buckets}, commit=False)
+
+def rebuild_rollups(farm_ids=None, commit=True):
+    """Recompute rollups from raw soil records, for some farms or for all of them."""
+    clear = delete(SoilRollup)
+    query = select(
+        SoilRecord.farm_id, SoilRecord.record_date,
+        *[getattr(SoilRecord, field) for field in MEASUREMENTS]
+    )
+
+    if farm_ids is not None:
+        farm_ids = list(farm_ids)
+        clear = clear.where(SoilRollup.farm_id.in_(farm_ids))
+        query = query.where(SoilRecord.farm_id.in_(farm_ids))
+
+    db.session.execute(clear)
+    rows = db.session.execute(query.execution_options(yield_per=10000)).mappings()
+    buckets = aggregate(rows)
+    if buckets:
+        db.session.execute(SoilRollup.__table__.insert(), buckets)
+
+    if commit:
+        db.session.commit()
+
+def get_history(farm_id, start=None, end=None, interval='day'):
+    """Return soil history for a farm, raw or downsampled to day/week/month."""
+    if interval == 'raw':
+        query = SoilRecord.query.filter(SoilRecord.farm_id == farm_id)
+        if start:
+            query = query.filter(SoilRecord.record_date >= start)
+        if end:
+            query = query.filter(SoilRecord.record_date <= end)
+        return [record.to_dict() for record in query.order_by(SoilRecord.record_date.asc())]
+
+    query = SoilRollup.query.filter(
+        SoilRollup.farm_id == farm_id,
+        SoilRollup.period == interval
+    )
+    if start:
+        query = query.filter(SoilRollup.period_start >= period_start(start, interval))
+    if end:
+        query = query.filter(SoilRollup.period_start <= end)
+    return [rollup.to_dict() for rollup in query.order_by(SoilRollup.period_start.asc())]
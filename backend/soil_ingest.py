@@ -0,0 +1,173 @@
+"""Bulk ingestion of soil readings sent by field sensor gateways.
+
+Readings arrive as a JSON array, NDJSON or CSV. They are validated and inserted
+chunk by chunk with one executemany INSERT and one commit per chunk, and rows
+that fail validation are reported back without aborting the rest of the batch.
+"""
+from datetime import datetime
+from sqlalchemy import insert, select
+from models import db, Farm, SoilRecord
+from soil_history import update_rollups
+from summaries import mark_farms
+from ids import check_id
+import csv
+import io
+import json
+import math
+import os
+
+MEASUREMENTS = ['ph', 'nitrogen', 'phosphorus', 'potassium', 'organic_matter']
+
+DEFAULT_CHUNK_SIZE = int(os.getenv('SOIL_BATCH_CHUNK_SIZE', '5000'))
+MAX_REPORTED_ERRORS = 1000
+
+def parse_rows(request):
+    """Yield readings from the request body without loading a streamed body at once."""
+    content_type = request.mimetype
+
+    if content_type in ('application/x-ndjson', 'application/ndjson'):
+        for line in io.TextIOWrapper(request.stream, encoding='utf-8'):
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    elif content_type == 'text/csv':
+        yield from csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8'))
+    else:
+        rows = request.get_json()
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of soil readings")
+        yield from rows
+
+def validate_chunk(rows, default_farm_id, today):
+    """Convert a chunk of raw readings into insertable rows.
+
+    Returns (valid, errors) where valid holds (row_number, values) pairs.
+    """
+    valid = []
+    errors = []
+
+    for number, row in rows:
+        if not isinstance(row, dict):
+            errors.append({"row": number, "error": "Reading must be an object"})
+            continue
+
+        # Readings posted to one farm's URL may not name another farm
+        farm_id = row.get('farm_id')
+        if default_farm_id and farm_id and str(farm_id) != default_farm_id:
+            errors.append({"row": number, "error": "farm_id does not match the farm in the URL"})
+            continue
+
+        values = {'farm_id': farm_id or default_farm_id}
+        # Offline devices send the ids they generated for their readings
+        if row.get('id'):
+            values['id'] = str(row['id'])
+            try:
+                check_id(values['id'])
+            except ValueError as e:
+                errors.append({"row": number, "error": str(e)})
+                continue
+        if not values['farm_id']:
+            errors.append({"row": number, "error": "Missing required field: farm_id"})
+            continue
+
+        error = None
+        for field in MEASUREMENTS:
+            value = row.get(field)
+            if value is None or value == '':
+                error = f"Missing required field: {field}"
+                break
+            try:
+                values[field] = float(value)
+            except (TypeError, ValueError):
+                error = f"Invalid number for {field}"
+                break
+            if not math.isfinite(values[field]):
+                error = f"Invalid number for {field}"
+                break
+
+        if error:
+            errors.append({"row": number, "error": error})
+            continue
+
+        if not 0 <= values['ph'] <= 14:
+            errors.append({"row": number, "error": "ph must be between 0 and 14"})
+            continue
+        if any(values[field] < 0 for field in MEASUREMENTS[1:]):
+            errors.append({"row": number, "error": "Nutrient values must not be negative"})
+            continue
+
+        record_date = row.get('record_date')
+        if record_date:
+            try:
+                values['record_date'] = datetime.strptime(record_date, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                errors.append({"row": number, "error": "Invalid record_date format. Use YYYY-MM-DD"})
+                continue
+        else:
+            values['record_date'] = today
+
+        valid.append((number, values))
+
+    return valid, errors
+
+def ingest(rows, default_farm_id=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate and insert readings in chunks, returning a summary of the batch.
+
+    With default_farm_id every reading belongs to that farm; readings naming a
+    different farm_id are rejected.
+    """
+    today = datetime.utcnow().date()
+    known_farms = set()
+    summary = {"received": 0, "inserted": 0, "failed": 0, "errors": []}
+
+    def report(errors):
+        summary["failed"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"].extend(errors[:max(room, 0)])
+
+    def flush(chunk):
+        valid, errors = validate_chunk(chunk, default_farm_id, today)
+
+        # Check every farm referenced by the chunk with one query
+        unknown = {values['farm_id'] for _, values in valid} - known_farms
+        if unknown:
+            known_farms.update(db.session.execute(
+                select(Farm.id).where(Farm.id.in_(unknown))
+            ).scalars())
+
+        rows_to_insert = []
+        for number, values in valid:
+            if values['farm_id'] in known_farms:
+                rows_to_insert.append((number, values))
+            else:
+                errors.append({"row": number, "error": "Farm not found"})
+
+        if rows_to_insert:
+            try:
+                values = [values for _, values in rows_to_insert]
+                db.session.execute(insert(SoilRecord), values)
+                update_rollups(values)
+                mark_farms({row['farm_id'] for row in values})
+                db.session.commit()
+                summary["inserted"] += len(rows_to_insert)
+            except Exception as e:
+                db.session.rollback()
+                errors.extend({"row": number, "error": str(e)} for number, _ in rows_to_insert)
+
+        report(sorted(errors, key=lambda error: error["row"]))
+
+    chunk = []
+    for number, row in enumerate(rows):
+        summary["received"] += 1
+        chunk.append((number, row))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+
+    if chunk:
+        flush(chunk)
+
+    return summary
@@ -0,0 +1,303 @@
+"""Per-farm and per-owner summaries, kept up to date on every write.
+
+farm_summaries holds one row per farm with its hectares, crop, equipment and
+latest soil totals; owner_summaries adds those rows up per owner. Dashboards
+read them with one lookup per farm instead of loading every child collection.
+
+Summaries are recomputed only for the farms a transaction touched, just before
+it commits, so they are never out of step with the rows they describe. ORM
+writes are picked up from the session's flushes. Bulk INSERT/UPDATE/DELETE
+statements bypass the unit of work, so code that issues them on crops, soil
+records or equipment calls mark_farms() or mark_rows() before committing.
+"""
+from datetime import datetime
+from sqlalchemy import case, delete, event, func, inspect, select, update
+from sqlalchemy.engine import Connection
+from models import db, Farm, Crop, SoilRecord, Equipment, FarmSummary, OwnerSummary
+
+TRACKED = (Farm, Crop, SoilRecord, Equipment)
+PENDING = 'summary_farms'
+
+# Farms are recomputed in groups of this size to keep IN lists short
+CHUNK_SIZE = 500
+
+# Owner totals that are sums over the owner's farms, maintained by difference
+ADDITIVE = ('farm_count', 'total_size', 'crop_count', 'active_crops', 'planted_area',
+            'equipment_count', 'equipment_needing_service', 'farms_with_soil', 'latest_ph_sum')
+
+def mark_farms(farm_ids, session=None):
+    """Queue farms to have their summaries recomputed when the session commits."""
+    session = session or db.session
+    session.info.setdefault(PENDING, set()).update(farm_id for farm_id in farm_ids if farm_id)
+
+def mark_rows(model, ids, session=None):
+    """Queue the farms of the given crop, soil record or equipment rows.
+
+    Call before a bulk UPDATE or DELETE, while the rows still point at their farms.
+    """
+    session = session or db.session
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        mark_farms(session.execute(
+            select(model.farm_id).where(model.id.in_(ids[start:start + CHUNK_SIZE])).distinct()
+        ).scalars(), session)
+
+def farm_summary_rows(connection, farm_ids):
+    """Compute fresh summary rows for the given farms from their child tables."""
+    # The newest reading per farm is one seek on idx_soil_records_farm_date
+    def latest_soil(column):
+        return (
+            select(column)
+            .where(SoilRecord.farm_id == Farm.id)
+            .order_by(SoilRecord.record_date.desc(), SoilRecord.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    farms = connection.execute(
+        select(
+            Farm.id, Farm.owner_id, Farm.name, Farm.location, Farm.size,
+            latest_soil(SoilRecord.ph).label('latest_ph'),
+            latest_soil(SoilRecord.record_date).label('latest_soil_date')
+        )
+        .where(Farm.id.in_(farm_ids))
+    ).all()
+    if not farms:
+        return []
+
+    active = Crop.status != 'Harvested'
+    crops = {
+        row.farm_id: row for row in connection.execute(
+            select(
+                Crop.farm_id,
+                func.count().label('crop_count'),
+                func.sum(case((active, 1), else_=0)).label('active_crops'),
+                func.sum(case((active, Crop.area), else_=0.0)).label('planted_area')
+            )
+            .where(Crop.farm_id.in_(farm_ids))
+            .group_by(Crop.farm_id)
+        )
+    }
+    equipment = {
+        row.farm_id: row for row in connection.execute(
+            select(
+                Equipment.farm_id,
+                func.count().label('equipment_count'),
+                func.sum(case((Equipment.status != 'Operational', 1), else_=0)).label('needing_service'),
+                func.min(Equipment.next_maintenance).label('next_maintenance')
+            )
+            .where(Equipment.farm_id.in_(farm_ids))
+            .group_by(Equipment.farm_id)
+        )
+    }
+
+    now = datetime.utcnow()
+    rows = []
+    for farm in farms:
+        crop, machines = crops.get(farm.id), equipment.get(farm.id)
+        rows.append({
+            'farm_id': farm.id,
+            'owner_id': farm.owner_id,
+            'name': farm.name,
+            'location': farm.location,
+            'size': float(farm.size),
+            'crop_count': crop.crop_count if crop else 0,
+            'active_crops': int(crop.active_crops) if crop else 0,
+            'planted_area': float(crop.planted_area) if crop else 0.0,
+            'equipment_count': machines.equipment_count if machines else 0,
+            'equipment_needing_service': int(machines.needing_service) if machines else 0,
+            'next_maintenance': machines.next_maintenance if machines else None,
+            'latest_ph': farm.latest_ph,
+            'latest_soil_date': farm.latest_soil_date,
+            'updated_at': now,
+        })
+    return rows
+
+def owner_delta(rows, sign, deltas):
+    """Add (sign=1) or take away (sign=-1) farm summary rows from per-owner totals."""
+    for row in rows:
+        delta = deltas.setdefault(row['owner_id'], dict.fromkeys(ADDITIVE, 0))
+        delta['farm_count'] += sign
+        delta['total_size'] += sign * row['size']
+        for field in ('crop_count', 'active_crops', 'planted_area', 'equipment_count', 'equipment_needing_service'):
+            delta[field] += sign * row[field]
+        if row['latest_ph'] is not None:
+            delta['farms_with_soil'] += sign
+            delta['latest_ph_sum'] += sign * row['latest_ph']
+
+def owner_updates(table, delta, next_maintenance, now):
+    updates = {field: table.c[field] + delta[field] for field in ADDITIVE}
+    farms_with_soil = table.c.farms_with_soil + delta['farms_with_soil']
+    updates['average_ph'] = case(
+        (farms_with_soil > 0, (table.c.latest_ph_sum + delta['latest_ph_sum']) / farms_with_soil),
+        else_=None
+    )
+    updates['next_maintenance'] = next_maintenance
+    updates['updated_at'] = now
+    return updates
+
+def upsert_statement(connection):
+    dialect = connection.dialect.name if isinstance(connection, Connection) else connection.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(OwnerSummary.__table__)
+
+def upsert_owner(connection, owner_id, delta, now):
+    """Apply one owner's changes to its totals with a single statement."""
+    table = OwnerSummary.__table__
+    # The earliest due date is one seek on idx_farm_summaries_owner_maintenance
+    next_maintenance = (
+        select(func.min(FarmSummary.next_maintenance))
+        .where(FarmSummary.owner_id == owner_id)
+        .scalar_subquery()
+    )
+    values = {
+        'owner_id': owner_id,
+        **delta,
+        'next_maintenance': next_maintenance,
+        'average_ph': delta['latest_ph_sum'] / delta['farms_with_soil'] if delta['farms_with_soil'] else None,
+        'updated_at': now,
+    }
+
+    statement = upsert_statement(connection)
+    if statement is None:
+        # No native upsert: update the existing row, or insert the first one
+        result = connection.execute(
+            update(table).where(table.c.owner_id == owner_id).values(owner_updates(table, delta, next_maintenance, now))
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(values))
+        return
+
+    connection.execute(statement.values(values).on_conflict_do_update(
+        index_elements=['owner_id'],
+        set_=owner_updates(table, delta, next_maintenance, now)
+    ))
+
+def refresh_owners(connection, owner_ids):
+    """Recompute owner totals from scratch by rolling up their farm summaries."""
+    connection.execute(delete(OwnerSummary.__table__).where(OwnerSummary.owner_id.in_(owner_ids)))
+    connection.execute(OwnerSummary.__table__.insert().from_select(
+        ['owner_id', 'farm_count', 'total_size', 'crop_count', 'active_crops', 'planted_area',
+         'equipment_count', 'equipment_needing_service', 'next_maintenance', 'farms_with_soil',
+         'latest_ph_sum', 'average_ph', 'updated_at'],
+        select(
+            FarmSummary.owner_id,
+            func.count(),
+            func.sum(FarmSummary.size),
+            func.sum(FarmSummary.crop_count),
+            func.sum(FarmSummary.active_crops),
+            func.sum(FarmSummary.planted_area),
+            func.sum(FarmSummary.equipment_count),
+            func.sum(FarmSummary.equipment_needing_service),
+            func.min(FarmSummary.next_maintenance),
+            func.count(FarmSummary.latest_ph),
+            func.coalesce(func.sum(FarmSummary.latest_ph), 0.0),
+            func.avg(FarmSummary.latest_ph),
+            func.max(FarmSummary.updated_at)
+        )
+        .where(FarmSummary.owner_id.in_(owner_ids))
+        .group_by(FarmSummary.owner_id)
+    ))
+
+def replace_farm_summaries(connection, farm_ids):
+    """Recompute the farms' summary rows, returning the old and the new rows."""
+    table = FarmSummary.__table__
+    # Transactions refreshing the same farm must take turns, or both would
+    # compute owner deltas from the same old row and insert the same key.
+    # FOR NO KEY UPDATE (key_share) waits for other refreshes but not for
+    # the key-share locks that inserting crops or soil readings takes.
+    connection.execute(
+        select(Farm.id).where(Farm.id.in_(farm_ids)).order_by(Farm.id).with_for_update(key_share=True)
+    )
+    old_rows = [dict(row) for row in connection.execute(
+        select(table).where(table.c.farm_id.in_(farm_ids))
+    ).mappings()]
+    new_rows = farm_summary_rows(connection, farm_ids)
+
+    connection.execute(delete(table).where(table.c.farm_id.in_(farm_ids)))
+    if new_rows:
+        connection.execute(table.insert(), new_rows)
+    return old_rows, new_rows
+
+def refresh_farms(connection, farm_ids):
+    """Recompute the summaries of the given farms and adjust their owners' totals.
+
+    connection may be a Session or a Connection. Farms that no longer exist
+    lose their summary row. Owner totals change by the difference between the
+    old and new farm rows, so a write costs the same however many farms the
+    owner has.
+    """
+    # Sorted so that every transaction locks farms in the same order
+    farm_ids = sorted(farm_ids)
+    deltas = {}
+    for start in range(0, len(farm_ids), CHUNK_SIZE):
+        old_rows, new_rows = replace_farm_summaries(connection, farm_ids[start:start + CHUNK_SIZE])
+        owner_delta(old_rows, -1, deltas)
+        owner_delta(new_rows, 1, deltas)
+
+    now = datetime.utcnow()
+    for owner_id, delta in deltas.items():
+        upsert_owner(connection, owner_id, delta, now)
+
+    # Owners whose last farm went away
+    emptied = [owner_id for owner_id, delta in deltas.items() if delta['farm_count'] < 0]
+    if emptied:
+        connection.execute(
+            delete(OwnerSummary.__table__)
+            .where(OwnerSummary.owner_id.in_(emptied), OwnerSummary.farm_count <= 0)
+        )
+
+def rebuild_summaries(connection):
+    """Recompute every summary from scratch."""
+    connection.execute(delete(OwnerSummary.__table__))
+    connection.execute(delete(FarmSummary.__table__))
+
+    farm_ids = connection.execute(select(Farm.id)).scalars().all()
+    for start in range(0, len(farm_ids), CHUNK_SIZE):
+        replace_farm_summaries(connection, farm_ids[start:start + CHUNK_SIZE])
+
+    owner_ids = connection.execute(select(FarmSummary.owner_id).distinct()).scalars().all()
+    for start in range(0, len(owner_ids), CHUNK_SIZE):
+        refresh_owners(connection, owner_ids[start:start + CHUNK_SIZE])
+
+# Session hooks
+def track_flush(session, flush_context):
+    farm_ids = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(instance, TRACKED):
+            continue
+        key = 'id' if isinstance(instance, Farm) else 'farm_id'
+        farm_ids.add(getattr(instance, key))
+        # A child moved to another farm changes both farms
+        farm_ids.update(inspect(instance).attrs[key].history.deleted)
+    if farm_ids:
+        mark_farms(farm_ids, session)
+
+def refresh_before_commit(session):
+    if not session.info.get(PENDING) and not session.new and not session.dirty and not session.deleted:
+        return
+    session.flush()
+    farm_ids = session.info.pop(PENDING, None)
+    if farm_ids:
+        refresh_farms(session, farm_ids)
+
+def discard_on_rollback(session, previous_transaction):
+    session.info.pop(PENDING, None)
+
+HOOKS = (
+    ('after_flush', track_flush),
+    ('before_commit', refresh_before_commit),
+    ('after_soft_rollback', discard_on_rollback),
+)
+
+def track_summaries(session=None):
+    """Keep summaries current for every commit made through the session."""
+    session = session or db.session
+    for name, hook in HOOKS:
+        if not event.contains(session, name, hook):
+            event.listen(session, name, hook)
@@ -0,0 +1,352 @@
+"""Delta sync for offline field devices.
+
+A device keeps a local copy of one owner's farms, crops, equipment and soil
+records. Pulls return only the rows changed since the device's watermark, plus
+tombstones for rows deleted since then; pushes send back the changes made
+offline, and any change whose row was modified or deleted on the server in the
+meantime is reported as a conflict instead of being applied.
+
+The watermark is an opaque token holding, per resource, the (timestamp, id) of
+the last row sent; the next pull starts strictly after it. A transaction can
+commit a little after the timestamp it wrote, so once a resource is caught up
+its watermark is set back to SYNC_LOOKBACK before the pull began and the
+newest rows are sent again on the next pull. Devices upsert rows by id, so the
+repeats are harmless.
+
+Soil records are never updated, so they are synced by created_at. Deleting a
+farm also deletes its crops, equipment and soil records; only the farm gets a
+tombstone and devices drop its children with it. A farm moved to another owner,
+or a crop or machine moved to another owner's farm, is not reported to the old
+owner; devices should resync from scratch after such a move.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, or_, select, true
+from models import db, Farm, Crop, SoilRecord, Equipment, SyncTombstone
+from serializers import farm_serializer, crop_serializer, soil_record_serializer, equipment_serializer
+from ids import check_id
+import base64
+import binascii
+import json
+import os
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+MAX_CHANGES = int(os.getenv('SYNC_MAX_CHANGES', '10000'))
+CHUNK_SIZE = int(os.getenv('SYNC_CHUNK_SIZE', '500'))
+
+SYNC_LOOKBACK = timedelta(seconds=int(os.getenv('SYNC_LOOKBACK_SECONDS', '60')))
+TOMBSTONE_RETENTION = timedelta(days=int(os.getenv('SYNC_TOMBSTONE_DAYS', '90')))
+
+# resource -> (model, serializer, watermark column, response key)
+RESOURCES = {
+    'farm': (Farm, farm_serializer, Farm.updated_at, 'farms'),
+    'crop': (Crop, crop_serializer, Crop.updated_at, 'crops'),
+    'equipment': (Equipment, equipment_serializer, Equipment.updated_at, 'equipment'),
+    'soil_record': (SoilRecord, soil_record_serializer, SoilRecord.created_at, 'soil_records'),
+}
+
+class SyncError(Exception):
+    pass
+
+class SyncReset(Exception):
+    """The watermark is older than the tombstones kept; the device must resync from scratch."""
+    pass
+
+def encode_token(cursors):
+    payload = json.dumps(cursors, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_token(token):
+    try:
+        cursors = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return {
+            name: (datetime.fromisoformat(cursors[name][0]), cursors[name][1])
+            for name in (*RESOURCES, 'tombstone')
+        }
+    except (ValueError, TypeError, KeyError, IndexError, binascii.Error):
+        raise SyncError("Invalid since token")
+
+def after(column, id_column, cursor):
+    """Rows strictly after the (timestamp, id) cursor in (column, id) order."""
+    if cursor is None:
+        return true()
+    timestamp, row_id = cursor
+    # The plain >= lets the database range-scan the timestamp index
+    return and_(column >= timestamp, or_(column > timestamp, id_column > row_id))
+
+def owner_rows(query, model, owner_id):
+    """Limit a query to the owner's rows; children are joined to their farm."""
+    if model is not Farm:
+        query = query.join(Farm, Farm.id == model.farm_id)
+    return query.where(Farm.owner_id == owner_id)
+
+def pull(owner_id, since=None, limit=DEFAULT_LIMIT):
+    """Rows and tombstones changed since the token, up to limit of each kind."""
+    started = datetime.utcnow()
+    caught_up = started - SYNC_LOOKBACK
+
+    if since:
+        cursors = decode_token(since)
+        if cursors['tombstone'][0] < started - TOMBSTONE_RETENTION:
+            raise SyncReset("Watermark is too old, start a full sync")
+    else:
+        # A full sync has nothing to delete; later deletions are picked up from here
+        cursors = dict.fromkeys(RESOURCES)
+        cursors['tombstone'] = (caught_up, 0)
+
+    response = {}
+    next_cursors = {}
+    has_more = False
+
+    for name, (model, serializer, column, key) in RESOURCES.items():
+        rows = db.session.execute(
+            owner_rows(serializer.select(), model, owner_id)
+            .where(after(column, model.id, cursors[name]))
+            .order_by(column, model.id)
+            .limit(limit + 1)
+        ).all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursors[name] = (last._mapping[column.key], last.id)
+            has_more = True
+        else:
+            next_cursors[name] = (caught_up, '')
+
+        response[key] = serializer.dump_rows(rows)
+
+    tombstones = db.session.execute(
+        select(SyncTombstone.id, SyncTombstone.resource, SyncTombstone.row_id, SyncTombstone.deleted_at)
+        .where(
+            SyncTombstone.owner_id == owner_id,
+            after(SyncTombstone.deleted_at, SyncTombstone.id, cursors['tombstone'])
+        )
+        .order_by(SyncTombstone.deleted_at, SyncTombstone.id)
+        .limit(limit + 1)
+    ).all()
+
+    if len(tombstones) > limit:
+        tombstones = tombstones[:limit]
+        next_cursors['tombstone'] = (tombstones[-1].deleted_at, tombstones[-1].id)
+        has_more = True
+    else:
+        next_cursors['tombstone'] = (caught_up, 0)
+
+    response['tombstones'] = [
+        {'resource': row.resource, 'id': row.row_id, 'deleted_at': row.deleted_at}
+        for row in tombstones
+    ]
+    response['since'] = encode_token({
+        name: [timestamp.isoformat(), row_id] for name, (timestamp, row_id) in next_cursors.items()
+    })
+    response['has_more'] = has_more
+    response['server_time'] = started
+    return response
+
+def record_tombstones(resource, ids, session=None):
+    """Remember deleted rows for devices that have not synced yet.
+
+    Call before the DELETE, while the rows can still be traced to their owner.
+    Tombstones older than TOMBSTONE_RETENTION are dropped at the same time.
+    """
+    session = session or db.session
+    model = RESOURCES[resource][0]
+    ids = list(ids)
+    if not ids:
+        return
+
+    owner = select(model.id, Farm.owner_id)
+    if model is not Farm:
+        owner = owner.join(Farm, Farm.id == model.farm_id)
+
+    now = datetime.utcnow()
+    rows = [
+        {'resource': resource, 'row_id': row_id, 'owner_id': owner_id, 'deleted_at': now}
+        for row_id, owner_id in session.execute(owner.where(model.id.in_(ids)))
+    ]
+    if rows:
+        session.execute(SyncTombstone.__table__.insert(), rows)
+    session.execute(delete(SyncTombstone.__table__).where(SyncTombstone.deleted_at < now - TOMBSTONE_RETENTION))
+
+def parse_change(change):
+    """Validate one pushed change and return (op, resource, id, data, base_updated_at)."""
+    if not isinstance(change, dict):
+        raise SyncError("Change must be an object")
+
+    op = change.get('op')
+    resource = change.get('resource')
+    if resource not in RESOURCES:
+        raise SyncError("resource must be farm, crop, equipment or soil_record")
+    if op not in ('create', 'update', 'delete'):
+        raise SyncError("op must be create, update or delete")
+    if resource == 'soil_record' and op != 'create':
+        raise SyncError("Soil records can only be created")
+
+    # Devices generate ids so that offline rows can refer to each other
+    row_id = change.get('id')
+    if not row_id or not isinstance(row_id, str) or len(row_id) > 36:
+        raise SyncError("Missing required field: id")
+    try:
+        check_id(row_id)
+    except ValueError as e:
+        raise SyncError(str(e))
+
+    data = change.get('data') or {}
+    if not isinstance(data, dict):
+        raise SyncError("data must be an object")
+
+    base = None
+    if op != 'create':
+        try:
+            base = datetime.fromisoformat(change['base_updated_at'])
+        except KeyError:
+            raise SyncError("Missing required field: base_updated_at")
+        except (TypeError, ValueError):
+            raise SyncError("Invalid base_updated_at")
+
+    return op, resource, row_id, data, base
+
+def server_rows(resource, ids):
+    model, serializer = RESOURCES[resource][:2]
+    if not ids:
+        return {}
+    return {row['id']: row for row in serializer.dump_rows(db.session.execute(
+        serializer.select().where(model.id.in_(ids))
+    ))}
+
+def not_allowed(index):
+    # Rows of other owners are neither changed nor described
+    return {"index": index, "status": "error", "error": "Not allowed"}
+
+def apply_chunk(chunk, results, owner_id):
+    """Check one chunk of changes for conflicts and apply the rest.
+
+    The rows are read with FOR UPDATE so that, where the database supports it,
+    nothing can change them between the check and the write. Changes to rows
+    or farms of other owners are refused.
+    """
+    from batch_ops import run_batch
+    from soil_ingest import ingest
+
+    current, owners = {}, {}
+    for resource, (model, _, column, _) in RESOURCES.items():
+        ids = [row_id for _, _, kind, row_id, _, _ in chunk if kind == resource]
+        if ids:
+            query = select(model.id, column, Farm.owner_id)
+            if model is not Farm:
+                query = query.join(Farm, Farm.id == model.farm_id)
+            rows = db.session.execute(query.where(model.id.in_(ids)).with_for_update(of=model)).all()
+            current[resource] = {row_id: updated for row_id, updated, _ in rows}
+            owners[resource] = {row_id: owner for row_id, _, owner in rows}
+
+    # The farms that crops, equipment and soil records are written to
+    targets = {data['farm_id'] for _, _, resource, _, data, _ in chunk if resource != 'farm' and data.get('farm_id')}
+    farm_owners = dict(db.session.execute(
+        select(Farm.id, Farm.owner_id).where(Farm.id.in_(targets))
+    ).all()) if targets else {}
+    # Farms created in this chunk belong to the pushing owner
+    farm_owners.update({
+        row_id: owner_id for _, op, resource, row_id, _, _ in chunk
+        if resource == 'farm' and op == 'create' and row_id not in current['farm']
+    })
+
+    operations, readings, conflicts = [], [], []
+    for index, op, resource, row_id, data, base in chunk:
+        found = row_id in current[resource]
+        if found and owners[resource][row_id] != owner_id:
+            results[index] = not_allowed(index)
+            continue
+        if resource == 'farm':
+            if data.get('owner_id', owner_id) != owner_id:
+                results[index] = not_allowed(index)
+                continue
+            if op == 'create':
+                data = {**data, 'owner_id': owner_id}
+        elif farm_owners.get(data.get('farm_id'), owner_id) != owner_id:
+            results[index] = not_allowed(index)
+            continue
+
+        if op == 'create' and found:
+            if resource == 'soil_record':
+                # Already received on an earlier push that lost its response
+                results[index] = {"index": index, "status": "ok", "op": op, "resource": resource, "id": row_id}
+            else:
+                conflicts.append((index, resource, row_id, 'exists'))
+        elif op != 'create' and not found:
+            conflicts.append((index, resource, row_id, 'deleted'))
+        elif op != 'create' and current[resource][row_id] != base:
+            conflicts.append((index, resource, row_id, 'modified'))
+        elif resource == 'soil_record':
+            readings.append((index, {**data, 'id': row_id}))
+        else:
+            operations.append((index, {'op': op, 'resource': resource, 'id': row_id, 'data': data}))
+
+    for resource in RESOURCES:
+        ids = [row_id for _, kind, row_id, _ in conflicts if kind == resource]
+        rows = server_rows(resource, ids)
+        for index, kind, row_id, reason in conflicts:
+            if kind == resource:
+                results[index] = {
+                    "index": index, "status": "conflict", "reason": reason,
+                    "resource": resource, "id": row_id, "server": rows.get(row_id)
+                }
+
+    written = []
+    if operations:
+        batch_results, written = run_batch([operation for _, operation in operations], len(operations))
+        for (index, _), result in zip(operations, batch_results):
+            results[index] = {**result, "index": index}
+    else:
+        # Release the locks taken by the conflict check
+        db.session.commit()
+
+    if readings:
+        summary = ingest([values for _, values in readings], chunk_size=len(readings))
+        failed = {error['row']: error['error'] for error in summary['errors']}
+        for number, (index, values) in enumerate(readings):
+            if number in failed:
+                results[index] = {"index": index, "status": "error", "error": failed[number]}
+            else:
+                results[index] = {"index": index, "status": "ok", "op": "create",
+                                  "resource": "soil_record", "id": values['id']}
+
+    # Send back the rows as stored, so devices have the updated_at of their next change
+    applied = [
+        results[index] for index, *_ in chunk
+        if results[index]['status'] == 'ok' and results[index]['op'] != 'delete'
+    ]
+    for resource in RESOURCES:
+        rows = server_rows(resource, [result['id'] for result in applied if result['resource'] == resource])
+        for result in applied:
+            if result['resource'] == resource and result['id'] in rows:
+                result['row'] = rows[result['id']]
+
+    return written
+
+def push(changes, owner_id):
+    """Apply one owner's changes made offline, returning one result per change in order.
+
+    Each result has status ok (with the row as stored), conflict (with the
+    server's row, or null if it was deleted) or error. Changes to rows, or
+    onto farms, of other owners are errors.
+    """
+    results = [None] * len(changes)
+    parsed = []
+    seen = set()
+    for index, change in enumerate(changes):
+        try:
+            op, resource, row_id, data, base = parse_change(change)
+            # Offline edits to one row are merged on the device into one change
+            if (resource, row_id) in seen:
+                raise SyncError("Row changed more than once in this push")
+            seen.add((resource, row_id))
+            parsed.append((index, op, resource, row_id, data, base))
+        except SyncError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+
+    written = []
+    for start in range(0, len(parsed), CHUNK_SIZE):
+        written.extend(apply_chunk(parsed[start:start + CHUNK_SIZE], results, owner_id))
+
+    return results, written
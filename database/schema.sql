@@ -1,103 +0,0 @@
--- Create Users Table
-CREATE TABLE users (
-    id VARCHAR(36) PRIMARY KEY,
-    name VARCHAR(255) NOT NULL,
-    email VARCHAR(255) UNIQUE NOT NULL,
-    password_hash VARCHAR(255) NOT NULL,
-    role VARCHAR(50) NOT NULL DEFAULT 'Farmer',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Farms Table
-CREATE TABLE farms (
-    id VARCHAR(36) PRIMARY KEY,
-    name VARCHAR(255) NOT NULL,
-    location VARCHAR(255) NOT NULL,
-    size DECIMAL(10, 2) NOT NULL,
-    owner_id VARCHAR(36) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Crops Table
-CREATE TABLE crops (
-    id VARCHAR(36) PRIMARY KEY,
-    farm_id VARCHAR(36) NOT NULL REFERENCES farms(id) ON DELETE CASCADE,
-    name VARCHAR(255) NOT NULL,
-    area DECIMAL(10, 2) NOT NULL,
-    status VARCHAR(50) NOT NULL DEFAULT 'Planning',
-    planted_date DATE,
-    harvest_date DATE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Soil Records Table
-CREATE TABLE soil_records (
-    id VARCHAR(36) PRIMARY KEY,
-    farm_id VARCHAR(36) NOT NULL REFERENCES farms(id) ON DELETE CASCADE,
-    ph DECIMAL(4, 2) NOT NULL,
-    nitrogen DECIMAL(6, 2) NOT NULL,
-    phosphorus DECIMAL(6, 2) NOT NULL,
-    potassium DECIMAL(6, 2) NOT NULL,
-    organic_matter DECIMAL(4, 2) NOT NULL,
-    record_date DATE NOT NULL DEFAULT CURRENT_DATE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Equipment Table
-CREATE TABLE equipment (
-    id VARCHAR(36) PRIMARY KEY,
-    farm_id VARCHAR(36) NOT NULL REFERENCES farms(id) ON DELETE CASCADE,
-    name VARCHAR(255) NOT NULL,
-    status VARCHAR(50) NOT NULL DEFAULT 'Operational',
-    last_maintenance DATE,
-    next_maintenance DATE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Products Table
-CREATE TABLE products (
-    id VARCHAR(36) PRIMARY KEY,
-    name VARCHAR(255) NOT NULL,
-    description TEXT,
-    price DECIMAL(10, 2) NOT NULL,
-    category VARCHAR(100) NOT NULL,
-    stock_quantity INTEGER NOT NULL DEFAULT 0,
-    image_url VARCHAR(255),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Orders Table
-CREATE TABLE orders (
-    id VARCHAR(36) PRIMARY KEY,
-    user_id VARCHAR(36) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    status VARCHAR(50) NOT NULL DEFAULT 'Pending',
-    total_amount DECIMAL(10, 2) NOT NULL,
-    order_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    delivery_date TIMESTAMP WITH TIME ZONE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create Order Items Table
-CREATE TABLE order_items (
-    id VARCHAR(36) PRIMARY KEY,
-    order_id VARCHAR(36) NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
-    product_id VARCHAR(36) NOT NULL REFERENCES products(id) ON DELETE CASCADE,
-    quantity INTEGER NOT NULL,
-    price DECIMAL(10, 2) NOT NULL
-);
-
--- Create indexes for better performance
-CREATE INDEX idx_farms_owner ON farms(owner_id);
-CREATE INDEX idx_crops_farm ON crops(farm_id);
-CREATE INDEX idx_soil_records_farm ON soil_records(farm_id);
-CREATE INDEX idx_equipment_farm ON equipment(farm_id);
-CREATE INDEX idx_orders_user ON orders(user_id);
-CREATE INDEX idx_order_items_order ON order_items(order_id);
-CREATE INDEX idx_order_items_product ON order_items(product_id);
-CREATE INDEX idx_products_category ON products(category);